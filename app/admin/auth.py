@@ -4,25 +4,24 @@ from sqladmin.authentication import AuthenticationBackend
 from starlette.requests import Request
 from starlette.responses import RedirectResponse
 
+from app.dependencies import get_current_superuser, get_current_user
 from app.exceptions import BookingAppException
 from app.services.auths import AuthsService
-from app.utils.transaction_manager import TransactionManager
-from app.dependencies import get_current_user, get_current_superuser
 from app.utils.auth import get_authorization_scheme_param
-
-
-transaction_manager = TransactionManager()
+from app.utils.transaction_manager import TransactionManager
 
 
 class AdminAuth(AuthenticationBackend):
     async def login(self, request: Request) -> Optional[bool]:
         form = await request.form()
         email, password = form["username"], form["password"]
-        token, existing_user = await AuthsService().login_user(
-            transaction_manager=transaction_manager,
-            password=password,
-            email=email
-        )
+        transaction_manager = TransactionManager()
+        try:
+            token, existing_user = await AuthsService().login_user(
+                transaction_manager=transaction_manager, password=password, email=email
+            )
+        finally:
+            await transaction_manager.close()
         if existing_user.role == "admin":
             request.session.update({"access_token": token.access_token})
             return True
@@ -1,9 +1,24 @@
+from typing import Any
+
 from sqladmin import ModelView
 
 from app.models.bookings import Bookings
 from app.models.hotels import Hotels
 from app.models.rooms import Rooms
 from app.models.users import Users
+from app.utils.cache import (
+    ANY_HOTEL_TAG,
+    HOTELS_TAG,
+    hotel_tag,
+    response_cache,
+    room_tag,
+)
+from app.utils.transaction_manager import TransactionManager
+
+
+def room_tags(room: Rooms) -> list[str]:
+    """Cache tags invalidated by a change of the room"""
+    return [ANY_HOTEL_TAG, hotel_tag(room.hotel_id), room_tag(room.id)]
 
 
 # views are responsible for displaying table models in the admin panel
@@ -21,12 +36,18 @@ class BookingsAdmin(ModelView, model=Bookings):
         Bookings.users,
         Bookings.rooms,
     ]
+    # bookings are made through the API, which keeps the room inventory in sync
+    can_create = False
+    can_edit = False
+    can_delete = False
     name = "Booking"
     name_plural = "Bookings"
     icon = "fa-solid fa-book"
 
 
 class RoomsAdmin(ModelView, model=Rooms):
+    """The writes bypass the services, so the cached responses
+    of the changed rooms are invalidated here"""
     column_list = [c.name for c in Rooms.__table__.columns] + [
         Rooms.hotels,
         Rooms.bookings,
@@ -35,9 +56,55 @@ class RoomsAdmin(ModelView, model=Rooms):
     name_plural = "Rooms"
     icon = "fa-solid fa-bed"
 
+    async def insert_model(self, data: dict) -> Any:
+        room = await super().insert_model(data)
+        await response_cache.invalidate(*room_tags(room))
+        return room
+
+    async def update_model(self, pk: Any, data: dict) -> Any:
+        # the room can be moved to another hotel
+        room = await self.get_object_for_delete(pk)
+        updated_room = await super().update_model(pk, data)
+        await response_cache.invalidate(*room_tags(room), *room_tags(updated_room))
+        return updated_room
+
+    async def delete_model(self, obj: Any) -> None:
+        await super().delete_model(obj)
+        await response_cache.invalidate(*room_tags(obj))
+
 
 class HotelsAdmin(ModelView, model=Hotels):
+    """The writes bypass the services, so the cached responses
+    of the changed hotels are invalidated here"""
     column_list = [c.name for c in Hotels.__table__.columns] + [Hotels.rooms]
     name = "Hotel"
     name_plural = "Hotels"
     icon = "fa-solid fa-hotel"
+
+    async def insert_model(self, data: dict) -> Any:
+        hotel = await super().insert_model(data)
+        await response_cache.invalidate(HOTELS_TAG)
+        return hotel
+
+    async def update_model(self, pk: Any, data: dict) -> Any:
+        # the hotel can be moved to another location
+        hotel = await self.get_object_for_delete(pk)
+        updated_hotel = await super().update_model(pk, data)
+        tags = [ANY_HOTEL_TAG, hotel_tag(hotel.id)]
+        if updated_hotel.location != hotel.location:
+            tags.append(HOTELS_TAG)
+        await response_cache.invalidate(*tags)
+        return updated_hotel
+
+    async def delete_model(self, obj: Any) -> None:
+        # the rooms of the hotel are deleted with it
+        transaction_manager = TransactionManager()
+        try:
+            async with transaction_manager:
+                rooms = await transaction_manager.rooms.find_all(hotel_id=obj.id)
+        finally:
+            await transaction_manager.close()
+        await super().delete_model(obj)
+        await response_cache.invalidate(
+            ANY_HOTEL_TAG, hotel_tag(obj.id), *(room_tag(room.id) for room in rooms)
+        )
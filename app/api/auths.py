@@ -9,6 +9,7 @@ from app.logger import logger
 from app.models.users import Users
 from app.schemas.users import SToken, SUserRegister, SUserResponse
 from app.services.auths import AuthsService
+from app.utils.auth import get_authorization_scheme_param
 
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
@@ -34,10 +35,13 @@ async def register_user(user_data: SUserRegister, transaction_manager: TManagerD
 
 
 @router.post(
-    "/login", response_model=SUserResponse, responses={401: {"model": SExstraResponse}}
+    "/login",
+    response_model=SUserResponse,
+    responses={401: {"model": SExstraResponse}, 429: {"model": SExstraResponse}},
 )
 @version(1)
 async def login_user(
+    request: Request,
     response: Response,
     transaction_manager: TManagerDep,
     credentials: OAuth2PasswordRequestForm = Depends(),
@@ -48,6 +52,7 @@ async def login_user(
         transaction_manager=transaction_manager,
         password=credentials.password,
         email=credentials.username,
+        client_ip=request.client.host if request.client else None,
     )
     response.set_cookie(
         "access_token",
@@ -73,9 +78,13 @@ async def logout_user(
     """Logout an existing user"""
     response.delete_cookie("access_token")
     response.delete_cookie("refresh_token")
+    _, access_token = get_authorization_scheme_param(
+        request.cookies.get("access_token")
+    )
     await AuthsService().logout_user(
         transaction_manager=transaction_manager,
         token=request.cookies.get("refresh_token"),
+        access_token=access_token,
     )
     logger.info("Successfully logged out")
     return {"message": "Successfully logged out"}
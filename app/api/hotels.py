@@ -2,15 +2,17 @@ from datetime import date
 from typing import Optional
 
 from fastapi import APIRouter, Depends, UploadFile
-from fastapi_cache.decorator import cache
 from fastapi_versioning import version
 
+from app.config import settings
 from app.dependencies import TManagerDep, get_current_hotel_owner
 from app.exceptions import SExstraResponse
 from app.logger import logger
 from app.models.users import Users
 from app.schemas.hotels import SHotel, SHotelResponse, SHotelsResponse
 from app.services.hotels import HotelsService
+from app.utils.cache import cache, hotel_tag
+from app.utils.cdn import catalogue_policy, search_policy
 
 
 router = APIRouter(prefix="/hotels", tags=["Hotels"])
@@ -162,20 +164,31 @@ async def delete_hotel(
     response_model=Optional[list[SHotelsResponse]],
     responses={400: {"model": SExstraResponse}},
 )
-@cache(expire=60)
+@cache(
+    expire=settings.RESPONSE_CACHE_EXPIRE_SECONDS,
+    model=Optional[list[SHotelsResponse]],
+    tags=HotelsService.get_search_cache_tags,
+    policy=search_policy,
+)
 @version(1)
 async def get_hotels_by_location_and_time(
     location: str,
     date_from: date,
     date_to: date,
     transaction_manager: TManagerDep,
+    fuzzy: bool = False,
 ):
-    """Gives a list of hotels with free rooms for a certain date"""
+    """
+    Gives a list of hotels with free rooms for a certain date,
+    with fuzzy=true tolerates typos in the location
+    and sorts hotels by similarity of the location
+    """
     hotels = await HotelsService().get_hotels_by_location_and_time(
         transaction_manager=transaction_manager,
         location=location,
         date_from=date_from,
         date_to=date_to,
+        fuzzy=fuzzy,
     )
     logger.info("Succesful return hotels")
     return hotels
@@ -187,7 +200,13 @@ async def get_hotels_by_location_and_time(
     responses={404: {"model": SExstraResponse}},
 )
 @version(1)
-@cache(expire=60)
+@cache(
+    expire=settings.RESPONSE_CACHE_EXPIRE_SECONDS,
+    model=SHotelResponse,
+    tags=lambda hotel_id, **kwargs: [hotel_tag(hotel_id)],
+    versioned=True,
+    policy=catalogue_policy,
+)
 async def get_hotel_by_id(hotel_id: int, transaction_manager: TManagerDep):
     """Returns the hotel by id"""
     hotel = await HotelsService().get_hotel_by_id(
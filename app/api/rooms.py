@@ -4,12 +4,15 @@ from typing import Optional
 from fastapi import APIRouter, Depends, UploadFile
 from fastapi_versioning import version
 
+from app.config import settings
 from app.dependencies import TManagerDep, get_current_hotel_owner
 from app.exceptions import SExstraResponse
 from app.logger import logger
 from app.models.users import Users
 from app.schemas.rooms import SRoomResponse, SRooms, SRoomsResponse
 from app.services.rooms import RoomsService
+from app.utils.cache import cache, room_tag
+from app.utils.cdn import catalogue_policy, search_policy
 
 
 router = APIRouter(prefix="/hotels", tags=["Rooms"])
@@ -171,6 +174,13 @@ async def delete_room_image(
     responses={400: {"model": SExstraResponse}, 404: {"model": SExstraResponse}},
 )
 @version(1)
+@cache(
+    expire=settings.RESPONSE_CACHE_EXPIRE_SECONDS,
+    model=Optional[list[SRoomsResponse]],
+    tags=RoomsService.get_rooms_cache_tags,
+    versioned=True,
+    policy=search_policy,
+)
 async def get_available_hotel_rooms(
     hotel_id: int, date_from: date, date_to: date, transaction_manager: TManagerDep
 ):
@@ -191,6 +201,13 @@ async def get_available_hotel_rooms(
     responses={404: {"model": SExstraResponse}},
 )
 @version(1)
+@cache(
+    expire=settings.RESPONSE_CACHE_EXPIRE_SECONDS,
+    model=SRoomResponse,
+    tags=lambda room_id, **kwargs: [room_tag(room_id)],
+    versioned=True,
+    policy=catalogue_policy,
+)
 async def get_room(room_id: int, transaction_manager: TManagerDep):
     """Returns a specific room by id"""
     room = await RoomsService().get_room(
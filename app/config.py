@@ -1,4 +1,4 @@
-from typing import Literal
+from typing import Literal, Optional
 
 from pydantic import ConfigDict
 from pydantic_settings import BaseSettings
@@ -31,7 +31,61 @@ class Settings(BaseSettings):
     HASHING_ALGORITHM: str
 
     REFRESH_TOKEN_EXPIRE_DAYS: int
+    # where refresh sessions are kept, Redis expires them by itself
+    REFRESH_SESSION_BACKEND: Literal["postgres", "redis"] = "postgres"
+    # expired sessions in Postgres are deleted by the celery beat
+    REFRESH_SESSIONS_PURGE_MINUTES: int = 10
+    REFRESH_SESSIONS_PURGE_BATCH_SIZE: int = 1000
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+    # verified access tokens kept by every worker
+    ACCESS_TOKEN_CACHE_SIZE: int = 10_000
+    # threads hashing and verifying passwords outside the event loop
+    PASSWORD_HASHING_WORKERS: int = 4
+    # hashes waiting for a thread, the next ones are rejected with 429
+    PASSWORD_HASHING_QUEUE_SIZE: int = 32
+    # login attempts per minute, refilled evenly over the minute
+    LOGIN_ATTEMPTS_PER_EMAIL: int = 5
+    LOGIN_ATTEMPTS_PER_IP: int = 30
+
+    # the calls of the repository methods are logged, their queries
+    # are measured by the db_query_duration_seconds histogram anyway
+    LOG_REPOSITORY_QUERIES: bool = False
+    # queries slower than this are logged to the rotating file, 0 turns it off,
+    # a sample of them with the plans of EXPLAIN (ANALYZE, BUFFERS),
+    # without the file they are logged to stderr
+    SLOW_QUERY_SECONDS: float = 0.5
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE: float = 0.1
+    SLOW_QUERY_EXPLAIN_TIMEOUT_SECONDS: float = 5
+    SLOW_QUERY_LOG_FILE: str = ""
+    SLOW_QUERY_LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    SLOW_QUERY_LOG_BACKUPS: int = 5
+
+    # cached responses are invalidated by the writes,
+    # the expiration only limits how long an unused response is kept
+    RESPONSE_CACHE_EXPIRE_SECONDS: int = 6 * 60 * 60
+    # hot responses kept by every worker in front of Redis, 0 disables it,
+    # the invalidations reach the workers through Redis pub/sub
+    RESPONSE_CACHE_LOCAL_SIZE: int = 1000
+    RESPONSE_CACHE_LOCAL_EXPIRE_SECONDS: int = 30
+    # a missing response is computed by one worker at a time while the others
+    # wait for it up to the lock seconds, 0 - by every worker at a time
+    RESPONSE_CACHE_LOCK_SECONDS: int = 0
+    # seconds an expired response is still returned to the other requests
+    # while the request which found it expired computes it again
+    RESPONSE_CACHE_STALE_SECONDS: int = 0
+    # the CDN keeps the catalogue responses until the writes purge them,
+    # the searches for a shorter time, since they change with every booking
+    CDN_CACHE_SECONDS: int = 24 * 60 * 60
+    CDN_SEARCH_CACHE_SECONDS: int = 5 * 60
+    # the surrogate keys of the changed responses are sent to the url
+    # with PURGE requests, not set - there is no CDN in front of the app
+    CDN_PURGE_URL: Optional[str] = None
+    CDN_PURGE_TIMEOUT_SECONDS: float = 2
+
+    # inventory - bookings wait only for the ones sharing the same days,
+    # room / advisory - all bookings of a room wait for each other
+    # on the room row lock / on an advisory lock of the room
+    BOOKING_LOCK_MODE: Literal["inventory", "room", "advisory"] = "inventory"
 
     @property
     def database_url(self):
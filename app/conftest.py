@@ -3,6 +3,10 @@ from unittest import mock
 
 # Enable the test mode for working with the database
 os.environ["MODE"] = "TEST"
+# Tests log in all the time, the login limits have their own tests
+os.environ["LOGIN_ATTEMPTS_PER_EMAIL"] = "100000"
+os.environ["LOGIN_ATTEMPTS_PER_IP"] = "100000"
 
-# Disable caching
-mock.patch("fastapi_cache.decorator.cache", lambda *args, **kwargs: lambda f: f).start()
+# Disable caching, the tests of the cached endpoints stop the patch
+cache_patch = mock.patch("app.utils.cache.cache", lambda *args, **kwargs: lambda f: f)
+cache_patch.start()
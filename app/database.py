@@ -1,10 +1,15 @@
+import time
 from typing import Any
 
-from sqlalchemy import JSON, NullPool
+from sqlalchemy import JSON, NullPool, event
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 
 from app.config import settings
+from app.prometheus.metrics import db_query_duration, db_query_rows
+from app.utils.repository import query_source
+from app.utils.slow_queries import SlowQueryLog, create_slow_query_logger
+from app.utils.timing import add_phase_time
 
 # Select the database operation mode
 if settings.MODE == "TEST":
@@ -17,6 +22,31 @@ else:
 
 engine = create_async_engine(database_url, **database_params)
 async_session_maker = async_sessionmaker(bind=engine, expire_on_commit=False)
+slow_query_log = SlowQueryLog(
+    engine,
+    threshold=settings.SLOW_QUERY_SECONDS,
+    sample_rate=settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+    explain_timeout=settings.SLOW_QUERY_EXPLAIN_TIMEOUT_SECONDS,
+    log=create_slow_query_logger(),
+)
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def start_query_timing(conn, cursor, statement, parameters, context, executemany):
+    context.query_started = time.perf_counter()
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def stop_query_timing(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - context.query_started
+    add_phase_time("db", duration)
+    repository, method = query_source.get()
+    db_query_duration.labels(repository=repository, method=method).observe(duration)
+    if cursor.description is not None:
+        db_query_rows.labels(repository=repository, method=method).inc(
+            max(cursor.rowcount, 0)
+        )
+    slow_query_log.record(statement, parameters, executemany, duration)
 
 
 class Base(DeclarativeBase):
@@ -1,52 +1,77 @@
 from datetime import datetime
-from typing import Annotated
+from typing import Annotated, AsyncGenerator
 
 from fastapi import Depends
 from jose import JWTError, jwt
 
 from app.config import settings
-from app.database import async_session_maker
 from app.exceptions import (
     AccessDeniedException,
     IncorrectTokenFormatException,
     InvalidTokenUserIDException,
     TokenExpiredException,
+    TokenRevokedException,
 )
 from app.logger import logger
 from app.models.users import Users
-from app.repositories.users import UsersRepository
 from app.utils.auth import oauth2_scheme
+from app.utils.timing import timed
+from app.utils.token_cache import access_token_cache
+from app.utils.token_denylist import token_denylist
 from app.utils.transaction_manager import ITransactionManager, TransactionManager
 
-# return a Unit of work instance for working with Session
-TManagerDep = Annotated[ITransactionManager, Depends(TransactionManager)]
+
+async def get_transaction_manager() -> AsyncGenerator[ITransactionManager, None]:
+    """Returns a Unit of work instance which holds one connection
+    for the whole request"""
+    transaction_manager = TransactionManager()
+    try:
+        yield transaction_manager
+    finally:
+        await transaction_manager.close()
+
+
+# the same instance is shared by all dependencies of a request
+TManagerDep = Annotated[ITransactionManager, Depends(get_transaction_manager)]
 
 
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> Users:
-    """Returns current authenticated user"""
-    try:
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, settings.HASHING_ALGORITHM)
-    except JWTError as exc:
-        logger.warning("Incorrect token format")
-        raise IncorrectTokenFormatException from exc
-
-    expire: str = payload.get("exp")
-    if not expire or (int(expire) < datetime.utcnow().timestamp()):
-        expired_time = datetime.utcfromtimestamp(int(expire))
-        logger.warning("Token expired", extra={"expired_time": expired_time})
-        raise TokenExpiredException
-
-    user_id: str = payload.get("sub")
-    if not user_id:
-        logger.warning("Invalid token user id")
-        raise InvalidTokenUserIDException
-
-    async with async_session_maker() as session:
-        user = await UsersRepository(session).find_one_or_none(id=int(user_id))
-        if not user:
+    """Returns current authenticated user from the claims of the access token,
+    only the denylist of revoked tokens is checked, not the database"""
+    with timed("auth"):
+        payload = access_token_cache.get(token)
+        if payload is None:
+            try:
+                payload = jwt.decode(
+                    token, settings.JWT_SECRET_KEY, settings.HASHING_ALGORITHM
+                )
+            except JWTError as exc:
+                logger.warning("Incorrect token format")
+                raise IncorrectTokenFormatException from exc
+
+            expire: str = payload.get("exp")
+            if not expire or (int(expire) < datetime.utcnow().timestamp()):
+                expired_time = datetime.utcfromtimestamp(int(expire))
+                logger.warning("Token expired", extra={"expired_time": expired_time})
+                raise TokenExpiredException
+            access_token_cache.put(token, payload)
+
+        user_id: str = payload.get("sub")
+        role: str = payload.get("role")
+        email: str = payload.get("email")
+        jti: str = payload.get("jti")
+        issued_at: float = payload.get("iat")
+        if not all((user_id, role, email, jti, issued_at)):
             logger.warning("Invalid token user id")
             raise InvalidTokenUserIDException
-        return user
+
+        if await token_denylist.is_revoked(
+            jti=jti, user_id=int(user_id), issued_at=issued_at
+        ):
+            logger.warning("Token revoked", extra={"user_id": user_id})
+            raise TokenRevokedException
+
+        return Users(id=int(user_id), email=email, role=role)
 
 
 async def get_current_superuser(
@@ -41,6 +41,11 @@ class TokenAbsentException(BookingAppException):
     detail = "The token is missing"
 
 
+class TokenRevokedException(BookingAppException):
+    status_code = status.HTTP_401_UNAUTHORIZED
+    detail = "The token has been revoked"
+
+
 class IncorrectTokenFormatException(BookingAppException):
     status_code = status.HTTP_401_UNAUTHORIZED
     detail = "Incorrect token format"
@@ -93,3 +98,20 @@ class IncorrectIDException(BookingAppException):
 class IncorrectRoomIDException(BookingAppException):
     status_code = status.HTTP_404_NOT_FOUND
     detail = "The room not found by id"
+
+
+class TooManyRequestsException(BookingAppException):
+    """The client should retry the request after the given number of seconds"""
+    status_code = status.HTTP_429_TOO_MANY_REQUESTS
+
+    def __init__(self, retry_after: int):
+        super().__init__()
+        self.headers = {"Retry-After": str(retry_after)}
+
+
+class TooManyLoginAttemptsException(TooManyRequestsException):
+    detail = "Too many login attempts, try again later"
+
+
+class PasswordHashingOverloadedException(TooManyRequestsException):
+    detail = "Too many passwords are being checked, try again later"
@@ -1,15 +1,12 @@
-import time
+import asyncio
 from contextlib import asynccontextmanager
 
 import sentry_sdk
 import uvicorn
-from fastapi import FastAPI, Request
+from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
-from fastapi_cache import FastAPICache
-from fastapi_cache.backends.redis import RedisBackend
 from fastapi_versioning import VersionedFastAPI
 from prometheus_fastapi_instrumentator import Instrumentator
-from redis import asyncio as aioredis
 from sqladmin import Admin
 
 from app.admin.auth import authentication_backend
@@ -21,8 +18,10 @@ from app.api.rooms import router as router_rooms
 from app.api.users import router as router_users
 from app.config import settings
 from app.database import engine
-from app.logger import logger
 from app.prometheus.prometheus import router as router_prometheus
+from app.utils.cache import response_cache
+from app.utils.cdn import cdn_purger
+from app.utils.timing import ServerTimingMiddleware
 
 # Init Sentry for monitoring server errors
 sentry_sdk.init(
@@ -43,11 +42,14 @@ async def lifespan(app: FastAPI) -> None:
     :param app: FastAPI instance
     :return: None
     """
-    logger.info("Initializing Redis")
-    redis = aioredis.from_url(settings.redis_url)
-    FastAPICache.init(RedisBackend(redis), prefix="cache")
-    logger.info("Redis initialized")
+    if response_cache.local is not None:
+        listener = asyncio.create_task(response_cache.listen_invalidations())
     yield
+    if response_cache.local is not None:
+        listener.cancel()
+    await response_cache.redis.close()
+    if cdn_purger is not None:
+        await cdn_purger.close()
 
 
 app = FastAPI()
@@ -90,21 +92,8 @@ admin.add_view(RoomsAdmin)
 admin.add_view(HotelsAdmin)
 
 
-@app.middleware("http")
-async def add_process_time_header(request: Request, call_next):
-    """
-    The function measures the execution time of each request
-    :param request: request instance
-    :param call_next: function which call API
-    :return: response to clients
-    """
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
-    logger.info(
-        "Requetst execution time", extra={"process_time": round(process_time, 4)}
-    )
-    return response
+# measure the phases of each request
+app.add_middleware(ServerTimingMiddleware)
 
 
 # setup prometheus
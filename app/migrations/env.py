@@ -7,7 +7,7 @@ from app.config import settings
 from app.database import Base
 from app.models.bookings import Bookings
 from app.models.hotels import Hotels
-from app.models.rooms import Rooms
+from app.models.rooms import RoomInventory, Rooms
 from app.models.users import RefreshSessions, Users
 
 # this is the Alembic Config object, which provides
@@ -0,0 +1,41 @@
+"""add room inventory
+
+Revision ID: 3f1c9a7e2b64
+Revises: 5244c847dcd6
+Create Date: 2026-10-18 09:35:12.604518
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3f1c9a7e2b64"
+down_revision = "5244c847dcd6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "room_inventory",
+        sa.Column("room_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("booked", sa.Integer(), server_default="0", nullable=False),
+        sa.CheckConstraint("booked >= 0", name="booked_non_negative"),
+        sa.ForeignKeyConstraint(["room_id"], ["rooms.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("room_id", "day"),
+    )
+    # fill the inventory with the days taken by the existing bookings
+    op.execute(
+        """
+        INSERT INTO room_inventory (room_id, day, booked)
+        SELECT bookings.room_id, bookings.date_from + nights.night, count(*)
+        FROM bookings
+        JOIN LATERAL generate_series(0, bookings.total_days) AS nights(night) ON true
+        GROUP BY bookings.room_id, bookings.date_from + nights.night
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("room_inventory")
@@ -0,0 +1,43 @@
+"""add bookings stay range
+
+Revision ID: 8b2d4e6f1a93
+Revises: 3f1c9a7e2b64
+Create Date: 2026-10-18 10:12:47.118904
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "8b2d4e6f1a93"
+down_revision = "3f1c9a7e2b64"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    op.add_column(
+        "bookings",
+        sa.Column(
+            "stay",
+            postgresql.DATERANGE(),
+            sa.Computed("daterange(date_from, date_to, '[]')"),
+            nullable=False,
+        ),
+    )
+    op.create_index(
+        "ix_bookings_room_id_stay",
+        "bookings",
+        ["room_id", "stay"],
+        unique=False,
+        postgresql_using="gist",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_bookings_room_id_stay", table_name="bookings", postgresql_using="gist"
+    )
+    op.drop_column("bookings", "stay")
@@ -0,0 +1,35 @@
+"""add hotels location trigram index
+
+Revision ID: c5a1e9d3b7f2
+Revises: 8b2d4e6f1a93
+Create Date: 2026-10-18 10:47:03.551720
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c5a1e9d3b7f2"
+down_revision = "8b2d4e6f1a93"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_hotels_location_trgm",
+        "hotels",
+        ["location"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"location": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_hotels_location_trgm",
+        table_name="hotels",
+        postgresql_using="gin",
+        postgresql_ops={"location": "gin_trgm_ops"},
+    )
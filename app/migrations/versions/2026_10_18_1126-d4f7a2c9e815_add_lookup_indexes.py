@@ -0,0 +1,36 @@
+"""add lookup indexes
+
+Revision ID: d4f7a2c9e815
+Revises: c5a1e9d3b7f2
+Create Date: 2026-10-18 11:26:41.208394
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d4f7a2c9e815"
+down_revision = "c5a1e9d3b7f2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_users_email_lower", "users", [sa.text("lower(email)")], unique=True
+    )
+    op.create_index(
+        op.f("ix_refresh_sessions_user_id"),
+        "refresh_sessions",
+        ["user_id"],
+        unique=False,
+    )
+    op.create_index(op.f("ix_rooms_hotel_id"), "rooms", ["hotel_id"], unique=False)
+    op.create_index(op.f("ix_bookings_user_id"), "bookings", ["user_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_bookings_user_id"), table_name="bookings")
+    op.drop_index(op.f("ix_rooms_hotel_id"), table_name="rooms")
+    op.drop_index(op.f("ix_refresh_sessions_user_id"), table_name="refresh_sessions")
+    op.drop_index("ix_users_email_lower", table_name="users")
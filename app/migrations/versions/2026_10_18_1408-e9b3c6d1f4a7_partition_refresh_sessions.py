@@ -0,0 +1,118 @@
+"""partition refresh sessions
+
+Revision ID: e9b3c6d1f4a7
+Revises: d4f7a2c9e815
+Create Date: 2026-10-18 14:08:12.530271
+
+The sessions are partitioned by days only on request,
+so that the expired partitions are dropped at once,
+there is no default partition, since the expired partitions
+are detached concurrently, the partitions of the next days
+are created in advance by the purge task:
+alembic -x partition_refresh_sessions=true upgrade head
+
+"""
+from datetime import datetime, timedelta, timezone
+
+import sqlalchemy as sa
+from alembic import context, op
+
+# revision identifiers, used by Alembic.
+revision = "e9b3c6d1f4a7"
+down_revision = "d4f7a2c9e815"
+branch_labels = None
+depends_on = None
+
+ACTIVE_SESSION = "created_at + make_interval(secs => expires_in) > now()"
+PARTITIONS_AHEAD_DAYS = 7
+INDEXES = ("id", "refresh_token", "user_id")
+
+
+def partitioning_requested() -> bool:
+    option = context.get_x_argument(as_dictionary=True).get(
+        "partition_refresh_sessions"
+    )
+    return (option or "").lower() in ("1", "true", "yes")
+
+
+def is_partitioned() -> bool:
+    is_partitioned_table = sa.text(
+        "SELECT relkind = 'p' FROM pg_class " "WHERE oid = 'refresh_sessions'::regclass"
+    )
+    return op.get_bind().execute(is_partitioned_table).scalar()
+
+
+def move_sessions_to(partitioned: bool) -> None:
+    """Recreates the table, keeping the active sessions and the id sequence"""
+    for column in INDEXES:
+        op.drop_index(
+            op.f(f"ix_refresh_sessions_{column}"), table_name="refresh_sessions"
+        )
+    op.execute("ALTER TABLE refresh_sessions RENAME TO refresh_sessions_old")
+    op.execute(
+        "ALTER TABLE refresh_sessions_old "
+        "RENAME CONSTRAINT refresh_sessions_pkey TO refresh_sessions_old_pkey"
+    )
+    op.execute("ALTER SEQUENCE refresh_sessions_id_seq OWNED BY NONE")
+    # the primary key of a partitioned table must include the partition key
+    op.execute(
+        "CREATE TABLE refresh_sessions ("
+        "id INTEGER NOT NULL DEFAULT nextval('refresh_sessions_id_seq'), "
+        "refresh_token UUID NOT NULL, "
+        "expires_in INTEGER NOT NULL, "
+        "created_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL, "
+        "user_id INTEGER NOT NULL, "
+        "CONSTRAINT refresh_sessions_user_id_fkey FOREIGN KEY (user_id) "
+        "REFERENCES users (id) ON DELETE CASCADE, "
+        + (
+            "PRIMARY KEY (id, created_at)) PARTITION BY RANGE (created_at)"
+            if partitioned
+            else "PRIMARY KEY (id))"
+        )
+    )
+    op.execute("ALTER SEQUENCE refresh_sessions_id_seq OWNED BY refresh_sessions.id")
+    if partitioned:
+        create_partitions()
+    op.execute(
+        "INSERT INTO refresh_sessions "
+        "(id, refresh_token, expires_in, created_at, user_id) "
+        "SELECT id, refresh_token, expires_in, created_at, user_id "
+        f"FROM refresh_sessions_old WHERE {ACTIVE_SESSION}"
+    )
+    op.execute("DROP TABLE refresh_sessions_old")
+    for column in INDEXES:
+        op.create_index(
+            op.f(f"ix_refresh_sessions_{column}"),
+            "refresh_sessions",
+            [column],
+            unique=False,
+        )
+
+
+def create_partitions() -> None:
+    """Creates daily partitions from the oldest active session to the next week"""
+    today = datetime.now(timezone.utc).date()
+    oldest_session_day = sa.text(
+        "SELECT (min(created_at) AT TIME ZONE 'UTC')::date "
+        f"FROM refresh_sessions_old WHERE {ACTIVE_SESSION}"
+    )
+    first_day = op.get_bind().execute(oldest_session_day).scalar() or today
+    day = first_day
+    while day <= today + timedelta(days=PARTITIONS_AHEAD_DAYS):
+        next_day = day + timedelta(days=1)
+        op.execute(
+            f"CREATE TABLE refresh_sessions_p{day:%Y%m%d} "
+            "PARTITION OF refresh_sessions "
+            f"FOR VALUES FROM ('{day} 00:00:00+00') TO ('{next_day} 00:00:00+00')"
+        )
+        day = next_day
+
+
+def upgrade() -> None:
+    if partitioning_requested() and not is_partitioned():
+        move_sessions_to(partitioned=True)
+
+
+def downgrade() -> None:
+    if is_partitioned():
+        move_sessions_to(partitioned=False)
@@ -1,6 +1,7 @@
 from datetime import date
 
-from sqlalchemy import Computed, ForeignKey
+from sqlalchemy import DDL, Computed, ForeignKey, Index, event
+from sqlalchemy.dialects.postgresql import DATERANGE, Range
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -8,18 +9,35 @@ from app.database import Base
 
 class Bookings(Base):
     __tablename__ = "bookings"
+    __table_args__ = (
+        Index("ix_bookings_room_id_stay", "room_id", "stay", postgresql_using="gist"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     room_id: Mapped[int] = mapped_column(ForeignKey("rooms.id", ondelete="CASCADE"))
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), index=True
+    )
     date_from: Mapped[date]
     date_to: Mapped[date]
     price: Mapped[int]
     total_cost: Mapped[int] = mapped_column(Computed("(date_to - date_from) * price"))
     total_days: Mapped[int] = mapped_column(Computed("date_to - date_from"))
+    # both dates of the stay are taken, so the range includes its upper bound
+    stay: Mapped[Range[date]] = mapped_column(
+        DATERANGE, Computed("daterange(date_from, date_to, '[]')")
+    )
 
     users = relationship("Users", back_populates="bookings")
     rooms = relationship("Rooms", back_populates="bookings")
 
     def __str__(self):
         return f"Booking #{self.id}"
+
+
+# GiST index on (room_id, stay) needs the btree_gist operator classes for integers
+event.listen(
+    Bookings.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist"),
+)
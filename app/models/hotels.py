@@ -1,6 +1,6 @@
 from typing import Any, Optional
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import DDL, ForeignKey, Index, event
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -8,6 +8,14 @@ from app.database import Base
 
 class Hotels(Base):
     __tablename__ = "hotels"
+    __table_args__ = (
+        Index(
+            "ix_hotels_location_trgm",
+            "location",
+            postgresql_using="gin",
+            postgresql_ops={"location": "gin_trgm_ops"},
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     owner_id: Mapped[int] = mapped_column(
@@ -23,3 +31,11 @@ class Hotels(Base):
 
     def __str__(self):
         return f"id: {self.id}, name: {self.name}"
+
+
+# trigram index serves both ILIKE '%...%' and similarity search by location
+event.listen(
+    Hotels.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"),
+)
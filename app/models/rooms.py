@@ -1,6 +1,7 @@
+from datetime import date
 from typing import Any, Optional
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import CheckConstraint, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -10,7 +11,9 @@ class Rooms(Base):
     __tablename__ = "rooms"
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
-    hotel_id: Mapped[int] = mapped_column(ForeignKey("hotels.id", ondelete="CASCADE"))
+    hotel_id: Mapped[int] = mapped_column(
+        ForeignKey("hotels.id", ondelete="CASCADE"), index=True
+    )
     name: Mapped[str]
     description: Mapped[Optional[str]]
     price: Mapped[int]
@@ -23,3 +26,15 @@ class Rooms(Base):
 
     def __str__(self):
         return f"id: {self.id} name: {self.name}"
+
+
+class RoomInventory(Base):
+    """Number of booked rooms of each type for every day of a stay"""
+    __tablename__ = "room_inventory"
+    __table_args__ = (CheckConstraint("booked >= 0", name="booked_non_negative"),)
+
+    room_id: Mapped[int] = mapped_column(
+        ForeignKey("rooms.id", ondelete="CASCADE"), primary_key=True
+    )
+    day: Mapped[date] = mapped_column(primary_key=True)
+    booked: Mapped[int] = mapped_column(server_default="0")
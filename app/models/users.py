@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import ForeignKey, Integer, func
+from sqlalchemy import ForeignKey, Index, Integer, func
 from sqlalchemy.dialects.postgresql import ENUM, TIMESTAMP, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -23,6 +23,10 @@ class Users(Base):
         return f"User #{self.email}"
 
 
+# emails are looked up and kept unique regardless of their case
+Index("ix_users_email_lower", func.lower(Users.email), unique=True)
+
+
 class RefreshSessions(Base):
     __tablename__ = "refresh_sessions"
 
@@ -33,5 +37,5 @@ class RefreshSessions(Base):
         TIMESTAMP(timezone=True), server_default=func.now()
     )
     user_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey("users.id", ondelete="CASCADE")
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True
     )
@@ -0,0 +1,45 @@
+"""Application metrics, exposed together with the HTTP metrics on /metrics"""
+from prometheus_client import Counter, Gauge, Histogram
+
+access_token_cache_requests = Counter(
+    "access_token_cache_requests_total",
+    "Lookups of verified access tokens in the per-worker cache",
+    ["result"],
+)
+access_token_cache_size = Gauge(
+    "access_token_cache_size", "Verified access tokens kept in the per-worker cache"
+)
+response_cache_requests = Counter(
+    "response_cache_requests_total",
+    "Lookups of cached responses in the per-worker cache and in Redis",
+    ["endpoint", "result"],
+)
+response_cache_local_size = Gauge(
+    "response_cache_local_size", "Cached responses kept in the per-worker cache"
+)
+request_phase_duration = Histogram(
+    "request_phase_duration_seconds",
+    "Time of the requests spent in the auth, database, cache and serialization "
+    "phases and in the rest of the application",
+    ["phase"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+db_query_duration = Histogram(
+    "db_query_duration_seconds",
+    "Duration of the database queries by the repository method making them",
+    ["repository", "method"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+db_query_rows = Counter(
+    "db_query_rows_total",
+    "Rows returned by the database queries by the repository method making them",
+    ["repository", "method"],
+)
+password_hashing_queue_depth = Gauge(
+    "password_hashing_queue_depth",
+    "Password hashes and verifications waiting for a free hashing thread",
+)
+password_hashing_in_progress = Gauge(
+    "password_hashing_in_progress",
+    "Password hashes and verifications running in the hashing threads",
+)
@@ -1,6 +1,487 @@
-from app.models.users import RefreshSessions
+import copy
+import re
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Iterator, Optional
+
+from redis import asyncio as aioredis
+from sqlalchemy import (
+    DateTime,
+    column,
+    delete,
+    exists,
+    func,
+    insert,
+    literal,
+    select,
+    table,
+    text,
+    update,
+)
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+
+from app.database import engine
+from app.models.users import RefreshSessions, Users
+from app.repositories.users import UsersRepository
 from app.utils.repository import SQLAlchemyRepository
 
+# sessions expire in expires_in seconds after they are created
+session_expires_at = RefreshSessions.created_at + func.make_interval(
+    0, 0, 0, 0, 0, 0, RefreshSessions.expires_in
+)
+session_is_active = session_expires_at > func.now()
+
+# the purge task and the requests creating a missing partition don't race
+PARTITIONS_LOCK = 1_738_204_117
+
+
+class MissingPartitionError(Exception):
+    """The sessions are partitioned and the day of the session has no partition"""
+
+
+@contextmanager
+def detect_missing_partition() -> Iterator[None]:
+    """Tells the session of a day without a partition from other failures"""
+    try:
+        yield
+    except IntegrityError as error:
+        if error.orig.pgcode == "23514" and "no partition" in str(error.orig):
+            raise MissingPartitionError from error
+        raise
+
+
+class AbstractRefreshSessionsRepository(ABC):
+    """Refresh sessions of users, a session is found only by its token
+    and lives until it expires, is rotated, or is deleted"""
+    @abstractmethod
+    async def create_session(
+        self, refresh_token: uuid.UUID, user_id: int, expires_in: float
+    ) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def rotate_session(
+        self, refresh_token: str, new_refresh_token: uuid.UUID, expires_in: float
+    ) -> Optional[Users]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def pop_session(self, refresh_token: str) -> Optional[int]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_user_sessions(self, user_id: int) -> None:
+        raise NotImplementedError
 
-class AuthsRepository(SQLAlchemyRepository):
+    @abstractmethod
+    async def count_user_sessions(self, user_id: int) -> int:
+        raise NotImplementedError
+
+
+class AuthsRepository(SQLAlchemyRepository, AbstractRefreshSessionsRepository):
     model = RefreshSessions
+
+    async def create_session(
+        self, refresh_token: uuid.UUID, user_id: int, expires_in: float
+    ) -> None:
+        """
+        Creates a refresh session of the user
+        :param refresh_token:
+        :param user_id:
+        :param expires_in: seconds until the session expires
+        :return: None
+        """
+        query = insert(self.model).values(
+            refresh_token=refresh_token, expires_in=expires_in, user_id=user_id
+        )
+        with detect_missing_partition():
+            await self.session.execute(query)
+
+    async def rotate_session(
+        self, refresh_token: str, new_refresh_token: uuid.UUID, expires_in: float
+    ) -> Optional[Users]:
+        """
+        Replaces the token of an active session with a new one,
+        the session is prolonged from now, the user of the session
+        is returned by the same statement
+        :param refresh_token: current token of the session
+        :param new_refresh_token:
+        :param expires_in: seconds until the session expires
+        :return: user of the session, None if there is no active session
+        """
+        # the ORM update returns only its own entity, so the statement
+        # is built on the table and its rows are loaded as users
+        sessions = self.model.__table__
+        query = (
+            update(sessions)
+            .where(
+                sessions.c.refresh_token == refresh_token,
+                sessions.c.user_id == Users.id,
+                session_is_active,
+            )
+            .values(
+                refresh_token=new_refresh_token,
+                expires_in=expires_in,
+                created_at=func.now(),
+            )
+            .returning(*Users.__table__.c)
+        )
+        # the prolonged session is moved to the partition of today
+        with detect_missing_partition():
+            result = await self.session.execute(select(Users).from_statement(query))
+        return result.scalars().one_or_none()
+
+    async def pop_session(self, refresh_token: str) -> Optional[int]:
+        """
+        Deletes the session of the token
+        :param refresh_token:
+        :return: id of the session user, None if there is no session
+        """
+        query = (
+            delete(self.model)
+            .where(self.model.refresh_token == refresh_token)
+            .returning(self.model.user_id)
+        )
+        result = await self.session.execute(query)
+        return result.scalar()
+
+    async def delete_user_sessions(self, user_id: int) -> None:
+        """
+        Deletes all sessions of the user
+        :param user_id:
+        :return: None
+        """
+        await self.session.execute(delete(self.model).filter_by(user_id=user_id))
+
+    async def count_user_sessions(self, user_id: int) -> int:
+        """
+        Counts the active sessions of the user
+        :param user_id:
+        :return: int
+        """
+        query = (
+            select(func.count())
+            .select_from(self.model)
+            .where(
+                self.model.user_id == user_id,
+                session_is_active,
+            )
+        )
+        result = await self.session.execute(query)
+        return result.scalar()
+
+    async def delete_expired_sessions(self, batch_size: int) -> int:
+        """
+        Deletes a batch of expired sessions, the sessions locked
+        by other transactions are left for the next batch
+        :param batch_size:
+        :return: number of the deleted sessions
+        """
+        expired_sessions = (
+            select(self.model.id)
+            .where(~session_is_active)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        query = delete(self.model).where(
+            self.model.id.in_(expired_sessions.scalar_subquery())
+        )
+        result = await self.session.execute(query)
+        return result.rowcount
+
+    async def is_partitioned(self) -> bool:
+        """
+        Checks whether the sessions are partitioned by days
+        :return: bool
+        """
+        query = text(
+            "SELECT relkind = 'p' FROM pg_class "
+            "WHERE oid = 'refresh_sessions'::regclass"
+        )
+        result = await self.session.execute(query)
+        return result.scalar()
+
+    async def create_partitions(self, first_day: date, last_day: date) -> list[str]:
+        """
+        Creates the missing daily partitions, there is no default partition,
+        so the sessions of a day without a partition can't be created
+        :param first_day:
+        :param last_day: included
+        :return: names of the created partitions
+        """
+        await self.session.execute(select(func.pg_advisory_xact_lock(PARTITIONS_LOCK)))
+        created_partitions = []
+        day = first_day
+        while day <= last_day:
+            name, day_from, day_to = partition_of_day(day)
+            exists = await self.session.execute(
+                text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}
+            )
+            if not exists.scalar():
+                await self.session.execute(
+                    text(
+                        "CREATE TABLE "
+                        + quote_identifier(name)
+                        + " PARTITION OF refresh_sessions FOR VALUES FROM ("
+                        + quote_timestamp(day_from)
+                        + ") TO ("
+                        + quote_timestamp(day_to)
+                        + ")"
+                    )
+                )
+                created_partitions.append(name)
+            day += timedelta(days=1)
+        return created_partitions
+
+    async def drop_expired_partitions(self, today: date) -> list[str]:
+        """
+        Drops the partitions of the past days which have no active sessions,
+        a partition is detached concurrently first, so the sessions table
+        is not locked, this can't run in a transaction, so the partitions
+        are dropped on a connection of their own in the autocommit mode,
+        a detach interrupted before is finalized
+        :param today:
+        :return: names of the dropped partitions
+        """
+        dropped_partitions = []
+        async with engine.connect() as connection:
+            await connection.execution_options(isolation_level="AUTOCOMMIT")
+            partitions = await connection.execute(
+                text(
+                    "SELECT relname, inhdetachpending FROM pg_inherits "
+                    "JOIN pg_class ON pg_class.oid = inhrelid "
+                    "WHERE inhparent = 'refresh_sessions'::regclass"
+                )
+            )
+            for name, detach_pending in partitions.all():
+                match = PARTITION_NAME.fullmatch(name)
+                if match is None or date(*map(int, match.groups())) >= today:
+                    continue
+                partition = table(name, column("created_at"), column("expires_in"))
+                active_sessions = await connection.execute(
+                    select(
+                        exists().where(
+                            partition.c.created_at
+                            + func.make_interval(
+                                0, 0, 0, 0, 0, 0, partition.c.expires_in
+                            )
+                            > func.now()
+                        )
+                    )
+                )
+                if active_sessions.scalar():
+                    continue
+                detach = " FINALIZE" if detach_pending else " CONCURRENTLY"
+                await connection.execute(
+                    text(
+                        "ALTER TABLE refresh_sessions DETACH PARTITION "
+                        + quote_identifier(name)
+                        + detach
+                    )
+                )
+                await connection.execute(text("DROP TABLE " + quote_identifier(name)))
+                dropped_partitions.append(name)
+        return dropped_partitions
+
+
+# daily partitions of the sessions, by the creation time in UTC
+PARTITION_NAME = re.compile(r"refresh_sessions_p(\d{4})(\d{2})(\d{2})")
+# DDL statements can't have bind parameters, their values are quoted
+postgres_dialect = postgresql.dialect()
+
+
+def partition_of_day(day: date) -> tuple[str, datetime, datetime]:
+    """Returns the name and the bounds of the partition of the day"""
+    day_from = datetime.combine(day, time(), tzinfo=timezone.utc)
+    return f"refresh_sessions_p{day:%Y%m%d}", day_from, day_from + timedelta(days=1)
+
+
+def quote_identifier(name: str) -> str:
+    return postgres_dialect.identifier_preparer.quote_identifier(name)
+
+
+def quote_timestamp(value: datetime) -> str:
+    timestamp = literal(value, DateTime(timezone=True))
+    compiled = timestamp.compile(
+        dialect=postgres_dialect, compile_kwargs={"literal_binds": True}
+    )
+    return str(compiled)
+
+
+# KEYS[1] - session key, KEYS[2] - set of the user session tokens,
+# the set lives as long as the longest session of the user
+CREATE_SESSION_SCRIPT = """
+local ttl = tonumber(ARGV[3])
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ttl)
+redis.call('SADD', KEYS[2], ARGV[1])
+if redis.call('TTL', KEYS[2]) < ttl then
+    redis.call('EXPIRE', KEYS[2], ttl)
+end
+"""
+
+# KEYS[1] - session key, KEYS[2] - new session key,
+# KEYS[3] - set of the user session tokens, ARGV[1] - user id of the session,
+# the session is rotated only if it still belongs to the user
+ROTATE_SESSION_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+local ttl = tonumber(ARGV[4])
+redis.call('DEL', KEYS[1])
+redis.call('SET', KEYS[2], ARGV[1], 'EX', ttl)
+redis.call('SREM', KEYS[3], ARGV[2])
+redis.call('SADD', KEYS[3], ARGV[3])
+if redis.call('TTL', KEYS[3]) < ttl then
+    redis.call('EXPIRE', KEYS[3], ttl)
+end
+return 1
+"""
+
+# KEYS[1] - session key, KEYS[2] - set of the user session tokens,
+# ARGV[1] - user id of the session
+POP_SESSION_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+redis.call('SREM', KEYS[2], ARGV[2])
+return 1
+"""
+
+# KEYS[1] - set of the user session tokens, KEYS[2..] - keys of the sessions
+# of the tokens in ARGV, a session created meanwhile is kept
+DELETE_USER_SESSIONS_SCRIPT = """
+for i = 2, #KEYS do
+    redis.call('DEL', KEYS[i])
+    redis.call('SREM', KEYS[1], ARGV[i - 1])
+end
+"""
+
+# KEYS[1] - set of the user session tokens, KEYS[2..] - keys of the sessions
+# of the tokens in ARGV, tokens of the expired sessions are removed from the set
+COUNT_USER_SESSIONS_SCRIPT = """
+local total = 0
+for i = 2, #KEYS do
+    if redis.call('EXISTS', KEYS[i]) == 1 then
+        total = total + 1
+    else
+        redis.call('SREM', KEYS[1], ARGV[i - 1])
+    end
+end
+return total
+"""
+
+
+class RedisAuthsRepository(AbstractRefreshSessionsRepository):
+    """Refresh sessions in Redis, a session is a key with the user id
+    which expires together with the session, tokens of the user sessions
+    are kept in a set to delete all of them at once, the scripts receive
+    all their keys, so the keys depending on the stored user id or tokens
+    are read first, a rotation or a pop is then a GET and a script call,
+    two round trips of O(1) commands, the script checks the user id again,
+    so the session changed meanwhile is left as it is, the user
+    of a rotated session is loaded from the database by the users repository"""
+    def __init__(
+        self,
+        redis: aioredis.Redis,
+        prefix: str = "refresh_session",
+        users: Optional[UsersRepository] = None,
+    ):
+        self.redis = redis
+        self.prefix = prefix
+        self.users = users
+        self.create_session_script = redis.register_script(CREATE_SESSION_SCRIPT)
+        self.rotate_session_script = redis.register_script(ROTATE_SESSION_SCRIPT)
+        self.pop_session_script = redis.register_script(POP_SESSION_SCRIPT)
+        self.delete_user_sessions_script = redis.register_script(
+            DELETE_USER_SESSIONS_SCRIPT
+        )
+        self.count_user_sessions_script = redis.register_script(
+            COUNT_USER_SESSIONS_SCRIPT
+        )
+
+    def with_users(self, users: UsersRepository) -> "RedisAuthsRepository":
+        """
+        The repository shared by the transactions, the users of the rotated
+        sessions are loaded by the users repository of a transaction
+        :param users:
+        :return: RedisAuthsRepository with the same scripts
+        """
+        repository = copy.copy(self)
+        repository.users = users
+        return repository
+
+    async def create_session(
+        self, refresh_token: uuid.UUID, user_id: int, expires_in: float
+    ) -> None:
+        await self.create_session_script(
+            keys=[self._session_key(refresh_token), self._user_sessions_key(user_id)],
+            args=[str(refresh_token), user_id, int(expires_in)],
+        )
+
+    async def rotate_session(
+        self, refresh_token: str, new_refresh_token: uuid.UUID, expires_in: float
+    ) -> Optional[Users]:
+        session_key = self._session_key(refresh_token)
+        user_id = await self.redis.get(session_key)
+        if user_id is None:
+            return None
+        rotated = await self.rotate_session_script(
+            keys=[
+                session_key,
+                self._session_key(new_refresh_token),
+                self._user_sessions_key(int(user_id)),
+            ],
+            args=[
+                user_id,
+                str(refresh_token),
+                str(new_refresh_token),
+                int(expires_in),
+            ],
+        )
+        if not rotated:
+            return None
+        return await self.users.find_one_or_none(id=int(user_id))
+
+    async def pop_session(self, refresh_token: str) -> Optional[int]:
+        session_key = self._session_key(refresh_token)
+        user_id = await self.redis.get(session_key)
+        if user_id is None:
+            return None
+        popped = await self.pop_session_script(
+            keys=[session_key, self._user_sessions_key(int(user_id))],
+            args=[user_id, str(refresh_token)],
+        )
+        return int(user_id) if popped else None
+
+    async def delete_user_sessions(self, user_id: int) -> None:
+        keys, tokens = await self._user_sessions(user_id)
+        if tokens:
+            await self.delete_user_sessions_script(keys=keys, args=tokens)
+
+    async def count_user_sessions(self, user_id: int) -> int:
+        keys, tokens = await self._user_sessions(user_id)
+        if not tokens:
+            return 0
+        return await self.count_user_sessions_script(keys=keys, args=tokens)
+
+    async def _user_sessions(self, user_id: int) -> tuple[list[str], list[str]]:
+        """
+        :param user_id:
+        :return: the key of the user session tokens with the keys
+        of their sessions, the tokens
+        """
+        user_sessions_key = self._user_sessions_key(user_id)
+        tokens = [
+            token.decode() for token in await self.redis.smembers(user_sessions_key)
+        ]
+        return [user_sessions_key, *map(self._session_key, tokens)], tokens
+
+    def _session_key(self, refresh_token) -> str:
+        return f"{self.prefix}:{refresh_token}"
+
+    def _user_sessions_key(self, user_id: int) -> str:
+        return f"{self.prefix}:user:{user_id}"
@@ -1,49 +1,165 @@
 from datetime import date
 from typing import Optional
 
-from sqlalchemy import func, select
+from sqlalchemy import Date, delete, func, literal, select, true, update
+from sqlalchemy.dialects.postgresql import insert
 
-from app.logger import logger
 from app.models.bookings import Bookings
-from app.models.rooms import Rooms
+from app.models.rooms import RoomInventory, Rooms
 from app.schemas.booking import SBookingsResponse
 from app.utils.repository import SQLAlchemyRepository
 
 
 class BookingsRepository(SQLAlchemyRepository):
     model = Bookings
+    # the first key of the advisory locks taken on rooms
+    room_locks = 1
 
     async def get_rooms_left(self, room_id: int, date_from: date, date_to: date) -> int:
-        logger.info("The database query begins to generate")
         booked_rooms = (
-            select(self.model)
+            select(func.max(RoomInventory.booked))
             .where(
-                (self.model.room_id == room_id)
-                & (self.model.date_from <= date_to)
-                & (self.model.date_to >= date_from)
+                (RoomInventory.room_id == room_id)
+                & (RoomInventory.day.between(date_from, date_to))
             )
-            .cte("booked_rooms")
+            .scalar_subquery()
         )
-        get_rooms_left = (
-            select((Rooms.quantity - func.count(booked_rooms.c.room_id)))
-            .select_from(Rooms)
-            .join(booked_rooms, booked_rooms.c.room_id == Rooms.id, isouter=True)
-            .where(Rooms.id == room_id)
-            .group_by(Rooms.quantity, booked_rooms.c.room_id)
+        get_rooms_left = select(Rooms.quantity - func.coalesce(booked_rooms, 0)).where(
+            Rooms.id == room_id
         )
         rooms_left = await self.session.execute(get_rooms_left)
-        logger.info("Database query successfully completed")
         return rooms_left.scalar()
 
-    async def get_room_price(self, room_id: int) -> int:
-        logger.info("The database query begins to generate")
-        room_price = select(Rooms.price).filter_by(id=room_id)
-        price = await self.session.execute(room_price)
-        logger.info("Database query successfully completed")
-        return price.scalar()
+    async def add_booking(
+        self,
+        room_id: int,
+        user_id: int,
+        date_from: date,
+        date_to: date,
+        lock_room: bool = False,
+    ) -> Optional[tuple[Bookings, int]]:
+        """
+        Reserves the days of the stay and inserts the booking at the current
+        room price in one statement, returns None if the room does not exist
+        or is fully booked for at least one day, in the latter case
+        the reservation must be rolled back together with the transaction,
+        with lock_room the room row is locked first, so all bookings
+        of the room are made one after another
+        :param room_id:
+        :param user_id:
+        :param date_from:
+        :param date_to:
+        :param lock_room:
+        :return: the booking with the hotel id of the room
+        """
+        room = select(Rooms.id, Rooms.hotel_id, Rooms.price, Rooms.quantity).where(
+            Rooms.id == room_id
+        )
+        if lock_room:
+            room = room.with_for_update()
+        room = room.cte("room")
+        reserved_days = self._reserve_days(room, date_from, date_to).cte(
+            "reserved_days"
+        )
+        booked_rooms = select(func.max(reserved_days.c.booked)).scalar_subquery()
+        new_booking = select(
+            room.c.id,
+            literal(user_id),
+            literal(date_from, Date),
+            literal(date_to, Date),
+            room.c.price,
+        ).where(room.c.quantity >= booked_rooms)
+        # the ORM insert returns only its own entity, so the statement
+        # is built on the table and its rows are loaded as bookings
+        bookings = self.model.__table__
+        hotel_id = select(room.c.hotel_id).scalar_subquery().label("hotel_id")
+        add_booking = (
+            insert(bookings)
+            .from_select(
+                ["room_id", "user_id", "date_from", "date_to", "price"], new_booking
+            )
+            .returning(*bookings.c, hotel_id)
+        )
+        result = await self.session.execute(
+            select(self.model, hotel_id).from_statement(add_booking)
+        )
+        return result.one_or_none()
+
+    async def delete_booking(
+        self, booking_id: int, user_id: int
+    ) -> Optional[tuple[Bookings, int]]:
+        """
+        Deletes the booking of the user
+        :param booking_id:
+        :param user_id:
+        :return: the deleted booking with the hotel id of its room,
+        None if the user has no such booking
+        """
+        bookings = self.model.__table__
+        delete_booking = (
+            delete(bookings)
+            .where(
+                bookings.c.id == booking_id,
+                bookings.c.user_id == user_id,
+                bookings.c.room_id == Rooms.id,
+            )
+            .returning(*bookings.c, Rooms.hotel_id)
+        )
+        result = await self.session.execute(
+            select(self.model, Rooms.hotel_id).from_statement(delete_booking)
+        )
+        return result.one_or_none()
+
+    async def lock_room(self, room_id: int) -> None:
+        """
+        Takes an advisory lock of the room until the end of the transaction,
+        bookings of the room wait for each other, other rooms are not blocked
+        :param room_id:
+        :return: None
+        """
+        lock_room = select(func.pg_advisory_xact_lock(self.room_locks, room_id))
+        await self.session.execute(lock_room)
+
+    async def release_room(self, room_id: int, date_from: date, date_to: date) -> None:
+        release_days = (
+            update(RoomInventory)
+            .where(
+                (RoomInventory.room_id == room_id)
+                & (RoomInventory.day.between(date_from, date_to))
+            )
+            .values(booked=RoomInventory.booked - 1)
+        )
+        await self.session.execute(release_days)
+
+    async def release_user_rooms(self, user_id: int) -> None:
+        """
+        Frees the days taken by all bookings of the user,
+        must be called before the user and his bookings are deleted
+        :param user_id:
+        :return: None
+        """
+        booked_days = self._get_booked_days(self.model.user_id == user_id).subquery(
+            "booked_days"
+        )
+        release_days = (
+            update(RoomInventory)
+            .where(
+                (RoomInventory.room_id == booked_days.c.room_id)
+                & (RoomInventory.day == booked_days.c.day)
+            )
+            .values(booked=RoomInventory.booked - booked_days.c.booked)
+        )
+        await self.session.execute(release_days)
+
+    async def rebuild_room_inventory(self) -> None:
+        """Recalculates the whole room inventory from the bookings table"""
+        await self.session.execute(delete(RoomInventory))
+        fill_inventory = insert(RoomInventory).from_select(
+            ["room_id", "day", "booked"], self._get_booked_days()
+        )
+        await self.session.execute(fill_inventory)
 
     async def get_bookings(self, user_id: int) -> Optional[list[SBookingsResponse]]:
-        logger.info("The database query begins to generate")
         get_bookings = (
             select(
                 self.model.id,
@@ -54,6 +170,7 @@ class BookingsRepository(SQLAlchemyRepository):
                 self.model.price,
                 self.model.total_cost,
                 self.model.total_days,
+                Rooms.hotel_id,
                 Rooms.image_path,
                 Rooms.name,
                 Rooms.description,
@@ -64,5 +181,46 @@ class BookingsRepository(SQLAlchemyRepository):
             .where(self.model.user_id == user_id)
         )
         result = await self.session.execute(get_bookings)
-        logger.info("Database query successfully completed")
         return result.mappings().all()
+
+    @staticmethod
+    def _reserve_days(room, date_from: date, date_to: date):
+        """
+        Returns a statement which takes one more room for every day of the stay
+        and returns the booked rooms of these days, nothing is taken
+        if the room subquery is empty
+        """
+        nights = (
+            func.generate_series(0, (date_to - date_from).days)
+            .table_valued("night")
+            .render_derived("nights")
+        )
+        booked_days = select(
+            room.c.id, literal(date_from, Date) + nights.c.night, literal(1)
+        ).join(nights, true())
+        return (
+            insert(RoomInventory)
+            .from_select(["room_id", "day", "booked"], booked_days)
+            .on_conflict_do_update(
+                index_elements=[RoomInventory.room_id, RoomInventory.day],
+                set_={"booked": RoomInventory.booked + 1},
+            )
+            .returning(RoomInventory.booked)
+        )
+
+    def _get_booked_days(self, *criteria):
+        """Returns a query which counts bookings of every room for every day"""
+        nights = (
+            func.generate_series(0, self.model.total_days)
+            .table_valued("night")
+            .render_derived()
+            .lateral("nights")
+        )
+        day = (self.model.date_from + nights.c.night).label("day")
+        return (
+            select(self.model.room_id, day, func.count().label("booked"))
+            .select_from(self.model)
+            .join(nights, true())
+            .where(*criteria)
+            .group_by(self.model.room_id, day)
+        )
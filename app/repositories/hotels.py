@@ -3,7 +3,6 @@ from typing import Optional
 
 from sqlalchemy import func, select
 
-from app.logger import logger
 from app.models.bookings import Bookings
 from app.models.hotels import Hotels
 from app.models.rooms import Rooms
@@ -15,19 +14,45 @@ class HotelsRepository(SQLAlchemyRepository):
     model = Hotels
 
     async def get_hotels_by_location_and_time(
-        self, location: str, date_from: date, date_to: date
+        self,
+        location: str,
+        date_from: date,
+        date_to: date,
+        fuzzy: bool = False,
+        include_fully_booked: bool = False,
     ) -> Optional[list[SHotelsResponse]]:
-        logger.info("The database query begins to generate")
+        """
+        Returns hotels with free rooms whose location contains the searched text,
+        in fuzzy mode the location only has to contain a word similar
+        to the searched text and the hotels are ranked by this similarity,
+        both modes are served by the trigram index on hotels.location
+        :param location:
+        :param date_from:
+        :param date_to:
+        :param fuzzy:
+        :param include_fully_booked: also return the hotels without free rooms
+        :return: Optional[list[SHotelsResponse]]
+        """
+        location_filter = self._filter_location(location=location, fuzzy=fuzzy)
 
+        # bookings are counted only for the rooms of the found hotels,
+        # so the planner can probe the (room_id, stay) GiST index per room
         get_booked_rooms = (
             select(Rooms.hotel_id, func.count().label("booked_rooms"))
             .select_from(Bookings)
             .join(Rooms, Bookings.room_id == Rooms.id)
-            .where((Bookings.date_from <= date_to) & (Bookings.date_to >= date_from))
+            .join(self.model, Rooms.hotel_id == self.model.id)
+            .where(
+                (location_filter)
+                & (Bookings.stay.overlaps(func.daterange(date_from, date_to, "[]")))
+            )
             .group_by(Rooms.hotel_id)
             .subquery("booked_rooms")
         )
 
+        rooms_left = self.model.rooms_quantity - func.coalesce(
+            get_booked_rooms.c.booked_rooms, 0
+        )
         get_available_hotels = (
             select(
                 self.model.id,
@@ -36,24 +61,24 @@ class HotelsRepository(SQLAlchemyRepository):
                 self.model.services,
                 self.model.rooms_quantity,
                 self.model.image_path,
-                (
-                    self.model.rooms_quantity
-                    - func.coalesce(get_booked_rooms.c.booked_rooms, 0)
-                ).label("rooms_left"),
+                rooms_left.label("rooms_left"),
             )
             .select_from(self.model)
             .outerjoin(get_booked_rooms, self.model.id == get_booked_rooms.c.hotel_id)
-            .where(
-                (self.model.location.ilike(f"%{location}%"))
-                & (
-                    (
-                        self.model.rooms_quantity
-                        - func.coalesce(get_booked_rooms.c.booked_rooms, 0)
-                    )
-                    > 0
-                )
-            )
+            .where(location_filter)
         )
+        if not include_fully_booked:
+            get_available_hotels = get_available_hotels.where(rooms_left > 0)
+        if fuzzy:
+            get_available_hotels = get_available_hotels.order_by(
+                func.word_similarity(location, self.model.location).desc()
+            )
         available_hotels = await self.session.execute(get_available_hotels)
-        logger.info("Database query successfully completed")
         return available_hotels.mappings().all()
+
+    def _filter_location(self, location: str, fuzzy: bool):
+        if fuzzy:
+            # same as word_similarity(location, hotels.location) exceeding
+            # the pg_trgm.word_similarity_threshold setting
+            return self.model.location.op("%>")(location)
+        return self.model.location.ilike(f"%{location}%")
@@ -3,9 +3,8 @@ from typing import Optional
 
 from sqlalchemy import func, select
 
-from app.models.bookings import Bookings
 from app.models.hotels import Hotels
-from app.models.rooms import Rooms
+from app.models.rooms import RoomInventory, Rooms
 from app.schemas.rooms import SRoomResponse
 from app.utils.repository import SQLAlchemyRepository
 
@@ -17,11 +16,17 @@ class RoomsRepository(SQLAlchemyRepository):
         self, hotel_id: int, date_from: date, date_to: date
     ) -> Optional[list[SRoomResponse]]:
         get_booked_rooms = (
-            select(self.model.id, func.count().label("booked_rooms"))
-            .select_from(self.model)
-            .join(Bookings, Bookings.room_id == self.model.id)
-            .where((Bookings.date_from <= date_to) & (Bookings.date_to >= date_from))
-            .group_by(self.model.id)
+            select(
+                RoomInventory.room_id,
+                func.max(RoomInventory.booked).label("booked_rooms"),
+            )
+            .select_from(RoomInventory)
+            .join(self.model, RoomInventory.room_id == self.model.id)
+            .where(
+                (self.model.hotel_id == hotel_id)
+                & (RoomInventory.day.between(date_from, date_to))
+            )
+            .group_by(RoomInventory.room_id)
             .subquery("booked_rooms")
         )
         get_available_rooms = (
@@ -41,7 +46,7 @@ class RoomsRepository(SQLAlchemyRepository):
                 ).label("rooms_left"),
             )
             .select_from(self.model)
-            .outerjoin(get_booked_rooms, self.model.id == get_booked_rooms.c.id)
+            .outerjoin(get_booked_rooms, self.model.id == get_booked_rooms.c.room_id)
             .where(
                 (self.model.hotel_id == hotel_id)
                 & (
@@ -1,8 +1,8 @@
 from typing import Optional
 
-from sqlalchemy import select
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
 
-from app.logger import logger
 from app.models.users import Users
 from app.utils.repository import SQLAlchemyRepository
 
@@ -11,8 +11,37 @@ class UsersRepository(SQLAlchemyRepository):
     model = Users
 
     async def get_users_list(self, offset: int, limit: int) -> Optional[list[Users]]:
-        logger.info("The database query begins to generate")
         query = select(self.model).offset(offset).limit(limit)
         users = await self.session.execute(query)
-        logger.info("Database query successfully completed")
         return users.scalars().all()
+
+    async def find_by_email(self, email: str) -> Optional[Users]:
+        """
+        Finds the user regardless of the case of the email,
+        the lookup is served by the unique index on lower(email)
+        :param email:
+        :return: Optional[Users]
+        """
+        query = select(self.model).where(func.lower(self.model.email) == email.lower())
+        user = await self.session.execute(query)
+        return user.scalars().one_or_none()
+
+    async def add_user(
+        self, email: str, hashed_password: str, role: str
+    ) -> Optional[Users]:
+        """
+        Inserts the user unless the email is already taken in any case,
+        the check and the insert are a single statement
+        :param email:
+        :param hashed_password:
+        :param role:
+        :return: the new user, None if the email exists
+        """
+        query = (
+            insert(self.model)
+            .values(email=email, hashed_password=hashed_password, role=role)
+            .on_conflict_do_nothing(index_elements=[func.lower(self.model.email)])
+            .returning(self.model)
+        )
+        user = await self.session.execute(query)
+        return user.scalars().one_or_none()
@@ -0,0 +1,84 @@
+"""
+Copies the active refresh sessions from Postgres to Redis,
+run it before switching REFRESH_SESSION_BACKEND to redis:
+python -m app.scripts.migrate_refresh_sessions [--delete]
+"""
+import argparse
+import asyncio
+import math
+from typing import Optional
+
+from sqlalchemy import delete, extract, func, select
+
+from app.database import async_session_maker
+from app.logger import logger
+from app.models.users import RefreshSessions
+from app.repositories.auths import (
+    RedisAuthsRepository,
+    session_expires_at,
+    session_is_active,
+)
+from app.utils.transaction_manager import redis_auths_repository
+
+BATCH_SIZE = 1000
+
+
+async def migrate_refresh_sessions(
+    repository: Optional[RedisAuthsRepository] = None,
+    delete_migrated: bool = False,
+) -> int:
+    """
+    Copies the active sessions in batches, every session keeps
+    the rest of its lifetime as the TTL in Redis
+    :param repository: where the sessions are copied
+    :param delete_migrated: delete the copied sessions from Postgres
+    :return: number of the copied sessions
+    """
+    if repository is None:
+        repository = redis_auths_repository
+    total_sessions, last_id = 0, 0
+    seconds_left = extract("epoch", session_expires_at - func.now())
+    while True:
+        async with async_session_maker() as session:
+            query = (
+                select(
+                    RefreshSessions.id,
+                    RefreshSessions.refresh_token,
+                    RefreshSessions.user_id,
+                    seconds_left,
+                )
+                .where(RefreshSessions.id > last_id, session_is_active)
+                .order_by(RefreshSessions.id)
+                .limit(BATCH_SIZE)
+            )
+            sessions = (await session.execute(query)).all()
+            if not sessions:
+                break
+            for _, refresh_token, user_id, expires_in in sessions:
+                await repository.create_session(
+                    refresh_token=refresh_token,
+                    user_id=user_id,
+                    expires_in=math.ceil(expires_in),
+                )
+            last_id = sessions[-1].id
+            if delete_migrated:
+                await session.execute(
+                    delete(RefreshSessions).where(
+                        RefreshSessions.id.in_([row.id for row in sessions])
+                    )
+                )
+                await session.commit()
+        total_sessions += len(sessions)
+        logger.info("Refresh sessions migrated", extra={"total": total_sessions})
+    return total_sessions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--delete",
+        action="store_true",
+        help="delete the copied sessions from Postgres",
+    )
+    args = parser.parse_args()
+    asyncio.run(migrate_refresh_sessions(delete_migrated=args.delete))
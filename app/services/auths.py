@@ -1,24 +1,31 @@
 import uuid
 from datetime import datetime, timedelta, timezone
+from typing import Optional
 
-from jose import jwt
+from jose import JWTError, jwt
 from pydantic import EmailStr, ValidationError
 
 from app.config import settings
 from app.exceptions import (
     IncorrectCredentials,
     IncorrectEmailOrPasswordException,
-    InvalidTokenUserIDException,
     TokenAbsentException,
-    TokenExpiredException,
+    TooManyLoginAttemptsException,
     UserAlreadyExistException,
 )
 from app.logger import logger
 from app.models.users import Users
+from app.repositories.auths import MissingPartitionError
 from app.schemas.users import SToken, SUserLogin
 from app.utils.auth import get_password_hash, verify_password
+from app.utils.rate_limiter import login_limiter
+from app.utils.token_cache import access_token_cache
+from app.utils.token_denylist import token_denylist
 from app.utils.transaction_manager import ITransactionManager
 
+# daily partitions of refresh sessions are created in advance
+PARTITIONS_AHEAD_DAYS = 7
+
 
 class AuthsService:
 
@@ -29,111 +36,237 @@ class AuthsService:
         password: str,
         role: str,
     ) -> Users:
+        # the password is hashed before the transaction so that
+        # the connection is not held while bcrypt runs
+        hashed_password = await get_password_hash(password)
         async with transaction_manager:
-            existing_user = await transaction_manager.users.find_one_or_none(
-                email=email
+            new_user = await transaction_manager.users.add_user(
+                email=email, hashed_password=hashed_password, role=role
             )
-            if existing_user:
+            if new_user is None:
                 logger.warning("User already exists")
                 raise UserAlreadyExistException
-            hashed_password = get_password_hash(password)
-            new_user = await transaction_manager.users.insert_data(
-                email=email, hashed_password=hashed_password, role=role
-            )
             await transaction_manager.commit()
             return new_user
 
     async def login_user(
-        self, transaction_manager: ITransactionManager, password: str, email: EmailStr
+        self,
+        transaction_manager: ITransactionManager,
+        password: str,
+        email: EmailStr,
+        client_ip: Optional[str] = None,
     ) -> tuple[SToken, Users]:
         self._validate_credentials(email=email, password=password)
+        await self._check_login_attempts(email=email, client_ip=client_ip)
+        async with transaction_manager:
+            existing_user = await transaction_manager.users.find_by_email(email=email)
+            await transaction_manager.commit()
+        # the connection is returned to the pool while the password is verified
+        await transaction_manager.release_connection()
+        user = await self._authenticate_user(
+            existing_user=existing_user, password=password
+        )
+        try:
+            return await self._start_session(transaction_manager, user)
+        except MissingPartitionError:
+            await self._create_missing_partitions(transaction_manager)
+            return await self._start_session(transaction_manager, user)
+
+    @staticmethod
+    async def logout_user(
+        transaction_manager: ITransactionManager,
+        token: str,
+        access_token: Optional[str] = None,
+    ) -> None:
+        async with transaction_manager:
+            if token:
+                await transaction_manager.auth.pop_session(refresh_token=token)
+                await transaction_manager.commit()
+        if access_token:
+            access_token_cache.evict_token(access_token)
+            try:
+                payload = jwt.decode(
+                    access_token,
+                    settings.JWT_SECRET_KEY,
+                    settings.HASHING_ALGORITHM,
+                    options={"verify_exp": False},
+                )
+            except JWTError:
+                return
+            if payload.get("jti") and payload.get("exp"):
+                await token_denylist.revoke_token(
+                    jti=payload["jti"], expires_at=payload["exp"]
+                )
+
+    async def refresh_token(
+        self, transaction_manager: ITransactionManager, token: str
+    ) -> SToken:
+        try:
+            return await self._rotate_session(transaction_manager, token)
+        except MissingPartitionError:
+            await self._create_missing_partitions(transaction_manager)
+            return await self._rotate_session(transaction_manager, token)
+
+    @staticmethod
+    async def abort_all_sessions(
+        transaction_manager: ITransactionManager, user_id: int
+    ) -> None:
+        async with transaction_manager:
+            await transaction_manager.auth.delete_user_sessions(user_id=user_id)
+            await transaction_manager.commit()
+        await token_denylist.revoke_user_tokens(user_id=user_id)
+        access_token_cache.evict_user_tokens(user_id=user_id)
+
+    @staticmethod
+    async def purge_expired_sessions(
+        transaction_manager: ITransactionManager, batch_size: int
+    ) -> int:
+        """
+        Deletes the expired refresh sessions from Postgres in short
+        transactions of batch_size sessions, when the sessions are
+        partitioned by days, the partitions of the next days are created
+        and the past ones without active sessions are dropped at once
+        :param transaction_manager:
+        :param batch_size:
+        :return: number of the sessions deleted in batches
+        """
+        today = datetime.now(timezone.utc).date()
         async with transaction_manager:
-            existing_user = await transaction_manager.users.find_one_or_none(
-                email=email
+            partitioned = await transaction_manager.auth.is_partitioned()
+            if partitioned:
+                await transaction_manager.auth.create_partitions(
+                    first_day=today,
+                    last_day=today + timedelta(days=PARTITIONS_AHEAD_DAYS),
+                )
+                await transaction_manager.commit()
+        if partitioned:
+            # the partitions are detached concurrently outside of the transaction
+            dropped_partitions = await transaction_manager.auth.drop_expired_partitions(
+                today=today
             )
-            user = self._authenticate_user(
-                existing_user=existing_user, password=password
+            logger.info(
+                "Expired partitions dropped", extra={"partitions": dropped_partitions}
             )
-            access_token = self._create_access_token(user.id)
+        total_deleted = 0
+        while True:
+            async with transaction_manager:
+                deleted = await transaction_manager.auth.delete_expired_sessions(
+                    batch_size=batch_size
+                )
+                await transaction_manager.commit()
+            total_deleted += deleted
+            if deleted < batch_size:
+                break
+        logger.info("Expired sessions deleted", extra={"total": total_deleted})
+        return total_deleted
+
+    async def _start_session(
+        self, transaction_manager: ITransactionManager, user: Users
+    ) -> tuple[SToken, Users]:
+        async with transaction_manager:
+            access_token = self._create_access_token(user)
             refresh_token = self._create_refresh_token()
             refresh_token_expires = timedelta(
                 minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
             )
-            await transaction_manager.auth.insert_data(
+            await transaction_manager.auth.create_session(
                 refresh_token=refresh_token,
-                expires_in=refresh_token_expires.total_seconds(),
                 user_id=user.id,
+                expires_in=refresh_token_expires.total_seconds(),
             )
             await transaction_manager.commit()
             token = SToken(access_token=access_token, refresh_token=refresh_token)
             return token, user
 
-    @staticmethod
-    async def logout_user(transaction_manager: ITransactionManager, token: str) -> None:
-        async with transaction_manager:
-            refresh_session = await transaction_manager.auth.find_one_or_none(
-                refresh_token=token
-            )
-            if refresh_session:
-                await transaction_manager.auth.delete(id=refresh_session.id)
-                await transaction_manager.commit()
-
-    async def refresh_token(
+    async def _rotate_session(
         self, transaction_manager: ITransactionManager, token: str
     ) -> SToken:
         async with transaction_manager:
-            refresh_session = await transaction_manager.auth.find_one_or_none(
-                refresh_token=token
-            )
-            if refresh_session is None:
+            if token is None:
                 raise TokenAbsentException
-            if datetime.now(timezone.utc) >= refresh_session.created_at + timedelta(
-                seconds=refresh_session.expires_in
-            ):
-                await transaction_manager.auth.delete(id=refresh_session.id)
-                raise TokenExpiredException
-
-            user = await transaction_manager.users.find_one_or_none(
-                id=refresh_session.user_id
-            )
-            if user is None:
-                raise InvalidTokenUserIDException
-
-            access_token = self._create_access_token(user.id)
             refresh_token_expires = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
             refresh_token = self._create_refresh_token()
-
-            await transaction_manager.auth.update_fields_by_id(
-                refresh_session.id,
-                refresh_token=refresh_token,
+            user = await transaction_manager.auth.rotate_session(
+                refresh_token=token,
+                new_refresh_token=refresh_token,
                 expires_in=refresh_token_expires.total_seconds(),
             )
+            # expired sessions are not found either
+            if user is None:
+                raise TokenAbsentException
+
+            access_token = self._create_access_token(user)
             await transaction_manager.commit()
             return SToken(access_token=access_token, refresh_token=refresh_token)
 
     @staticmethod
-    async def abort_all_sessions(
-        transaction_manager: ITransactionManager, user_id: int
+    async def _create_missing_partitions(
+        transaction_manager: ITransactionManager,
     ) -> None:
+        """
+        The partitions are created in advance by the purge task,
+        when it has not run for PARTITIONS_AHEAD_DAYS days,
+        the request needing a partition creates them
+        :param transaction_manager:
+        :return: None
+        """
+        logger.error("Refresh sessions partition is missing, the purge task is late")
+        today = datetime.now(timezone.utc).date()
         async with transaction_manager:
-            await transaction_manager.auth.delete(user_id=user_id)
+            await transaction_manager.auth.create_partitions(
+                first_day=today,
+                last_day=today + timedelta(days=PARTITIONS_AHEAD_DAYS),
+            )
             await transaction_manager.commit()
 
     @staticmethod
-    def _authenticate_user(existing_user: Users, password: str) -> Users:
+    async def _check_login_attempts(email: str, client_ip: Optional[str]) -> None:
+        """
+        Takes a login attempt of the email and of the client ip,
+        the attempts are taken before the password is checked
+        so that brute force does not load the hashing threads
+        :param email:
+        :param client_ip:
+        :return: None
+        """
+        limits = [(f"email:{email.lower()}", settings.LOGIN_ATTEMPTS_PER_EMAIL)]
+        if client_ip:
+            limits.append((f"ip:{client_ip}", settings.LOGIN_ATTEMPTS_PER_IP))
+        for key, capacity in limits:
+            retry_after = await login_limiter.acquire(key=key, capacity=capacity)
+            if retry_after:
+                logger.warning("Too many login attempts", extra={"key": key})
+                raise TooManyLoginAttemptsException(retry_after=retry_after)
+
+    @staticmethod
+    async def _authenticate_user(existing_user: Users, password: str) -> Users:
         if existing_user:
-            password_is_valid = verify_password(password, existing_user.hashed_password)
+            password_is_valid = await verify_password(
+                password, existing_user.hashed_password
+            )
             if password_is_valid:
                 return existing_user
         logger.warning("Incorrect email or password")
         raise IncorrectEmailOrPasswordException
 
     @staticmethod
-    def _create_access_token(user_id: int) -> str:
-        expire = datetime.utcnow() + timedelta(
-            minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
-        )
-        to_encode = {"sub": str(user_id), "exp": expire}
+    def _create_access_token(user: Users) -> str:
+        """
+        The token carries everything needed to authorize the user,
+        so authenticated requests do not query the database
+        :param user:
+        :return: str
+        """
+        issued_at = datetime.now(timezone.utc)
+        expire = issued_at + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        to_encode = {
+            "sub": str(user.id),
+            "role": user.role,
+            "email": user.email,
+            "jti": uuid.uuid4().hex,
+            "iat": issued_at.timestamp(),
+            "exp": expire,
+        }
         encoded_jwt = jwt.encode(
             to_encode, settings.JWT_SECRET_KEY, settings.HASHING_ALGORITHM
         )
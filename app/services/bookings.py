@@ -3,12 +3,17 @@ from typing import Optional
 
 from pydantic import EmailStr
 
-from app.exceptions import IncorrectBookingIdException, RoomCanNotBeBookedException
+from app.config import settings
+from app.exceptions import (
+    IncorrectBookingIdException,
+    IncorrectRoomIDException,
+    RoomCanNotBeBookedException,
+)
 from app.logger import logger
 from app.schemas.booking import SBookingResponse, SBookingsResponse
-from app.services.rooms import RoomsService
 from app.tasks.tasks import send_booking_confirmation_email
 from app.utils.base import Base
+from app.utils.cache import days_tags, hotel_days_tags, response_cache
 from app.utils.transaction_manager import ITransactionManager
 
 
@@ -45,8 +50,8 @@ class BookingsService:
         transaction_manager: ITransactionManager, booking_id: int, user_id: int
     ) -> SBookingResponse:
         async with transaction_manager:
-            deleted_booking = await transaction_manager.bookings.delete(
-                id=booking_id, user_id=user_id
+            deleted_booking = await transaction_manager.bookings.delete_booking(
+                booking_id=booking_id, user_id=user_id
             )
             if not deleted_booking:
                 logger.warning(
@@ -54,7 +59,19 @@ class BookingsService:
                     extra={"user_id": user_id, "booking_id": booking_id},
                 )
                 raise IncorrectBookingIdException
+            deleted_booking, hotel_id = deleted_booking
+            await transaction_manager.bookings.release_room(
+                room_id=deleted_booking.room_id,
+                date_from=deleted_booking.date_from,
+                date_to=deleted_booking.date_to,
+            )
             await transaction_manager.commit()
+            await response_cache.invalidate(
+                *hotel_days_tags(
+                    hotel_id, deleted_booking.date_from, deleted_booking.date_to
+                ),
+                *days_tags(deleted_booking.date_from, deleted_booking.date_to),
+            )
             return deleted_booking
 
     @staticmethod
@@ -68,27 +85,30 @@ class BookingsService:
     ) -> SBookingResponse:
         date_from, date_to = Base.validate_data_range(date_from, date_to)
         async with transaction_manager:
-            room = await RoomsService().get_room(
-                transaction_manager=transaction_manager, room_id=room_id
-            )
-            rooms_left = await transaction_manager.bookings.get_rooms_left(
-                room_id=room_id, date_from=date_from, date_to=date_to
-            )
-            if not rooms_left:
-                logger.warning("Room can't be booked", extra={"room_id": room_id})
-                raise RoomCanNotBeBookedException
-            room_price = await transaction_manager.bookings.get_room_price(
-                room_id=room_id
-            )
-            new_booking = await transaction_manager.bookings.insert_data(
-                room_id=room.id,
+            if settings.BOOKING_LOCK_MODE == "advisory":
+                await transaction_manager.bookings.lock_room(room_id=room_id)
+            new_booking = await transaction_manager.bookings.add_booking(
+                room_id=room_id,
                 user_id=user_id,
                 date_from=date_from,
                 date_to=date_to,
-                price=room_price,
+                lock_room=settings.BOOKING_LOCK_MODE == "room",
             )
+            if not new_booking:
+                # the reserved days are rolled back together with the transaction
+                room = await transaction_manager.rooms.find_one_or_none(id=room_id)
+                if not room:
+                    logger.warning("Incorrect room_id", extra={"room_id": room_id})
+                    raise IncorrectRoomIDException
+                logger.warning("Room can't be booked", extra={"room_id": room_id})
+                raise RoomCanNotBeBookedException
+            new_booking, hotel_id = new_booking
             booking_dict = SBookingResponse.model_validate(new_booking).model_dump()
             # Adds a Celery task to send a reservation notification
             send_booking_confirmation_email.delay(booking_dict, user_email)
             await transaction_manager.commit()
+            await response_cache.invalidate(
+                *hotel_days_tags(hotel_id, date_from, date_to),
+                *days_tags(date_from, date_to),
+            )
             return new_booking
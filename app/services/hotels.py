@@ -11,8 +11,23 @@ from app.logger import logger
 from app.models.hotels import Hotels
 from app.schemas.hotels import SHotelsResponse
 from app.utils.base import Base
+from app.utils.cache import (
+    ANY_HOTEL_TAG,
+    HOTELS_TAG,
+    add_tags,
+    days_tags,
+    hotel_days_tags,
+    hotel_tag,
+    location_tag,
+    response_cache,
+    room_tag,
+)
 from app.utils.transaction_manager import ITransactionManager
 
+# a search finding more hotels is tagged by the days of all hotels,
+# so its Surrogate-Key header and its tag sets stay small
+MAX_SEARCH_TAGS = 256
+
 
 class HotelsService:
 
@@ -52,6 +67,7 @@ class HotelsService:
                 owner_id=owner_id,
             )
             await transaction_manager.commit()
+            await response_cache.invalidate(HOTELS_TAG)
             return new_hotel
 
     async def update_hotel(
@@ -70,6 +86,10 @@ class HotelsService:
                 hotel_id=hotel_id,
                 owner_id=owner_id,
             )
+            tags = [ANY_HOTEL_TAG, hotel_tag(hotel_id)]
+            if location != current_hotel.location:
+                # the hotel is found by the searches of the other location
+                tags.append(HOTELS_TAG)
             updated_hotel = await transaction_manager.hotels.update_fields_by_id(
                 entity_id=current_hotel.id,
                 name=name,
@@ -79,6 +99,7 @@ class HotelsService:
                 owner_id=owner_id,
             )
             await transaction_manager.commit()
+            await response_cache.invalidate(*tags)
             return updated_hotel
 
     async def add_hotel_image(
@@ -105,6 +126,7 @@ class HotelsService:
                 hotel_id, image_path=file_path
             )
             await transaction_manager.commit()
+            await response_cache.invalidate(ANY_HOTEL_TAG, hotel_tag(hotel_id))
             return updated_hotel
 
     async def delete_hotel_image(
@@ -122,6 +144,7 @@ class HotelsService:
                 hotel_id, image_path=""
             )
             await transaction_manager.commit()
+            await response_cache.invalidate(ANY_HOTEL_TAG, hotel_tag(hotel_id))
             return updated_hotel
 
     async def delete_hotel(
@@ -133,8 +156,15 @@ class HotelsService:
                 hotel_id=hotel_id,
                 owner_id=owner_id,
             )
+            # the rooms of the hotel are deleted with it
+            rooms = await transaction_manager.rooms.find_all(hotel_id=current_hotel.id)
             deleted_hotel = await transaction_manager.hotels.delete(id=current_hotel.id)
             await transaction_manager.commit()
+            await response_cache.invalidate(
+                ANY_HOTEL_TAG,
+                hotel_tag(hotel_id),
+                *(room_tag(room.id) for room in rooms),
+            )
             return deleted_hotel
 
     @staticmethod
@@ -143,14 +173,59 @@ class HotelsService:
         location: str,
         date_from: date,
         date_to: date,
+        fuzzy: bool = False,
     ) -> Optional[list[SHotelsResponse]]:
         date_from, date_to = Base.validate_data_range(date_from, date_to)
         async with transaction_manager:
             hotels = await transaction_manager.hotels.get_hotels_by_location_and_time(
-                location=location, date_from=date_from, date_to=date_to
+                location=location,
+                date_from=date_from,
+                date_to=date_to,
+                fuzzy=fuzzy,
+                include_fully_booked=True,
             )
             await transaction_manager.commit()
-            return hotels
+        add_tags(
+            *HotelsService._get_found_hotels_tags(
+                hotel_ids=[hotel["id"] for hotel in hotels],
+                date_from=date_from,
+                date_to=date_to,
+            )
+        )
+        return [hotel for hotel in hotels if hotel["rooms_left"] > 0]
+
+    @staticmethod
+    def get_search_cache_tags(location: str, **kwargs) -> list[str]:
+        """
+        Tags of the search known before it is computed, the tags
+        of the found hotels are added once they are found
+        :param location:
+        :return: list[str]
+        """
+        return [HOTELS_TAG, location_tag(location)]
+
+    @staticmethod
+    def _get_found_hotels_tags(
+        hotel_ids: list[int], date_from: date, date_to: date
+    ) -> list[str]:
+        """
+        The search is invalidated by the changes of the hotels it has found
+        and by their bookings of the days of the stay, also of the fully
+        booked ones, since they are found once their rooms are released,
+        a search finding too many hotels is invalidated by the changes
+        of any hotel and by the bookings of all hotels for these days
+        :param hotel_ids: all hotels of the location
+        :param date_from:
+        :param date_to:
+        :return: list[str]
+        """
+        tags = []
+        for hotel_id in hotel_ids:
+            tags.append(hotel_tag(hotel_id))
+            tags.extend(hotel_days_tags(hotel_id, date_from, date_to))
+        if len(tags) > MAX_SEARCH_TAGS:
+            return [ANY_HOTEL_TAG, *days_tags(date_from, date_to)]
+        return tags
 
     @staticmethod
     async def get_hotel_by_id(
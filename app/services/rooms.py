@@ -12,6 +12,13 @@ from app.models.rooms import Rooms
 from app.schemas.rooms import SRoomResponse
 from app.services.hotels import HotelsService
 from app.utils.base import Base
+from app.utils.cache import (
+    ANY_HOTEL_TAG,
+    hotel_days_tags,
+    hotel_tag,
+    response_cache,
+    room_tag,
+)
 from app.utils.transaction_manager import ITransactionManager
 
 
@@ -48,6 +55,9 @@ class RoomsService:
                     quantity=quantity,
                 )
                 await transaction_manager.commit()
+                await response_cache.invalidate(
+                    ANY_HOTEL_TAG, hotel_tag(hotel_id), room_tag(new_room.id)
+                )
                 return new_room
             logger.warning(
                 "The number of rooms exceeds the total number of rooms in the hotel",
@@ -97,6 +107,9 @@ class RoomsService:
                     quantity=quantity,
                 )
                 await transaction_manager.commit()
+                await response_cache.invalidate(
+                    ANY_HOTEL_TAG, hotel_tag(hotel_id), room_tag(room_id)
+                )
                 return updated_room
             logger.warning(
                 "The number of rooms exceeds the total number of rooms in the hotel",
@@ -130,6 +143,9 @@ class RoomsService:
                 id=room.id, hotel_id=hotel.id
             )
             await transaction_manager.commit()
+            await response_cache.invalidate(
+                ANY_HOTEL_TAG, hotel_tag(hotel_id), room_tag(room_id)
+            )
             return deleted_room
 
     @staticmethod
@@ -167,6 +183,9 @@ class RoomsService:
                 entity_id=room_id, image_path=file_path
             )
             await transaction_manager.commit()
+            await response_cache.invalidate(
+                ANY_HOTEL_TAG, hotel_tag(hotel_id), room_tag(room_id)
+            )
             return updated_room
 
     @staticmethod
@@ -197,6 +216,9 @@ class RoomsService:
                 entity_id=room_id, image_path=""
             )
             await transaction_manager.commit()
+            await response_cache.invalidate(
+                ANY_HOTEL_TAG, hotel_tag(hotel_id), room_tag(room_id)
+            )
             return updated_room
 
     @staticmethod
@@ -217,6 +239,21 @@ class RoomsService:
             await transaction_manager.commit()
             return rooms
 
+    @staticmethod
+    def get_rooms_cache_tags(
+        hotel_id: int, date_from: date, date_to: date, **kwargs
+    ) -> list[str]:
+        """
+        Available rooms depend on the rooms of the hotel
+        and on their bookings of the days of the stay
+        :param hotel_id:
+        :param date_from:
+        :param date_to:
+        :return: list[str]
+        """
+        date_from, date_to = Base.validate_data_range(date_from, date_to)
+        return [hotel_tag(hotel_id), *hotel_days_tags(hotel_id, date_from, date_to)]
+
     @staticmethod
     async def get_room(transaction_manager: ITransactionManager, room_id: int) -> Rooms:
         async with transaction_manager:
@@ -2,10 +2,13 @@ from typing import Optional
 
 from pydantic import EmailStr
 
-from app.exceptions import IncorrectIDException
+from app.exceptions import IncorrectIDException, UserAlreadyExistException
 from app.logger import logger
 from app.models.users import Users
 from app.utils.auth import get_password_hash
+from app.utils.cache import days_tags, hotel_days_tags, response_cache
+from app.utils.token_cache import access_token_cache
+from app.utils.token_denylist import token_denylist
 from app.utils.transaction_manager import ITransactionManager
 
 
@@ -38,8 +41,11 @@ class UsersService:
         email: EmailStr,
         password: str,
     ) -> Users:
-        hashed_password = get_password_hash(password)
+        hashed_password = await get_password_hash(password)
         async with transaction_manager:
+            await UsersService._check_email_is_free(
+                transaction_manager=transaction_manager, user_id=user_id, email=email
+            )
             updated_user = await transaction_manager.users.update_fields_by_id(
                 entity_id=user_id, email=email, hashed_password=hashed_password
             )
@@ -51,9 +57,16 @@ class UsersService:
         transaction_manager: ITransactionManager, user_id: int
     ) -> Users:
         async with transaction_manager:
+            released_days = await UsersService._release_user_rooms(
+                transaction_manager=transaction_manager, user_id=user_id
+            )
+            await transaction_manager.auth.delete_user_sessions(user_id=user_id)
             deleted_user = await transaction_manager.users.delete(id=user_id)
             await transaction_manager.commit()
-            return deleted_user
+        await response_cache.invalidate(*released_days)
+        await token_denylist.revoke_user_tokens(user_id=user_id)
+        access_token_cache.evict_user_tokens(user_id=user_id)
+        return deleted_user
 
     @staticmethod
     async def get_user(transaction_manager: ITransactionManager, user_id: int) -> Users:
@@ -71,12 +84,17 @@ class UsersService:
         password: str,
         email: EmailStr,
     ) -> Users:
+        # the password is hashed before the transaction so that
+        # the connection is not held while bcrypt runs
+        hashed_password = await get_password_hash(password)
         async with transaction_manager:
             exists_user = await transaction_manager.users.find_one_or_none(id=user_id)
             if not exists_user:
                 logger.warning("Entity id not found", extra={"entity_id": user_id})
                 raise IncorrectIDException
-            hashed_password = get_password_hash(password)
+            await UsersService._check_email_is_free(
+                transaction_manager=transaction_manager, user_id=user_id, email=email
+            )
             updated_user = await transaction_manager.users.update_fields_by_id(
                 entity_id=user_id, hashed_password=hashed_password, email=email
             )
@@ -92,6 +110,43 @@ class UsersService:
             if not exists_user:
                 logger.warning("Entity id not found", extra={"entity_id": user_id})
                 raise IncorrectIDException
+            released_days = await UsersService._release_user_rooms(
+                transaction_manager=transaction_manager, user_id=user_id
+            )
+            await transaction_manager.auth.delete_user_sessions(user_id=user_id)
             deleted_user = await transaction_manager.users.delete(id=user_id)
             await transaction_manager.commit()
-            return deleted_user
+        await response_cache.invalidate(*released_days)
+        await token_denylist.revoke_user_tokens(user_id=user_id)
+        access_token_cache.evict_user_tokens(user_id=user_id)
+        return deleted_user
+
+    @staticmethod
+    async def _release_user_rooms(
+        transaction_manager: ITransactionManager, user_id: int
+    ) -> list[str]:
+        """
+        Frees the days taken by the bookings of the user
+        :param transaction_manager:
+        :param user_id:
+        :return: cache tags of the released days
+        """
+        bookings = await transaction_manager.bookings.get_bookings(user_id=user_id)
+        await transaction_manager.bookings.release_user_rooms(user_id=user_id)
+        return [
+            tag
+            for booking in bookings
+            for tag in (
+                *hotel_days_tags(booking.hotel_id, booking.date_from, booking.date_to),
+                *days_tags(booking.date_from, booking.date_to),
+            )
+        ]
+
+    @staticmethod
+    async def _check_email_is_free(
+        transaction_manager: ITransactionManager, user_id: int, email: EmailStr
+    ) -> None:
+        existing_user = await transaction_manager.users.find_by_email(email=email)
+        if existing_user and existing_user.id != user_id:
+            logger.warning("User already exists")
+            raise UserAlreadyExistException
@@ -4,3 +4,11 @@ from app.config import settings
 
 # Configuring the Celery, using redis as a broker
 celery = Celery("tasks", broker=settings.redis_url, include=["app.tasks.tasks"])
+
+# Periodic tasks, run by the celery beat
+celery.conf.beat_schedule = {
+    "purge-expired-refresh-sessions": {
+        "task": "app.tasks.tasks.purge_expired_refresh_sessions",
+        "schedule": settings.REFRESH_SESSIONS_PURGE_MINUTES * 60,
+    },
+}
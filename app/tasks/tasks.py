@@ -1,3 +1,4 @@
+import asyncio
 import smtplib
 from pathlib import Path
 
@@ -5,8 +6,11 @@ from PIL import Image
 from pydantic import EmailStr
 
 from app.config import settings
+from app.database import engine
+from app.services.auths import AuthsService
 from app.tasks.celery_setup import celery
 from app.tasks.email_templates import create_booking_confirmation_template
+from app.utils.transaction_manager import TransactionManager
 
 
 @celery.task
@@ -29,3 +33,24 @@ def send_booking_confirmation_email(booking: dict, email_to: EmailStr):
     with smtplib.SMTP_SSL(settings.SMTP_HOST, settings.SMTP_PORT) as server:
         server.login(settings.SMTP_USER, settings.SMTP_PASS)
         server.send_message(msg_content)
+
+
+@celery.task
+def purge_expired_refresh_sessions() -> int:
+    """Periodic task for deleting expired refresh sessions from Postgres"""
+    if settings.REFRESH_SESSION_BACKEND != "postgres":
+        return 0
+    return asyncio.run(_purge_expired_refresh_sessions())
+
+
+async def _purge_expired_refresh_sessions() -> int:
+    transaction_manager = TransactionManager()
+    try:
+        return await AuthsService.purge_expired_sessions(
+            transaction_manager=transaction_manager,
+            batch_size=settings.REFRESH_SESSIONS_PURGE_BATCH_SIZE,
+        )
+    finally:
+        await transaction_manager.close()
+        # pooled connections belong to the event loop of this run
+        await engine.dispose()
@@ -0,0 +1,116 @@
+"""
+Statements and latency of the register, logout and refresh flows
+before and after they became single statements,
+benchmarks are not collected with the tests, run them explicitly:
+pytest -s app/tests/benchmarks/bench_auth_flows.py
+"""
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+
+from app.database import engine
+from app.logger import logger
+from app.utils.transaction_manager import ITransactionManager
+
+# flows of every kind measured in each scenario
+ROUNDS = 500
+
+
+async def old_register(tm: ITransactionManager, email: str) -> None:
+    """Finds the email and then inserts the user"""
+    if await tm.users.find_by_email(email=email) is None:
+        await tm.users.insert_data(email=email, hashed_password="hashed", role="user")
+
+
+async def new_register(tm: ITransactionManager, email: str) -> None:
+    await tm.users.add_user(email=email, hashed_password="hashed", role="user")
+
+
+async def old_logout(tm: ITransactionManager, token: uuid.UUID) -> None:
+    """Finds the session and then deletes it"""
+    session = await tm.auth.find_one_or_none(refresh_token=token)
+    if session is not None:
+        await tm.auth.delete(id=session.id)
+
+
+async def new_logout(tm: ITransactionManager, token: uuid.UUID) -> None:
+    await tm.auth.pop_session(refresh_token=str(token))
+
+
+async def old_refresh(tm: ITransactionManager, token: uuid.UUID) -> None:
+    """Finds the session, checks its expiration, loads the user
+    and then updates the session"""
+    session = await tm.auth.find_one_or_none(refresh_token=token)
+    expires_at = session.created_at + timedelta(seconds=session.expires_in)
+    assert expires_at > datetime.now(timezone.utc)
+    await tm.users.find_one_or_none(id=session.user_id)
+    await tm.auth.update_fields_by_id(
+        session.id,
+        refresh_token=uuid.uuid4(),
+        expires_in=60,
+        created_at=datetime.now(timezone.utc),
+    )
+
+
+async def new_refresh(tm: ITransactionManager, token: uuid.UUID) -> None:
+    user = await tm.auth.rotate_session(
+        refresh_token=str(token), new_refresh_token=uuid.uuid4(), expires_in=60
+    )
+    assert user is not None
+
+
+FLOWS = {
+    "old": {"register": old_register, "logout": old_logout, "refresh": old_refresh},
+    "new": {"register": new_register, "logout": new_logout, "refresh": new_refresh},
+}
+
+
+@pytest.mark.parametrize("version", ["old", "new"])
+@pytest.mark.parametrize("flow", ["register", "logout", "refresh"])
+async def test_auth_flow_statements(
+    flow: str, version: str, transaction_manager: ITransactionManager
+) -> None:
+    run_flow = FLOWS[version][flow]
+    statements = 0
+
+    def count_statement(*args):
+        nonlocal statements
+        statements += 1
+
+    latencies = []
+    for _ in range(ROUNDS):
+        async with transaction_manager:
+            token = uuid.uuid4()
+            await transaction_manager.auth.create_session(
+                refresh_token=token, user_id=1, expires_in=60
+            )
+            if flow == "register":
+                argument = f"{uuid.uuid4().hex}@example.com"
+            else:
+                argument = token
+            event.listen(engine.sync_engine, "before_cursor_execute", count_statement)
+            started = time.perf_counter()
+            try:
+                await run_flow(transaction_manager, argument)
+            finally:
+                latencies.append(time.perf_counter() - started)
+                event.remove(
+                    engine.sync_engine, "before_cursor_execute", count_statement
+                )
+            # the users and sessions of the benchmark are not kept
+            await transaction_manager.rollback()
+
+    latencies.sort()
+    logger.info(
+        "Auth flow statements and latency",
+        extra={
+            "flow": flow,
+            "version": version,
+            "statements": round(statements / ROUNDS),
+            "p50_ms": round(latencies[ROUNDS // 2] * 1000, 2),
+            "p99_ms": round(latencies[ROUNDS * 99 // 100] * 1000, 2),
+        },
+    )
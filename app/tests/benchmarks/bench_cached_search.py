@@ -0,0 +1,67 @@
+"""
+CPU time of a cached hotels search hit, decoded and encoded again
+through the response model or returned as the stored bytes,
+benchmarks are not collected with the tests, run them explicitly:
+pytest -s app/tests/benchmarks/bench_cached_search.py
+"""
+import json
+import time
+from typing import Optional
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.logger import logger
+from app.schemas.hotels import SHotelsResponse
+from app.utils.cache import decode_entry, encode_entry
+from app.utils.cdn import surrogate_keys
+
+# hits measured in each scenario
+ROUNDS = 2000
+# hotels found by the search
+HOTELS = 50
+
+adapter = TypeAdapter(Optional[list[SHotelsResponse]])
+
+
+def decoded_hit(value: bytes) -> Response:
+    """Decodes the entry and encodes it again like FastAPI with response_model"""
+    _, body = decode_entry(value)
+    hotels = adapter.validate_python(json.loads(body))
+    return JSONResponse(jsonable_encoder(hotels))
+
+
+def encoded_hit(value: bytes) -> Response:
+    headers, body = decode_entry(value)
+    return Response(content=body, headers=headers)
+
+
+def test_cached_search_hit() -> None:
+    hotels = [
+        {
+            "id": i,
+            "name": f"Отель {i}",
+            "location": "Республика Алтай, Майминский район, село Урлу-Аспак",
+            "services": ["Wi-Fi", "Парковка", "Бассейн"],
+            "rooms_quantity": 20,
+            "image_path": None,
+            "rooms_left": i % 20,
+        }
+        for i in range(HOTELS)
+    ]
+    body = adapter.dump_json(adapter.validate_python(hotels))
+    keys = surrogate_keys(["hotels", "location:республика алтай"])
+    value = encode_entry(body, {"Surrogate-Key": keys})
+
+    for name, hit in (("decoded", decoded_hit), ("encoded", encoded_hit)):
+        assert json.loads(hit(value).body) == hotels
+        started = time.process_time()
+        for _ in range(ROUNDS):
+            hit(value)
+        cpu = (time.process_time() - started) / ROUNDS
+        logger.info(
+            "Cached search hit CPU time",
+            extra={"hit": name, "cpu_us": round(cpu * 1_000_000, 1)},
+        )
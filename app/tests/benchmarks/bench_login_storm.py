@@ -0,0 +1,82 @@
+"""
+Latency of the hotels search while users log in at the same time,
+benchmarks are not collected with the tests, run them explicitly:
+pytest -s app/tests/benchmarks/bench_login_storm.py
+"""
+import asyncio
+import statistics
+import time
+
+import pytest
+from httpx import AsyncClient
+
+from app.logger import logger
+from app.utils import auth
+
+# seconds of searching hotels in every scenario
+DURATION = 10
+# logins sent at once during the storm
+PARALLEL_LOGINS = 8
+
+
+async def inline_hashing(func, *args):
+    """Hashes in the event loop like before the hashing pool"""
+    return func(*args)
+
+
+async def measure_hotels_latency(client: AsyncClient, duration: float) -> list[float]:
+    latencies = []
+    finish = time.perf_counter() + duration
+    while time.perf_counter() < finish:
+        started = time.perf_counter()
+        response = await client.get(
+            "/v1/hotels/Алтай",
+            params={"date_from": "2030-05-01", "date_to": "2030-05-10"},
+        )
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200
+    return latencies
+
+
+async def login_storm(client: AsyncClient, stop: asyncio.Event) -> int:
+    logins = 0
+    while not stop.is_set():
+        response = await client.post(
+            "/v1/auth/login",
+            data={"username": "user1@example.com", "password": "user1"},
+        )
+        assert response.status_code == 200
+        logins += 1
+    return logins
+
+
+@pytest.mark.parametrize("storm", [False, True])
+@pytest.mark.parametrize("hashing", ["pool", "inline"])
+async def test_hotels_latency_during_login_storm(
+    hashing: str, storm: bool, async_client: AsyncClient, monkeypatch
+) -> None:
+    if hashing == "inline":
+        monkeypatch.setattr(auth, "_run_in_hashing_pool", inline_hashing)
+    await measure_hotels_latency(async_client, duration=1)  # warm up
+
+    stop = asyncio.Event()
+    logins = [
+        asyncio.create_task(login_storm(async_client, stop))
+        for _ in range(PARALLEL_LOGINS if storm else 0)
+    ]
+    latencies = await measure_hotels_latency(async_client, duration=DURATION)
+    stop.set()
+    total_logins = sum(await asyncio.gather(*logins))
+
+    percentiles = statistics.quantiles(latencies, n=100)
+    logger.info(
+        "Hotels search latency",
+        extra={
+            "hashing": hashing,
+            "storm": storm,
+            "p50_ms": round(percentiles[49] * 1000, 1),
+            "p99_ms": round(percentiles[98] * 1000, 1),
+            "searches": len(latencies),
+            "logins": total_logins,
+        },
+    )
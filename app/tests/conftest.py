@@ -1,19 +1,26 @@
 import asyncio
+import importlib
 import json
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from typing import AsyncGenerator
 
 import pytest
+from fastapi import FastAPI
 from httpx import AsyncClient
 from sqlalchemy import insert
 
+import app.api.hotels
+import app.api.rooms
 from app.config import settings
+from app.conftest import cache_patch
 from app.database import Base, async_session_maker, engine
 from app.main import app as fastapi_app
 from app.models.bookings import Bookings
 from app.models.hotels import Hotels
 from app.models.rooms import Rooms
 from app.models.users import Users
+from app.repositories.bookings import BookingsRepository
+from app.utils.cache import response_cache
 from app.utils.transaction_manager import TransactionManager
 
 
@@ -65,6 +72,8 @@ async def prepare_database():
         await session.execute(add_hotels)
         await session.execute(add_rooms)
         await session.execute(add_bookings)
+        # take the days of mock bookings in the room inventory
+        await BookingsRepository(session).rebuild_room_inventory()
 
         await session.commit()
 
@@ -84,6 +93,35 @@ async def async_client():
         yield client
 
 
+@pytest.fixture(scope="function")
+def future_stay() -> dict[str, date]:
+    """A stay which passes the validation on any day the tests run"""
+    date_from = date.today() + timedelta(days=30)
+    return {"date_from": date_from, "date_to": date_from + timedelta(days=4)}
+
+
+@pytest.fixture(scope="function")
+async def cached_async_client():
+    """Creates async client of the hotels and rooms endpoints
+    with the response cache, the routes are reloaded without the patch"""
+    # the responses of the previous runs were computed from another database
+    async for key in response_cache.redis.scan_iter(f"{response_cache.prefix}:*"):
+        await response_cache.redis.delete(key)
+    if response_cache.local is not None:
+        response_cache.local.clear()
+    cached_app = FastAPI()
+    cache_patch.stop()
+    try:
+        for api in (app.api.hotels, app.api.rooms):
+            cached_app.include_router(importlib.reload(api).router)
+    finally:
+        cache_patch.start()
+    async with AsyncClient(app=cached_app, base_url="http://test") as client:
+        yield client
+    for api in (app.api.hotels, app.api.rooms):
+        importlib.reload(api)
+
+
 @pytest.fixture(scope="session")
 async def auth_async_client(request):
     """Creates default authenticated async client"""
@@ -107,4 +145,6 @@ async def async_client_from_params(request):
 @pytest.fixture(scope="module")
 async def transaction_manager() -> AsyncGenerator:
     """Creates a transaction manager for working with Repository"""
-    yield TransactionManager()
+    transaction_manager = TransactionManager()
+    yield transaction_manager
+    await transaction_manager.close()
@@ -1,7 +1,13 @@
+import uuid
+
 import pytest
 from httpx import AsyncClient
 
-from app.utils.transaction_manager import ITransactionManager
+from app.config import settings
+from app.services import auths as auths_service
+from app.services.auths import AuthsService
+from app.utils import auth as auth_utils
+from app.utils.transaction_manager import ITransactionManager, TransactionManager
 
 
 @pytest.mark.parametrize(
@@ -11,6 +17,7 @@ from app.utils.transaction_manager import ITransactionManager
         ("user3@example.com", "user3", "admin", 422),
         ("user3example.com", "user3", "user", 422),
         ("user2@example.com", "user2", "user", 409),
+        ("User2@Example.com", "user2", "user", 409),
         ("user3@example.com", "user3", "user", 201),
         ("owner3@example.com", "owner3", "hotel owner", 201),
     ],
@@ -51,6 +58,7 @@ async def test_register_user(
         ("user3@example.com", "user2", 401),
         ("user2@example.com", "wrong password", 401),
         ("user2@example.com", "user2", 200),
+        ("User2@Example.com", "user2", 200),
         ("owner2@example.com", "owner2", 200),
     ],
 )
@@ -74,6 +82,33 @@ async def test_login_user(
         await async_client.post("/v1/auth/logout")
 
 
+async def test_login_does_not_hold_connection_while_verifying(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    transaction_manager = TransactionManager()
+    connections = []
+
+    async def verify_password(plain_password: str, hashed_password: str) -> bool:
+        connections.append(transaction_manager.connection)
+        return await auth_utils.verify_password(plain_password, hashed_password)
+
+    monkeypatch.setattr(auths_service, "verify_password", verify_password)
+    try:
+        token, user = await AuthsService().login_user(
+            transaction_manager=transaction_manager,
+            password="user1",
+            email="user1@example.com",
+        )
+        # the manager is still usable by its owner after the login
+        async with transaction_manager:
+            assert await transaction_manager.users.find_one_or_none(id=user.id)
+    finally:
+        await transaction_manager.close()
+    assert connections == [None]
+    assert user.email == "user1@example.com"
+    assert transaction_manager.connection is None
+
+
 @pytest.mark.parametrize(
     "async_client_from_params,status_code",
     [({"email": "user2@example.com", "password": "user2"}, 200)],
@@ -109,6 +144,7 @@ async def test_refresh_token(
     await async_client_from_params.post("/v1/auth/abort")
 
 
+@pytest.mark.parametrize("backend", ["postgres", "redis"])
 @pytest.mark.parametrize(
     "email,password,total_sessions,status_code,user_id",
     [("user2@example.com", "user2", 5, 200, 2)],
@@ -119,20 +155,75 @@ async def test_abort_all_sessions(
     total_sessions: int,
     status_code: int,
     user_id: int,
+    backend: str,
     async_client: AsyncClient,
     transaction_manager: ITransactionManager,
+    monkeypatch: pytest.MonkeyPatch,
 ) -> None:
+    monkeypatch.setattr(settings, "REFRESH_SESSION_BACKEND", backend)
+    async with transaction_manager:
+        # sessions in Redis outlive the test database
+        await transaction_manager.auth.delete_user_sessions(user_id=user_id)
+        await transaction_manager.commit()
     for _ in range(total_sessions):
         await async_client.post(
             "/v1/auth/login", data={"username": email, "password": password}
         )
     # check total sessions
     async with transaction_manager:
-        sessions = await transaction_manager.auth.find_all(user_id=user_id)
-        assert len(sessions) == total_sessions
+        sessions = await transaction_manager.auth.count_user_sessions(user_id=user_id)
+        assert sessions == total_sessions
         # abort all sessions
         responce = await async_client.post("/v1/auth/abort")
         # check that all sessions were aborted
-        sessions = await transaction_manager.auth.find_all(user_id=user_id)
-        assert len(sessions) == 0
+        sessions = await transaction_manager.auth.count_user_sessions(user_id=user_id)
+        assert sessions == 0
         assert responce.status_code == status_code
+
+
+@pytest.mark.parametrize(
+    "async_client_from_params,url",
+    [
+        ({"email": "user2@example.com", "password": "user2"}, "/v1/auth/logout"),
+        ({"email": "user2@example.com", "password": "user2"}, "/v1/auth/abort"),
+    ],
+    indirect=["async_client_from_params"],
+)
+async def test_access_token_is_revoked(
+    async_client_from_params: AsyncClient, url: str
+) -> None:
+    access_token = async_client_from_params.cookies["access_token"]
+    response = await async_client_from_params.get("/v1/bookings")
+    assert response.status_code == 200
+
+    await async_client_from_params.post(url)
+    # the deleted cookie is sent again as a stolen token would be
+    async_client_from_params.cookies.set("access_token", access_token)
+    response = await async_client_from_params.get("/v1/bookings")
+    assert response.status_code == 401
+    assert response.json()["detail"] == "The token has been revoked"
+
+
+async def test_login_attempts_are_limited(
+    async_client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "LOGIN_ATTEMPTS_PER_EMAIL", 2)
+    login_data = {"username": f"{uuid.uuid4().hex}@example.com", "password": "user"}
+    for _ in range(2):
+        response = await async_client.post("/v1/auth/login", data=login_data)
+        assert response.status_code == 401
+
+    response = await async_client.post("/v1/auth/login", data=login_data)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "30"
+
+
+async def test_login_is_rejected_when_hashing_queue_is_full(
+    async_client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "PASSWORD_HASHING_QUEUE_SIZE", 0)
+    response = await async_client.post(
+        "/v1/auth/login", data={"username": "user1@example.com", "password": "user1"}
+    )
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
@@ -70,6 +70,13 @@ async def test_get_and_delete_all_bookings(auth_async_client: AsyncClient) -> No
             "2024-12-25",
             409,
         ),
+        (
+            {"email": "user1@example.com", "password": "user1"},
+            100,
+            "2030-05-01",
+            "2030-05-15",
+            404,
+        ),
     ],
     indirect=["async_client_from_params"],
 )
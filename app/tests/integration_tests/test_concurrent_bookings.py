@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.logger import logger
+from app.models.bookings import Bookings
+from app.models.rooms import RoomInventory
+from app.utils.transaction_manager import ITransactionManager
+
+TOTAL_REQUESTS = 200
+# every request holds one connection until it ends and the test database
+# has no pool, so the parallel requests are kept below max_connections
+PARALLEL_REQUESTS = 30
+
+
+@pytest.mark.parametrize(
+    "lock_mode,date_from,date_to",
+    [
+        ("inventory", "2031-05-01", "2031-05-15"),
+        ("room", "2031-06-01", "2031-06-15"),
+        ("advisory", "2031-07-01", "2031-07-15"),
+    ],
+)
+async def test_parallel_bookings_of_one_room(
+    lock_mode: str,
+    date_from: str,
+    date_to: str,
+    auth_async_client: AsyncClient,
+    transaction_manager: ITransactionManager,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Hundreds of users try to book the same room for the same days
+    at once, exactly as many bookings as there are rooms must succeed."""
+    monkeypatch.setattr(settings, "BOOKING_LOCK_MODE", lock_mode)
+    room_id = 11
+    semaphore = asyncio.Semaphore(PARALLEL_REQUESTS)
+
+    async def add_booking() -> int:
+        async with semaphore:
+            response = await auth_async_client.post(
+                f"/v1/bookings/{room_id}",
+                params={"date_from": date_from, "date_to": date_to},
+            )
+            return response.status_code
+
+    started = time.perf_counter()
+    status_codes = await asyncio.gather(*[add_booking() for _ in range(TOTAL_REQUESTS)])
+    elapsed = time.perf_counter() - started
+    logger.info(
+        "Parallel bookings completed",
+        extra={
+            "lock_mode": lock_mode,
+            "requests": TOTAL_REQUESTS,
+            "elapsed": round(elapsed, 2),
+            "requests_per_second": round(TOTAL_REQUESTS / elapsed),
+        },
+    )
+
+    async with transaction_manager:
+        room = await transaction_manager.rooms.find_one_or_none(id=room_id)
+        assert status_codes.count(200) == room.quantity
+        assert status_codes.count(409) == TOTAL_REQUESTS - room.quantity
+
+        # the inventory counts exactly the inserted bookings
+        stays = Bookings.stay.contains(RoomInventory.day)
+        booked_days = await transaction_manager.session.execute(
+            select(RoomInventory.booked, func.count(Bookings.id))
+            .select_from(RoomInventory)
+            .join(Bookings, (Bookings.room_id == RoomInventory.room_id) & stays)
+            .where(RoomInventory.room_id == room_id)
+            .group_by(RoomInventory.room_id, RoomInventory.day)
+        )
+        for booked, total_bookings in booked_days.all():
+            assert booked == total_bookings <= room.quantity
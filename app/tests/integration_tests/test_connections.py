@@ -0,0 +1,66 @@
+from contextlib import contextmanager
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event
+
+from app.database import engine
+
+
+@contextmanager
+def count_checkouts() -> dict:
+    """Counts connections checked out of the pool"""
+    connections = {"checkouts": 0}
+
+    def checkout(*args):
+        connections["checkouts"] += 1
+
+    event.listen(engine.sync_engine, "checkout", checkout)
+    try:
+        yield connections
+    finally:
+        event.remove(engine.sync_engine, "checkout", checkout)
+
+
+@pytest.mark.parametrize(
+    "async_client_from_params,method,url,params",
+    [
+        # the hotel is checked by a nested service in the same transaction
+        (
+            {"email": "user1@example.com", "password": "user1"},
+            "GET",
+            "/v1/hotels/1/rooms",
+            {"date_from": "2030-05-01", "date_to": "2030-05-10"},
+        ),
+        # the current user is loaded through the unit of work of the request
+        (
+            {"email": "user1@example.com", "password": "user1"},
+            "GET",
+            "/v1/bookings",
+            None,
+        ),
+        (
+            {"email": "user1@example.com", "password": "user1"},
+            "GET",
+            "/v1/bookings/1",
+            None,
+        ),
+        (
+            {"email": "owner1@example.com", "password": "owner1"},
+            "GET",
+            "/v1/users/me",
+            None,
+        ),
+    ],
+    indirect=["async_client_from_params"],
+)
+async def test_connections_per_request(
+    async_client_from_params: AsyncClient,
+    method: str,
+    url: str,
+    params: dict,
+) -> None:
+    with count_checkouts() as connections:
+        response = await async_client_from_params.request(method, url, params=params)
+    assert response.status_code == 200
+    assert connections["checkouts"] == 1
@@ -1,8 +1,13 @@
+from datetime import date
 from typing import Union
 
 import pytest
 from httpx import AsyncClient
 
+from app.services.hotels import HotelsService
+from app.utils.cache import hotel_days_tags, hotel_tag
+from app.utils.cdn import catalogue_policy, search_policy, surrogate_keys
+
 
 @pytest.mark.parametrize(
     "location,date_from,date_to,status_code,total_hotels",
@@ -279,3 +284,65 @@ async def test_delete_hotel(
 
     if response.status_code == 200:
         assert response.json()["id"] == hotel_id
+
+
+async def test_server_timing(
+    async_client: AsyncClient, future_stay: dict[str, date]
+) -> None:
+    response = await async_client.get("/v1/hotels/Алтай", params=future_stay)
+    assert response.status_code == 200
+    phases = dict(
+        phase.split(";dur=") for phase in response.headers["Server-Timing"].split(", ")
+    )
+    assert {"db", "app"} <= set(phases)
+    assert all(float(duration) >= 0 for duration in phases.values())
+
+
+async def test_cached_search(
+    cached_async_client: AsyncClient,
+    async_client: AsyncClient,
+    future_stay: dict[str, date],
+) -> None:
+    response = await cached_async_client.get("/hotels/Алтай", params=future_stay)
+    assert response.status_code == 200
+    uncached_response = await async_client.get("/v1/hotels/Алтай", params=future_stay)
+    assert response.json() == uncached_response.json()
+
+    tags = HotelsService.get_search_cache_tags(location="Алтай", **future_stay)
+    # the search is tagged by the hotels it has found
+    for hotel in response.json():
+        tags += [hotel_tag(hotel["id"]), *hotel_days_tags(hotel["id"], **future_stay)]
+    assert response.headers["Surrogate-Key"] == surrogate_keys(tags)
+    assert response.headers["Cache-Control"] == search_policy.headers["Cache-Control"]
+
+    response_not_modified = await cached_async_client.get(
+        "/hotels/Алтай",
+        params=future_stay,
+        headers={"If-None-Match": response.headers["ETag"]},
+    )
+    assert response_not_modified.status_code == 304
+    assert not response_not_modified.content
+    for header in ("ETag", "Surrogate-Key", "Cache-Control"):
+        assert response_not_modified.headers[header] == response.headers[header]
+
+
+async def test_cached_hotel_by_id(cached_async_client: AsyncClient) -> None:
+    response = await cached_async_client.get("/hotels/id/1")
+    assert response.status_code == 200
+    assert response.json()["id"] == 1
+    assert response.headers["Surrogate-Key"] == "hotel:1"
+    assert (
+        response.headers["Cache-Control"] == catalogue_policy.headers["Cache-Control"]
+    )
+
+    # the version of the hotel tag answers the request before the hotel is read
+    response_not_modified = await cached_async_client.get(
+        "/hotels/id/1", headers={"If-None-Match": response.headers["ETag"]}
+    )
+    assert response_not_modified.status_code == 304
+    assert not response_not_modified.content
+    assert response_not_modified.headers["ETag"] == response.headers["ETag"]
+    assert (
+        response_not_modified.headers["Cache-Control"]
+        == catalogue_policy.headers["Cache-Control"]
+    )
@@ -1,9 +1,15 @@
+from datetime import date
 from typing import Union
 
+import httpx
 import pytest
 from httpx import AsyncClient
-from app.repositories.rooms import RoomsRepository
+
 from app.database import async_session_maker
+from app.repositories.rooms import RoomsRepository
+from app.services.rooms import RoomsService
+from app.utils.cache import hotel_days_tags, response_cache
+from app.utils.cdn import CDNPurger, catalogue_policy, search_policy, surrogate_keys
 
 
 @pytest.mark.parametrize(
@@ -359,3 +365,77 @@ async def test_delete_hotel_image(
         json_response = response.json()
         assert not json_response["image_path"]
         assert json_response["id"] == room_id
+
+
+async def test_cached_available_rooms(
+    cached_async_client: AsyncClient,
+    auth_async_client: AsyncClient,
+    future_stay: dict[str, date],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    hotel_id, room_id = 2, 3
+    response = await cached_async_client.get(
+        f"/hotels/{hotel_id}/rooms", params=future_stay
+    )
+    assert response.status_code == 200
+    tags = RoomsService.get_rooms_cache_tags(hotel_id=hotel_id, **future_stay)
+    assert response.headers["Surrogate-Key"] == surrogate_keys(tags)
+    assert response.headers["Cache-Control"] == search_policy.headers["Cache-Control"]
+
+    response_not_modified = await cached_async_client.get(
+        f"/hotels/{hotel_id}/rooms",
+        params=future_stay,
+        headers={"If-None-Match": response.headers["ETag"]},
+    )
+    assert response_not_modified.status_code == 304
+    assert not response_not_modified.content
+    for header in ("ETag", "Surrogate-Key", "Cache-Control"):
+        assert response_not_modified.headers[header] == response.headers[header]
+
+    # the booking purges the responses of the days of the stay from the CDN
+    purged_keys = []
+
+    def purge(request: httpx.Request) -> httpx.Response:
+        purged_keys.extend(request.headers["Surrogate-Key"].split())
+        return httpx.Response(200)
+
+    purger = CDNPurger("http://cdn.test/purge", timeout=1)
+    purger.client = httpx.AsyncClient(transport=httpx.MockTransport(purge))
+    monkeypatch.setattr(
+        response_cache, "invalidation_hooks", [purger.purge_in_background]
+    )
+    booking = await auth_async_client.post(
+        f"/v1/bookings/{room_id}", params=future_stay
+    )
+    assert booking.status_code == 200
+    await purger.close()
+    assert set(hotel_days_tags(hotel_id, **future_stay)) <= set(purged_keys)
+
+    response_modified = await cached_async_client.get(
+        f"/hotels/{hotel_id}/rooms",
+        params=future_stay,
+        headers={"If-None-Match": response.headers["ETag"]},
+    )
+    assert response_modified.status_code == 200
+    assert response_modified.headers["ETag"] != response.headers["ETag"]
+    rooms_left = {room["id"]: room["rooms_left"] for room in response.json()}
+    for room in response_modified.json():
+        booked = 1 if room["id"] == room_id else 0
+        assert room["rooms_left"] == rooms_left[room["id"]] - booked
+
+
+async def test_cached_room(cached_async_client: AsyncClient) -> None:
+    response = await cached_async_client.get("/hotels/rooms/3")
+    assert response.status_code == 200
+    assert response.json()["id"] == 3
+    assert response.headers["Surrogate-Key"] == "room:3"
+    assert (
+        response.headers["Cache-Control"] == catalogue_policy.headers["Cache-Control"]
+    )
+
+    response_not_modified = await cached_async_client.get(
+        "/hotels/rooms/3", headers={"If-None-Match": response.headers["ETag"]}
+    )
+    assert response_not_modified.status_code == 304
+    assert not response_not_modified.content
+    assert response_not_modified.headers["ETag"] == response.headers["ETag"]
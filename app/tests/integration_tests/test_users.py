@@ -52,6 +52,12 @@ async def test_return_me(
     [
         ({"email": "user2@example.com", "password": "user1"}, 401, None, None),
         ({"email": "user3example.com", "password": "user2"}, 401, None, None),
+        (
+            {"email": "user2@example.com", "password": "user2"},
+            409,
+            "User1@example.com",
+            "user2",
+        ),
         (
             {"email": "user2@example.com", "password": "user2"},
             200,
@@ -0,0 +1,57 @@
+import pytest
+
+from app.admin.views import HotelsAdmin, RoomsAdmin
+from app.utils.cache import (
+    ANY_HOTEL_TAG,
+    HOTELS_TAG,
+    hotel_tag,
+    response_cache,
+    room_tag,
+)
+
+
+async def test_admin_writes_invalidate_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    invalidated = []
+
+    async def invalidate(*tags: str) -> None:
+        invalidated.append(set(tags))
+
+    monkeypatch.setattr(response_cache, "invalidate", invalidate)
+    hotels_admin, rooms_admin = HotelsAdmin(), RoomsAdmin()
+
+    hotel = await hotels_admin.insert_model(
+        {
+            "owner_id": 1,
+            "name": "Admin hotel",
+            "location": "Admin location",
+            "services": {},
+            "rooms_quantity": 1,
+        }
+    )
+    room = await rooms_admin.insert_model(
+        {
+            "hotels": str(hotel.id),
+            "name": "Admin room",
+            "price": 1000,
+            "services": {},
+            "quantity": 1,
+        }
+    )
+    assert room.hotel_id == hotel.id
+    # the room is moved to another hotel
+    await rooms_admin.update_model(str(room.id), {"hotels": "1"})
+    await hotels_admin.update_model(str(hotel.id), {"name": "Renamed hotel"})
+    # the hotel is found by the searches of the other location
+    await hotels_admin.update_model(str(hotel.id), {"location": "Moved location"})
+    await hotels_admin.delete_model(hotel)
+
+    assert invalidated == [
+        {HOTELS_TAG},
+        {ANY_HOTEL_TAG, hotel_tag(hotel.id), room_tag(room.id)},
+        {ANY_HOTEL_TAG, hotel_tag(hotel.id), hotel_tag(1), room_tag(room.id)},
+        {ANY_HOTEL_TAG, hotel_tag(hotel.id)},
+        {ANY_HOTEL_TAG, HOTELS_TAG, hotel_tag(hotel.id)},
+        {ANY_HOTEL_TAG, hotel_tag(hotel.id)},
+    ]
+    await rooms_admin.delete_model(await rooms_admin.get_object_for_delete(room.id))
+    assert invalidated[-1] == {ANY_HOTEL_TAG, hotel_tag(1), room_tag(room.id)}
@@ -1,3 +1,5 @@
+from datetime import date
+
 import pytest
 
 from app.utils.transaction_manager import ITransactionManager
@@ -42,11 +44,112 @@ async def test_delete_bookings(
     transaction_manager: ITransactionManager,
 ) -> None:
     async with transaction_manager:
-        deleted_booking = await transaction_manager.bookings.delete(
-            id=booking_id, user_id=user_id
+        deleted_booking = await transaction_manager.bookings.delete_booking(
+            booking_id=booking_id, user_id=user_id
         )
         if exists:
+            deleted_booking, hotel_id = deleted_booking
             assert deleted_booking.id == booking_id
+            room = await transaction_manager.rooms.find_one_or_none(
+                id=deleted_booking.room_id
+            )
+            assert hotel_id == room.hotel_id
         else:
             assert not deleted_booking
         await transaction_manager.rollback()
+
+
+@pytest.mark.parametrize(
+    "room_id,date_from,date_to,rooms_left",
+    [
+        (1, date(2023, 10, 1), date(2023, 10, 14), 5),
+        (1, date(2023, 10, 1), date(2023, 10, 15), 4),
+        (1, date(2023, 10, 30), date(2023, 12, 5), 4),
+        (12, date(2024, 12, 25), date(2024, 12, 30), 0),
+        (12, date(2024, 12, 26), date(2024, 12, 30), 1),
+        (20, date(2024, 12, 26), date(2024, 12, 30), None),
+    ],
+)
+async def test_get_rooms_left(
+    room_id: int,
+    date_from: date,
+    date_to: date,
+    rooms_left: int,
+    transaction_manager: ITransactionManager,
+) -> None:
+    async with transaction_manager:
+        current_rooms_left = await transaction_manager.bookings.get_rooms_left(
+            room_id=room_id, date_from=date_from, date_to=date_to
+        )
+        assert current_rooms_left == rooms_left
+
+
+@pytest.mark.parametrize(
+    "room_id,date_from,date_to,rooms_left",
+    [
+        (1, date(2023, 10, 25), date(2023, 11, 5), 3),
+        (1, date(2023, 11, 1), date(2023, 11, 5), 4),
+    ],
+)
+async def test_add_booking_and_release_room(
+    room_id: int,
+    date_from: date,
+    date_to: date,
+    rooms_left: int,
+    transaction_manager: ITransactionManager,
+) -> None:
+    async with transaction_manager:
+        new_booking = await transaction_manager.bookings.add_booking(
+            room_id=room_id, user_id=1, date_from=date_from, date_to=date_to
+        )
+        assert new_booking
+        current_rooms_left = await transaction_manager.bookings.get_rooms_left(
+            room_id=room_id, date_from=date_from, date_to=date_to
+        )
+        assert current_rooms_left == rooms_left
+
+        # release the reserved days and check that the inventory is restored
+        await transaction_manager.bookings.release_room(
+            room_id=room_id, date_from=date_from, date_to=date_to
+        )
+        current_rooms_left = await transaction_manager.bookings.get_rooms_left(
+            room_id=room_id, date_from=date_from, date_to=date_to
+        )
+        assert current_rooms_left == rooms_left + 1
+        await transaction_manager.rollback()
+
+
+@pytest.mark.parametrize(
+    "room_id,date_from,date_to,price,rooms_left",
+    [
+        (1, date(2023, 10, 25), date(2023, 11, 5), 24500, 3),
+        (12, date(2024, 12, 26), date(2024, 12, 30), 10000, 0),
+        (12, date(2024, 12, 20), date(2024, 12, 30), None, 0),
+        (20, date(2024, 12, 26), date(2024, 12, 30), None, None),
+    ],
+)
+async def test_add_booking(
+    room_id: int,
+    date_from: date,
+    date_to: date,
+    price: int,
+    rooms_left: int,
+    transaction_manager: ITransactionManager,
+) -> None:
+    async with transaction_manager:
+        new_booking = await transaction_manager.bookings.add_booking(
+            room_id=room_id, user_id=1, date_from=date_from, date_to=date_to
+        )
+        if price:
+            new_booking, hotel_id = new_booking
+            assert new_booking.room_id == room_id
+            assert new_booking.price == price
+            room = await transaction_manager.rooms.find_one_or_none(id=room_id)
+            assert hotel_id == room.hotel_id
+            current_rooms_left = await transaction_manager.bookings.get_rooms_left(
+                room_id=room_id, date_from=date_from, date_to=date_to
+            )
+            assert current_rooms_left == rooms_left
+        else:
+            assert not new_booking
+        await transaction_manager.rollback()
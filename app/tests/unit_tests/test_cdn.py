@@ -0,0 +1,60 @@
+import asyncio
+
+import httpx
+
+from app.utils.cdn import CachePolicy, CDNPurger, surrogate_keys
+
+
+def test_surrogate_keys() -> None:
+    keys = surrogate_keys(["hotel:1", "hotel:1:2030-05", "location:республика алтай"])
+    assert keys == (
+        "hotel:1 hotel:1:2030-05 "
+        "location:%D1%80%D0%B5%D1%81%D0%BF%D1%83%D0%B1%D0%BB%D0%B8%D0%BA%D0%B0"
+        "%20%D0%B0%D0%BB%D1%82%D0%B0%D0%B9"
+    )
+    # the keys are sent in the headers
+    keys.encode("latin-1")
+
+
+def test_cache_policy() -> None:
+    assert CachePolicy(shared_max_age=60).headers == {
+        "Cache-Control": "public, max-age=0, s-maxage=60",
+        "Vary": "Accept-Encoding",
+    }
+
+
+async def test_purge() -> None:
+    requests = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200 if len(requests) == 1 else 503)
+
+    purger = CDNPurger("http://cdn.test/purge", timeout=1)
+    purger.client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+    await purger.purge(("hotel:1", "room:2"))
+    # a failed purge doesn't fail the write
+    await purger.purge(("hotel:3",))
+    assert [request.method for request in requests] == ["PURGE", "PURGE"]
+    assert requests[0].url == "http://cdn.test/purge"
+    assert requests[0].headers["Surrogate-Key"] == "hotel:1 room:2"
+
+
+async def test_purge_in_background() -> None:
+    sent, requests = asyncio.Event(), []
+
+    async def handle(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        await sent.wait()
+        return httpx.Response(200)
+
+    purger = CDNPurger("http://cdn.test/purge", timeout=1)
+    purger.client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+    # the write doesn't wait for the CDN
+    await asyncio.wait_for(purger.purge_in_background(("hotel:1",)), timeout=0.1)
+    assert len(purger.purges) == 1
+
+    sent.set()
+    await purger.close()
+    assert not purger.purges
+    assert requests[0].headers["Surrogate-Key"] == "hotel:1"
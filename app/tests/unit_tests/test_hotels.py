@@ -2,6 +2,8 @@ from datetime import date
 
 import pytest
 
+from app.services.hotels import MAX_SEARCH_TAGS, HotelsService
+from app.utils.cache import ANY_HOTEL_TAG, HOTELS_TAG, location_tag
 from app.utils.transaction_manager import ITransactionManager
 
 
@@ -30,3 +32,57 @@ async def test_get_hotels_by_location_and_time(
         assert len(hotels) == total_hotels
         for hotel in hotels:
             assert location.lower() in hotel["location"].lower()
+
+
+@pytest.mark.parametrize(
+    "location,expected_location",
+    [
+        ("Алтаи", "Алтай"),
+        ("Сыктывкр", "Сыктывкар"),
+    ],
+)
+async def test_get_hotels_by_location_and_time_fuzzy(
+    location: str,
+    expected_location: str,
+    transaction_manager: ITransactionManager,
+) -> None:
+    async with transaction_manager:
+        hotels = await transaction_manager.hotels.get_hotels_by_location_and_time(
+            location=location,
+            date_from=date(2023, 9, 10),
+            date_to=date(2023, 9, 20),
+            fuzzy=True,
+        )
+        assert hotels
+        for hotel in hotels:
+            assert expected_location in hotel["location"]
+
+
+def test_search_cache_tags_do_not_list_hotels() -> None:
+    tags = HotelsService.get_search_cache_tags(
+        location="Алтай", date_from=date(2030, 5, 25), date_to=date(2030, 6, 5)
+    )
+    assert tags == [HOTELS_TAG, location_tag("Алтай")]
+
+
+def test_found_hotels_tags() -> None:
+    tags = HotelsService._get_found_hotels_tags(
+        hotel_ids=[1, 2], date_from=date(2030, 5, 31), date_to=date(2030, 6, 1)
+    )
+    assert tags == [
+        "hotel:1",
+        "hotel:1:2030-05-31",
+        "hotel:1:2030-06-01",
+        "hotel:2",
+        "hotel:2:2030-05-31",
+        "hotel:2:2030-06-01",
+    ]
+
+
+def test_found_hotels_tags_of_large_search() -> None:
+    tags = HotelsService._get_found_hotels_tags(
+        hotel_ids=list(range(MAX_SEARCH_TAGS)),
+        date_from=date(2030, 5, 31),
+        date_to=date(2030, 6, 1),
+    )
+    assert tags == [ANY_HOTEL_TAG, "hotels:2030-05-31", "hotels:2030-06-01"]
@@ -0,0 +1,37 @@
+import asyncio
+import time
+
+from prometheus_client import REGISTRY
+
+from app.config import settings
+from app.utils.auth import get_password_hash, verify_password
+
+
+async def test_verify_password() -> None:
+    hashed_password = await get_password_hash("user1")
+    assert await verify_password("user1", hashed_password)
+    assert not await verify_password("user2", hashed_password)
+
+
+async def test_hashing_does_not_block_event_loop() -> None:
+    """While passwords are hashed the event loop keeps switching
+    between tasks without waiting for bcrypt"""
+    hashes = [
+        asyncio.create_task(get_password_hash(f"user{i}"))
+        for i in range(settings.PASSWORD_HASHING_WORKERS * 3)
+    ]
+    await asyncio.sleep(0)
+    # the calls that exceed the pool concurrency wait in the queue
+    assert REGISTRY.get_sample_value("password_hashing_queue_depth") > 0
+
+    longest_pause = 0.0
+    while not all(task.done() for task in hashes):
+        started = time.perf_counter()
+        await asyncio.sleep(0.001)
+        longest_pause = max(longest_pause, time.perf_counter() - started)
+    await asyncio.gather(*hashes)
+
+    # a single bcrypt round takes hundreds of milliseconds
+    assert longest_pause < 0.05
+    assert REGISTRY.get_sample_value("password_hashing_queue_depth") == 0
+    assert REGISTRY.get_sample_value("password_hashing_in_progress") == 0
@@ -0,0 +1,36 @@
+from datetime import date
+
+from prometheus_client import REGISTRY
+
+from app.utils.transaction_manager import ITransactionManager
+
+
+def sample(name: str, method: str) -> float:
+    labels = {"repository": "HotelsRepository", "method": method}
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+async def test_queries_are_measured_by_repository_method(
+    transaction_manager: ITransactionManager,
+) -> None:
+    queries = sample("db_query_duration_seconds_count", "find_all")
+    rows = sample("db_query_rows_total", "find_all")
+    search_queries = sample(
+        "db_query_duration_seconds_count", "get_hotels_by_location_and_time"
+    )
+
+    async with transaction_manager:
+        hotels = await transaction_manager.hotels.find_all()
+        await transaction_manager.hotels.get_hotels_by_location_and_time(
+            location="Алтай", date_from=date(2023, 9, 10), date_to=date(2023, 9, 20)
+        )
+        await transaction_manager.commit()
+
+    # the inherited methods are labelled by the repository using them
+    assert sample("db_query_duration_seconds_count", "find_all") == queries + 1
+    assert sample("db_query_rows_total", "find_all") == rows + len(hotels)
+    assert len(hotels) > 0
+    assert (
+        sample("db_query_duration_seconds_count", "get_hotels_by_location_and_time")
+        == search_queries + 1
+    )
@@ -0,0 +1,321 @@
+"""
+Checks the query plans of the heavy repository queries
+on a large generated dataset, skipped by default, run with -m query_plans
+"""
+import hashlib
+import uuid
+from contextlib import contextmanager
+from datetime import date
+
+import pytest
+from sqlalchemy import event, text
+
+from app.database import async_session_maker, engine
+from app.repositories.bookings import BookingsRepository
+from app.utils.transaction_manager import ITransactionManager
+
+pytestmark = pytest.mark.query_plans
+
+TOTAL_USERS = 100_000
+TOTAL_REFRESH_SESSIONS = 200_000
+TOTAL_HOTELS = 10_000
+ROOMS_PER_HOTEL = 2
+TOTAL_BOOKINGS = 1_000_000
+
+
+@pytest.fixture(scope="module", autouse=True)
+async def large_dataset():
+    """
+    Adds generated users, refresh sessions, hotels, rooms and bookings
+    to the mock data, deletes them after the module
+    """
+    async with async_session_maker() as session:
+        await session.execute(
+            text(
+                """
+                INSERT INTO users (email, hashed_password, role)
+                SELECT 'generated' || i || '@example.com', 'generated', 'user'
+                FROM generate_series(1, :total_users) AS i
+                """
+            ),
+            {"total_users": TOTAL_USERS},
+        )
+        await session.execute(
+            text(
+                """
+                INSERT INTO refresh_sessions (refresh_token, expires_in, user_id)
+                SELECT md5(i::text)::uuid, 3600, first_user.id + i % :total_users
+                FROM generate_series(1, :total_refresh_sessions) AS i,
+                    (
+                        SELECT min(id) AS id FROM users
+                        WHERE email LIKE 'generated%'
+                    ) AS first_user
+                """
+            ),
+            {
+                "total_users": TOTAL_USERS,
+                "total_refresh_sessions": TOTAL_REFRESH_SESSIONS,
+            },
+        )
+        await session.execute(
+            text(
+                """
+                INSERT INTO hotels (owner_id, name, location, services, rooms_quantity)
+                SELECT 3, 'Generated ' || i, 'Generated location ' || i, '[]', 10
+                FROM generate_series(1, :total_hotels) AS i
+                """
+            ),
+            {"total_hotels": TOTAL_HOTELS},
+        )
+        await session.execute(
+            text(
+                """
+                INSERT INTO rooms (hotel_id, name, price, services, quantity)
+                SELECT hotels.id, 'Generated room', 1000, '[]', 5
+                FROM hotels, generate_series(1, :rooms_per_hotel)
+                WHERE hotels.name LIKE 'Generated %'
+                """
+            ),
+            {"rooms_per_hotel": ROOMS_PER_HOTEL},
+        )
+        # spread stays of 1-14 days over ten years
+        await session.execute(
+            text(
+                """
+                INSERT INTO bookings (room_id, user_id, date_from, date_to, price)
+                SELECT
+                    first_room.id + i % :total_rooms,
+                    first_user.id + i % :total_users,
+                    date '2025-01-01' + i % 3650 * 7919 % 3650,
+                    date '2025-01-01' + i % 3650 * 7919 % 3650 + 1 + i % 14,
+                    1000
+                FROM generate_series(1, :total_bookings) AS i,
+                    (SELECT min(id) AS id FROM rooms WHERE name = 'Generated room')
+                    AS first_room,
+                    (
+                        SELECT min(id) AS id FROM users
+                        WHERE email LIKE 'generated%'
+                    ) AS first_user
+                """
+            ),
+            {
+                "total_rooms": TOTAL_HOTELS * ROOMS_PER_HOTEL,
+                "total_users": TOTAL_USERS,
+                "total_bookings": TOTAL_BOOKINGS,
+            },
+        )
+        # the days of every tenth booking are enough for a large inventory
+        await session.execute(
+            text(
+                """
+                INSERT INTO room_inventory (room_id, day, booked)
+                SELECT room_id, date_from + night, count(*)
+                FROM bookings, generate_series(0, total_days) AS night
+                WHERE id % 10 = 0
+                GROUP BY room_id, date_from + night
+                """
+            )
+        )
+        await session.commit()
+    # flushes the pending lists of the GIN indexes as autovacuum would
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("VACUUM ANALYZE"))
+
+    yield
+
+    # the rooms and their bookings are deleted with the hotels,
+    # the sessions with the users
+    async with async_session_maker() as session:
+        await session.execute(text("DELETE FROM hotels WHERE name LIKE 'Generated %'"))
+        await session.execute(text("DELETE FROM users WHERE email LIKE 'generated%'"))
+        # only the days of a part of the generated bookings were added
+        await BookingsRepository(session).rebuild_room_inventory()
+        await session.commit()
+
+
+@contextmanager
+def catch_queries() -> list:
+    """Collects statements and parameters sent to the database"""
+    queries = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, *args):
+        queries.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield queries
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+async def explain(transaction_manager: ITransactionManager, queries: list) -> list:
+    """Returns all nodes of the plans of the caught queries"""
+    connection = await transaction_manager.session.connection()
+    nodes = []
+    for statement, parameters in queries:
+        result = await connection.exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {statement}", parameters
+        )
+        plans = [result.scalar()[0]["Plan"]]
+        while plans:
+            plan = plans.pop()
+            nodes.append(plan)
+            plans.extend(plan.get("Plans", []))
+    return nodes
+
+
+@pytest.mark.parametrize(
+    "repository,method,params",
+    [
+        ("users", "find_one_or_none", {"id": 4242}),
+        ("users", "find_by_email", {"email": "Generated4242@example.com"}),
+        (
+            "users",
+            "add_user",
+            {
+                "email": "Generated4242@example.com",
+                "hashed_password": "generated",
+                "role": "user",
+            },
+        ),
+        (
+            "auth",
+            "rotate_session",
+            {
+                "refresh_token": str(uuid.UUID(hashlib.md5(b"4242").hexdigest())),
+                "new_refresh_token": uuid.uuid4(),
+                "expires_in": 60,
+            },
+        ),
+        (
+            "auth",
+            "pop_session",
+            {"refresh_token": str(uuid.UUID(hashlib.md5(b"4243").hexdigest()))},
+        ),
+        ("auth", "delete_user_sessions", {"user_id": 4242}),
+        ("auth", "count_user_sessions", {"user_id": 4242}),
+        ("bookings", "get_bookings", {"user_id": 4242}),
+        (
+            "bookings",
+            "add_booking",
+            {
+                "room_id": 4242,
+                "user_id": 4242,
+                "date_from": date(2030, 5, 1),
+                "date_to": date(2030, 5, 15),
+            },
+        ),
+        (
+            "bookings",
+            "get_rooms_left",
+            {
+                "room_id": 4242,
+                "date_from": date(2030, 5, 1),
+                "date_to": date(2030, 5, 15),
+            },
+        ),
+        (
+            "bookings",
+            "release_room",
+            {
+                "room_id": 4242,
+                "date_from": date(2030, 5, 1),
+                "date_to": date(2030, 5, 15),
+            },
+        ),
+        ("bookings", "release_user_rooms", {"user_id": 4242}),
+        (
+            "rooms",
+            "get_available_hotel_rooms",
+            {
+                "hotel_id": 4242,
+                "date_from": date(2030, 5, 1),
+                "date_to": date(2030, 5, 15),
+            },
+        ),
+        ("rooms", "get_rooms_left", {"hotel_id": 4242}),
+        (
+            "hotels",
+            "get_hotels_by_location_and_time",
+            {
+                "location": "Generated location 4242",
+                "date_from": date(2030, 5, 1),
+                "date_to": date(2030, 5, 15),
+            },
+        ),
+    ],
+)
+async def test_repository_methods_do_not_scan_tables(
+    repository: str,
+    method: str,
+    params: dict,
+    transaction_manager: ITransactionManager,
+) -> None:
+    async with transaction_manager:
+        with catch_queries() as queries:
+            await getattr(getattr(transaction_manager, repository), method)(**params)
+        nodes = await explain(transaction_manager, queries)
+        seq_scans = [
+            node["Relation Name"] for node in nodes if node["Node Type"] == "Seq Scan"
+        ]
+        assert not seq_scans
+
+
+@pytest.mark.parametrize(
+    "location,date_from,date_to",
+    [
+        ("Generated location 42", date(2030, 5, 1), date(2030, 5, 15)),
+        ("Generated location 9999", date(2027, 1, 1), date(2027, 3, 1)),
+    ],
+)
+async def test_hotels_by_location_and_time_use_stay_index(
+    location: str,
+    date_from: date,
+    date_to: date,
+    transaction_manager: ITransactionManager,
+) -> None:
+    async with transaction_manager:
+        with catch_queries() as queries:
+            await transaction_manager.hotels.get_hotels_by_location_and_time(
+                location=location, date_from=date_from, date_to=date_to
+            )
+        nodes = await explain(transaction_manager, queries)
+        for node in nodes:
+            if node.get("Relation Name") == "bookings":
+                assert node["Node Type"] != "Seq Scan"
+        # the overlap condition must be checked by the index, not by a filter
+        assert any(
+            node.get("Index Name") == "ix_bookings_room_id_stay"
+            and "&&" in node["Index Cond"]
+            for node in nodes
+        )
+
+
+@pytest.mark.parametrize(
+    "location,fuzzy",
+    [
+        ("Сыктывкар", False),
+        ("Сыктывкр", True),
+    ],
+)
+async def test_hotels_by_location_use_trigram_index(
+    location: str,
+    fuzzy: bool,
+    transaction_manager: ITransactionManager,
+) -> None:
+    async with transaction_manager:
+        with catch_queries() as queries:
+            await transaction_manager.hotels.get_hotels_by_location_and_time(
+                location=location,
+                date_from=date(2030, 5, 1),
+                date_to=date(2030, 5, 15),
+                fuzzy=fuzzy,
+            )
+        nodes = await explain(transaction_manager, queries)
+        for node in nodes:
+            if node.get("Relation Name") == "hotels":
+                assert node["Node Type"] != "Seq Scan"
+        assert any(
+            node.get("Index Name") == "ix_hotels_location_trgm" for node in nodes
+        )
@@ -0,0 +1,35 @@
+import asyncio
+import uuid
+
+import pytest
+from redis import asyncio as aioredis
+
+from app.config import settings
+from app.utils.rate_limiter import TokenBucketLimiter
+
+# nothing listens on this port, so the limiter falls back to memory
+unavailable_redis = aioredis.from_url("redis://127.0.0.1:1")
+limiters = [
+    TokenBucketLimiter(aioredis.from_url(settings.redis_url), "test"),
+    TokenBucketLimiter(unavailable_redis, "test"),
+]
+
+
+@pytest.mark.parametrize("limiter", limiters)
+async def test_acquire_empties_bucket(limiter: TokenBucketLimiter) -> None:
+    key, other_key = uuid.uuid4().hex, uuid.uuid4().hex
+    for _ in range(3):
+        assert await limiter.acquire(key, capacity=3, period=60) == 0
+    # one token is refilled every 20 seconds
+    assert await limiter.acquire(key, capacity=3, period=60) == 20
+    assert await limiter.acquire(other_key, capacity=3, period=60) == 0
+
+
+@pytest.mark.parametrize("limiter", limiters)
+async def test_acquire_after_refill(limiter: TokenBucketLimiter) -> None:
+    key = uuid.uuid4().hex
+    for _ in range(10):
+        assert await limiter.acquire(key, capacity=10, period=1) == 0
+    assert await limiter.acquire(key, capacity=10, period=1) == 1
+    await asyncio.sleep(0.2)
+    assert await limiter.acquire(key, capacity=10, period=1) == 0
@@ -0,0 +1,126 @@
+import asyncio
+import uuid
+
+import pytest
+
+from app.config import settings
+from app.repositories.auths import RedisAuthsRepository
+from app.scripts.migrate_refresh_sessions import migrate_refresh_sessions
+from app.utils.transaction_manager import (
+    ITransactionManager,
+    TransactionManager,
+    redis_auths_repository,
+    refresh_sessions_redis,
+)
+
+
+@pytest.fixture(params=["postgres", "redis"])
+async def backend(
+    request: pytest.FixtureRequest,
+    transaction_manager: ITransactionManager,
+    monkeypatch: pytest.MonkeyPatch,
+) -> str:
+    """Keeps the sessions in each backend, starting without sessions of user 1"""
+    monkeypatch.setattr(settings, "REFRESH_SESSION_BACKEND", request.param)
+    async with transaction_manager:
+        # sessions in Redis outlive the test database
+        await transaction_manager.auth.delete_user_sessions(user_id=1)
+        await transaction_manager.commit()
+    return request.param
+
+
+async def test_rotate_session(
+    backend: str, transaction_manager: ITransactionManager
+) -> None:
+    token, new_token = uuid.uuid4(), uuid.uuid4()
+    async with transaction_manager:
+        await transaction_manager.auth.create_session(
+            refresh_token=token, user_id=1, expires_in=60
+        )
+        user = await transaction_manager.auth.rotate_session(
+            refresh_token=str(token), new_refresh_token=new_token, expires_in=60
+        )
+        assert user.id == 1
+        # the old token is not valid anymore
+        user = await transaction_manager.auth.rotate_session(
+            refresh_token=str(token), new_refresh_token=uuid.uuid4(), expires_in=60
+        )
+        assert user is None
+        assert await transaction_manager.auth.count_user_sessions(user_id=1) == 1
+
+        assert await transaction_manager.auth.pop_session(str(new_token)) == 1
+        assert await transaction_manager.auth.pop_session(str(new_token)) is None
+        assert await transaction_manager.auth.count_user_sessions(user_id=1) == 0
+        await transaction_manager.commit()
+
+
+async def test_expired_session_is_not_rotated(
+    backend: str,
+    transaction_manager: ITransactionManager,
+) -> None:
+    token = uuid.uuid4()
+    async with transaction_manager:
+        await transaction_manager.auth.create_session(
+            refresh_token=token, user_id=1, expires_in=1
+        )
+        await transaction_manager.commit()
+    await asyncio.sleep(1.1)
+    async with transaction_manager:
+        assert await transaction_manager.auth.count_user_sessions(user_id=1) == 0
+        user = await transaction_manager.auth.rotate_session(
+            refresh_token=str(token), new_refresh_token=uuid.uuid4(), expires_in=60
+        )
+        assert user is None
+
+
+async def test_delete_user_sessions(
+    backend: str,
+    transaction_manager: ITransactionManager,
+) -> None:
+    async with transaction_manager:
+        for user_id in (1, 1, 2):
+            await transaction_manager.auth.create_session(
+                uuid.uuid4(), user_id=user_id, expires_in=60
+            )
+        await transaction_manager.auth.delete_user_sessions(user_id=1)
+        assert await transaction_manager.auth.count_user_sessions(user_id=1) == 0
+        assert await transaction_manager.auth.count_user_sessions(user_id=2) >= 1
+        await transaction_manager.commit()
+
+
+async def test_redis_scripts_are_shared_by_managers(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(settings, "REFRESH_SESSION_BACKEND", "redis")
+    managers = [TransactionManager(), TransactionManager()]
+    for transaction_manager in managers:
+        async with transaction_manager:
+            auth = transaction_manager.auth
+            assert auth.users is transaction_manager.users
+            assert (
+                auth.rotate_session_script
+                is redis_auths_repository.rotate_session_script
+            )
+        await transaction_manager.close()
+    assert redis_auths_repository.users is None
+
+
+async def test_migrate_refresh_sessions(
+    transaction_manager: ITransactionManager,
+) -> None:
+    repository = RedisAuthsRepository(refresh_sessions_redis, "test_migration")
+    await repository.delete_user_sessions(user_id=3)
+    tokens = [uuid.uuid4() for _ in range(3)]
+    async with transaction_manager:
+        await transaction_manager.auth.delete_user_sessions(user_id=3)
+        for token in tokens:
+            await transaction_manager.auth.create_session(
+                token, user_id=3, expires_in=60
+            )
+        await transaction_manager.commit()
+
+    assert await migrate_refresh_sessions(repository, delete_migrated=True) >= 3
+    assert await repository.count_user_sessions(user_id=3) == 3
+    assert await repository.pop_session(str(tokens[0])) == 3
+    async with transaction_manager:
+        assert await transaction_manager.auth.count_user_sessions(user_id=3) == 0
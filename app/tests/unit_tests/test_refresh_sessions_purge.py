@@ -0,0 +1,155 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import insert, select, text
+
+from app.database import engine
+from app.models.users import RefreshSessions
+from app.services.auths import PARTITIONS_AHEAD_DAYS, AuthsService
+from app.utils.transaction_manager import ITransactionManager
+
+
+async def add_sessions(
+    transaction_manager: ITransactionManager,
+    user_id: int,
+    created_at: datetime,
+    expires_in: int,
+    total: int = 1,
+) -> None:
+    async with transaction_manager:
+        await transaction_manager.session.execute(
+            insert(RefreshSessions),
+            [
+                {
+                    "refresh_token": uuid.uuid4(),
+                    "expires_in": expires_in,
+                    "created_at": created_at,
+                    "user_id": user_id,
+                }
+                for _ in range(total)
+            ],
+        )
+        await transaction_manager.commit()
+
+
+@pytest.fixture
+async def partitioned_sessions() -> None:
+    """
+    The same layout as after the migration with partitioning requested,
+    without any partitions, the table of the models is restored afterwards
+    """
+    async with engine.begin() as conn:
+        await conn.execute(text("DROP TABLE refresh_sessions"))
+        await conn.execute(
+            text(
+                "CREATE TABLE refresh_sessions ("
+                "id SERIAL, refresh_token UUID NOT NULL, expires_in INTEGER NOT NULL, "
+                "created_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL, "
+                "user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE, "
+                "PRIMARY KEY (id, created_at)) PARTITION BY RANGE (created_at)"
+            )
+        )
+    yield
+    async with engine.begin() as conn:
+        await conn.execute(text("DROP TABLE refresh_sessions"))
+        await conn.run_sync(RefreshSessions.__table__.create)
+
+
+async def get_partitions(transaction_manager: ITransactionManager) -> set[str]:
+    async with transaction_manager:
+        partitions = await transaction_manager.session.execute(
+            text(
+                "SELECT inhrelid::regclass::text FROM pg_inherits "
+                "WHERE inhparent = 'refresh_sessions'::regclass"
+            )
+        )
+        return set(partitions.scalars().all())
+
+
+async def get_expires_in(transaction_manager: ITransactionManager) -> list[int]:
+    async with transaction_manager:
+        query = select(RefreshSessions.expires_in).order_by(RefreshSessions.expires_in)
+        result = await transaction_manager.session.execute(query)
+        return list(result.scalars().all())
+
+
+async def test_purge_expired_sessions(
+    transaction_manager: ITransactionManager,
+) -> None:
+    now = datetime.now(timezone.utc)
+    await add_sessions(transaction_manager, 1, now - timedelta(hours=1), 60, total=5)
+    await add_sessions(transaction_manager, 2, now - timedelta(days=1), 86400 * 30)
+    await add_sessions(transaction_manager, 3, now, 60)
+
+    deleted = await AuthsService.purge_expired_sessions(
+        transaction_manager=transaction_manager, batch_size=2
+    )
+    assert deleted == 5
+    assert await get_expires_in(transaction_manager) == [60, 86400 * 30]
+
+
+async def test_purge_drops_expired_partitions(
+    partitioned_sessions: None,
+    transaction_manager: ITransactionManager,
+) -> None:
+    today = datetime.now(timezone.utc).date()
+    async with transaction_manager:
+        assert await transaction_manager.auth.is_partitioned()
+        await transaction_manager.auth.create_partitions(
+            first_day=today - timedelta(days=3), last_day=today
+        )
+        await transaction_manager.commit()
+
+    now = datetime.now(timezone.utc)
+    # only expired sessions were created three days ago
+    await add_sessions(transaction_manager, 1, now - timedelta(days=3), 60, total=3)
+    # one of the sessions of two days ago is still active
+    await add_sessions(transaction_manager, 1, now - timedelta(days=2), 60, total=2)
+    await add_sessions(transaction_manager, 2, now - timedelta(days=2), 86400 * 30)
+
+    deleted = await AuthsService.purge_expired_sessions(
+        transaction_manager=transaction_manager, batch_size=1000
+    )
+    # the sessions of the dropped partitions are not deleted one by one
+    assert deleted == 2
+    assert await get_expires_in(transaction_manager) == [86400 * 30]
+
+    days = [today + timedelta(days=day) for day in range(-2, PARTITIONS_AHEAD_DAYS + 1)]
+    assert await get_partitions(transaction_manager) == {
+        f"refresh_sessions_p{day:%Y%m%d}"
+        for day in days
+        if day != today - timedelta(days=1)
+    }
+
+
+async def test_missing_partition_is_created_by_request(
+    partitioned_sessions: None,
+    transaction_manager: ITransactionManager,
+) -> None:
+    # the purge task has not run since yesterday
+    today = datetime.now(timezone.utc).date()
+    yesterday = today - timedelta(days=1)
+    async with transaction_manager:
+        await transaction_manager.auth.create_partitions(
+            first_day=yesterday, last_day=yesterday
+        )
+        await transaction_manager.commit()
+    token = uuid.uuid4()
+    async with transaction_manager:
+        await transaction_manager.session.execute(
+            insert(RefreshSessions).values(
+                refresh_token=token,
+                expires_in=86400 * 30,
+                created_at=datetime.now(timezone.utc) - timedelta(days=1),
+                user_id=1,
+            )
+        )
+        await transaction_manager.commit()
+
+    # the prolonged session is moved to the partition of today
+    new_token = await AuthsService().refresh_token(transaction_manager, str(token))
+    assert new_token.refresh_token != token
+    partitions = await get_partitions(transaction_manager)
+    assert f"refresh_sessions_p{today:%Y%m%d}" in partitions
+    assert len(partitions) == PARTITIONS_AHEAD_DAYS + 2
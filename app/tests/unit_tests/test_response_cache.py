@@ -0,0 +1,345 @@
+import asyncio
+import time
+import uuid
+from datetime import date
+from typing import Callable
+
+import pytest
+from prometheus_client import REGISTRY
+from redis import asyncio as aioredis
+
+from app.utils.cache import (
+    LocalResponseCache,
+    ResponseCache,
+    add_tags,
+    build_key,
+    computed_entry_tags,
+    days_tags,
+    decode_entry,
+    encode_entry,
+    etag_matches,
+    hotel_days_tags,
+    response_cache,
+)
+from app.utils.transaction_manager import TransactionManager
+
+# nothing listens on this port, so the responses are not cached
+unavailable_redis = aioredis.from_url("redis://127.0.0.1:1")
+
+
+def new_cache(prefix: str = "", local: bool = False, **kwargs) -> ResponseCache:
+    """Keeps the entries of every test apart from the others"""
+    return ResponseCache(
+        response_cache.redis,
+        prefix or f"test_cache:{uuid.uuid4().hex}",
+        local=LocalResponseCache(maxsize=10, expire=60) if local else None,
+        **kwargs,
+    )
+
+
+def slow_computation(value: bytes, calls: list) -> Callable:
+    async def compute() -> tuple[bytes, list[str]]:
+        calls.append(value)
+        await asyncio.sleep(0.1)
+        return value, ["hotel:1"]
+
+    return compute
+
+
+async def test_invalidate_tags() -> None:
+    cache = new_cache()
+    generation = await cache.get_generation()
+    assert await cache.set("first", b"1", 60, ["hotel:1", "hotel:2"], generation)
+    assert await cache.set("second", b"2", 60, ["hotel:2"], generation)
+    assert await cache.set("third", b"3", 60, ["hotel:3"], generation)
+
+    await cache.invalidate("hotel:1")
+    assert await cache.get("first", "test") is None
+    assert await cache.get("second", "test") == b"2"
+
+    await cache.invalidate("hotel:2", "hotel:4")
+    assert await cache.get("second", "test") is None
+    assert await cache.get("third", "test") == b"3"
+
+
+async def test_tags_keep_only_living_entries() -> None:
+    cache = new_cache(stale_timeout=60)
+    short_lived = new_cache(cache.prefix)
+    generation = await cache.get_generation()
+    assert await short_lived.set("expired", b"1", 1, ["hotel:1"], generation)
+    await asyncio.sleep(1.1)
+    assert await cache.set("living", b"2", 60, ["hotel:1"], generation)
+
+    tag_key = f"{cache.prefix}:tags:hotel:1"
+    # a new entry does not extend the set beyond its own expiration
+    assert await cache.redis.ttl(tag_key) <= 120
+    assert await cache.redis.zrange(tag_key, 0, -1) == [
+        f"{cache.prefix}:living".encode()
+    ]
+
+    await cache.invalidate("hotel:1")
+    assert not await cache.redis.exists(
+        f"{cache.prefix}:living", f"{cache.prefix}:living:fresh", tag_key
+    )
+
+
+async def test_entry_computed_during_invalidation_is_not_stored() -> None:
+    cache = new_cache()
+    generation = await cache.get_generation()
+    # the data changes while the response is being computed
+    await cache.invalidate("hotel:1")
+    assert not await cache.set("first", b"1", 60, ["hotel:1", "hotel:2"], generation)
+    assert await cache.get("first", "test") is None
+
+    generation = await cache.get_generation()
+    assert await cache.set("first", b"1", 60, ["hotel:1", "hotel:2"], generation)
+    assert await cache.get("first", "test") == b"1"
+
+
+async def test_invalidation_of_other_tags_does_not_prevent_store() -> None:
+    cache = new_cache()
+    generation = await cache.get_generation()
+    await cache.invalidate("hotel:2")
+    assert await cache.set("first", b"1", 60, ["hotel:1"], generation)
+    assert await cache.get("first", "test") == b"1"
+
+
+def test_add_tags() -> None:
+    # outside of the computation of a cached response
+    add_tags("hotel:1")
+    entry_tags = ["hotels"]
+    token = computed_entry_tags.set(entry_tags)
+    try:
+        add_tags("hotel:1", "hotel:1:2030-05-10")
+    finally:
+        computed_entry_tags.reset(token)
+    assert entry_tags == ["hotels", "hotel:1", "hotel:1:2030-05-10"]
+    assert computed_entry_tags.get() is None
+
+
+async def test_hit_and_miss_counters() -> None:
+    def requests(result: str) -> float:
+        labels = {"endpoint": "get_rooms", "result": result}
+        return REGISTRY.get_sample_value("response_cache_requests_total", labels) or 0
+
+    cache = new_cache()
+    hits, misses = requests("hit"), requests("miss")
+    await cache.get("first", "get_rooms")
+    await cache.set("first", b"1", 60, ["hotel:1"], await cache.get_generation())
+    await cache.get("first", "get_rooms")
+    await cache.get("first", "get_rooms")
+    assert requests("hit") == hits + 2
+    assert requests("miss") == misses + 1
+
+
+async def test_concurrent_requests_compute_once() -> None:
+    cache, calls = new_cache(), []
+    compute = slow_computation(b"1", calls)
+    responses = await asyncio.gather(
+        *(cache.fetch("first", "test", compute, 60) for _ in range(10))
+    )
+    assert responses == [b"1"] * 10
+    assert calls == [b"1"]
+    assert not cache.flights
+    assert await cache.fetch("first", "test", compute, 60) == b"1"
+    assert calls == [b"1"]
+
+
+async def test_concurrent_requests_share_error() -> None:
+    cache, calls = new_cache(), []
+
+    async def compute() -> tuple[bytes, list[str]]:
+        calls.append(None)
+        await asyncio.sleep(0.1)
+        raise ValueError
+
+    results = await asyncio.gather(
+        *(cache.fetch("first", "test", compute, 60) for _ in range(3)),
+        return_exceptions=True,
+    )
+    assert all(isinstance(result, ValueError) for result in results)
+    assert len(calls) == 1
+    assert await cache.get("first", "test") is None
+
+
+async def test_cancelled_computation_is_taken_over() -> None:
+    cache, calls = new_cache(), []
+    compute = slow_computation(b"1", calls)
+    leader = asyncio.create_task(cache.fetch("first", "test", compute, 60))
+    await asyncio.sleep(0.01)
+    waiter = asyncio.create_task(cache.fetch("first", "test", compute, 60))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    assert await waiter == b"1"
+    assert len(calls) == 2
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+
+async def test_lock_shares_computation_between_workers() -> None:
+    prefix, calls = f"test_cache:{uuid.uuid4().hex}", []
+    workers = [new_cache(prefix, lock_timeout=5), new_cache(prefix, lock_timeout=5)]
+    responses = await asyncio.gather(
+        *(
+            worker.fetch("first", "test", slow_computation(str(i).encode(), calls), 60)
+            for i, worker in enumerate(workers)
+        )
+    )
+    assert len(calls) == 1
+    assert responses == [calls[0], calls[0]]
+    assert await response_cache.redis.get(f"{prefix}:lock:first") is None
+
+
+async def test_stale_response_is_returned_while_computed_again() -> None:
+    cache, calls = new_cache(stale_timeout=60), []
+    generation = await cache.get_generation()
+    assert await cache.set("first", b"old", 60, ["hotel:1"], generation)
+    await response_cache.redis.delete(f"{cache.prefix}:first:fresh")
+
+    compute = slow_computation(b"new", calls)
+    refresh = asyncio.create_task(cache.fetch("first", "test", compute, 60))
+    await asyncio.sleep(0.01)
+    assert await cache.fetch("first", "test", compute, 60) == b"old"
+    # the request which found the response expired waits for the new one
+    assert await refresh == b"new"
+    assert calls == [b"new"]
+    assert await cache.fetch("first", "test", compute, 60) == b"new"
+    assert 60 < await response_cache.redis.ttl(f"{cache.prefix}:first") <= 120
+
+
+def test_local_cache() -> None:
+    local = LocalResponseCache(maxsize=2, expire=60)
+    # nothing is kept until the invalidations are listened to
+    local.put("first", b"1", local.invalidations)
+    assert local.get("first") is None
+
+    local.subscribed = True
+    for key in ("first", "second", "third"):
+        local.put(key, key.encode(), local.invalidations)
+    # the least recently used response is dropped
+    assert local.get("first") is None
+    assert local.get("second") == b"second"
+
+    # the response was read before the invalidation message came
+    invalidations = local.invalidations
+    local.evict(["third"])
+    local.put("third", b"third", invalidations)
+    assert local.get("third") is None
+
+    local.expire = 0
+    local.put("fourth", b"fourth", local.invalidations)
+    time.sleep(0.001)
+    assert local.get("fourth") is None
+
+
+async def test_local_caches_are_invalidated_through_redis() -> None:
+    prefix = f"test_cache:{uuid.uuid4().hex}"
+    workers = [new_cache(prefix, local=True), new_cache(prefix, local=True)]
+    listeners = [
+        asyncio.create_task(worker.listen_invalidations()) for worker in workers
+    ]
+    while not all(worker.local.subscribed for worker in workers):
+        await asyncio.sleep(0.01)
+    try:
+        writer, reader = workers
+        generation = await writer.get_generation()
+        assert await writer.set("first", b"1", 60, ["hotel:1"], generation)
+        assert await reader.get("first", "test") == b"1"
+        # the other worker answers from its local cache
+        await response_cache.redis.delete(f"{prefix}:first")
+        assert await reader.get("first", "test") == b"1"
+
+        await writer.invalidate("hotel:1")
+        while reader.local.get(f"{prefix}:first") is not None:
+            await asyncio.sleep(0.01)
+        assert await reader.get("first", "test") is None
+    finally:
+        for listener in listeners:
+            listener.cancel()
+        await asyncio.gather(*listeners, return_exceptions=True)
+    assert not workers[0].local.subscribed
+
+
+async def test_etag_changes_with_tag_versions() -> None:
+    cache = new_cache()
+    etag = await cache.get_etag(["hotel:1", "room:2"])
+    assert etag == await cache.get_etag(["room:2", "hotel:1"])
+    assert etag != await cache.get_etag(["hotel:1"])
+
+    await cache.invalidate("hotel:3")
+    assert etag == await cache.get_etag(["hotel:1", "room:2"])
+    await cache.invalidate("room:2")
+    assert etag != await cache.get_etag(["hotel:1", "room:2"])
+
+
+def test_etag_matches() -> None:
+    assert etag_matches('"1"', '"1"')
+    assert etag_matches('"0", W/"1"', '"1"')
+    assert etag_matches("*", '"1"')
+    assert not etag_matches('"2"', '"1"')
+    assert not etag_matches(None, '"1"')
+
+
+async def test_unavailable_cache() -> None:
+    cache = ResponseCache(unavailable_redis)
+    assert await cache.get_generation() is None
+    assert await cache.get_etag(["hotel:1"]) is None
+    assert await cache.get("first", "test") is None
+    assert not await cache.set("first", b"1", 60, ["hotel:1"], b"0")
+    await cache.invalidate("hotel:1")
+
+
+def test_hotel_days_tags() -> None:
+    assert hotel_days_tags(1, date(2030, 5, 10), date(2030, 5, 10)) == [
+        "hotel:1:2030-05-10"
+    ]
+    assert hotel_days_tags(1, date(2030, 12, 30), date(2031, 1, 1)) == [
+        "hotel:1:2030-12-30",
+        "hotel:1:2030-12-31",
+        "hotel:1:2031-01-01",
+    ]
+
+
+def test_days_tags() -> None:
+    assert days_tags(date(2030, 12, 31), date(2031, 1, 1)) == [
+        "hotels:2030-12-31",
+        "hotels:2031-01-01",
+    ]
+
+
+def test_entry_keeps_response_headers() -> None:
+    body = '[{"id":1,"name":"Отель\\n"}]'.encode()
+    headers, decoded = decode_entry(encode_entry(body, {"Surrogate-Key": "hotel:1"}))
+    assert decoded == body
+    assert headers["Content-Type"] == "application/json"
+    assert headers["Surrogate-Key"] == "hotel:1"
+    assert headers["ETag"] == decode_entry(encode_entry(body, {}))[0]["ETag"]
+    assert headers["ETag"] != decode_entry(encode_entry(b"[]", {}))[0]["ETag"]
+    assert decode_entry(encode_entry(body, {"ETag": '"1"'}))[0]["ETag"] == '"1"'
+
+
+async def test_invalidation_hooks() -> None:
+    cache, invalidated = new_cache(), []
+
+    async def hook(tags: tuple[str, ...]) -> None:
+        invalidated.append(tags)
+
+    cache.invalidation_hooks.append(hook)
+    await cache.invalidate("hotel:1", "room:2")
+    # the hooks are called also while Redis is unavailable
+    unavailable_cache = ResponseCache(unavailable_redis)
+    unavailable_cache.invalidation_hooks.append(hook)
+    await unavailable_cache.invalidate("hotel:3")
+    assert invalidated == [("hotel:1", "room:2"), ("hotel:3",)]
+
+
+def test_key_does_not_depend_on_dependencies() -> None:
+    async def get_hotels(**kwargs):
+        pass
+
+    parameters = {"location": "Алтай", "date_from": date(2030, 5, 1), "fuzzy": False}
+    key = build_key(get_hotels, {**parameters, "transaction_manager": object()})
+    assert key == build_key(
+        get_hotels, {**parameters, "transaction_manager": TransactionManager()}
+    )
+    assert key != build_key(get_hotels, {**parameters, "fuzzy": True})
@@ -2,6 +2,8 @@ from datetime import date
 
 import pytest
 
+from app.exceptions import IncorrectDataRangeException
+from app.services.rooms import RoomsService
 from app.utils.transaction_manager import ITransactionManager
 
 
@@ -51,3 +53,15 @@ async def test_get_rooms_left(
             assert current_rooms_left == rooms_left
         else:
             assert not current_rooms_left
+
+
+def test_rooms_cache_tags() -> None:
+    tags = RoomsService.get_rooms_cache_tags(
+        hotel_id=1, date_from=date(2030, 5, 31), date_to=date(2030, 6, 1)
+    )
+    assert tags == ["hotel:1", "hotel:1:2030-05-31", "hotel:1:2030-06-01"]
+    # the range is checked before the tags of its days are made
+    with pytest.raises(IncorrectDataRangeException):
+        RoomsService.get_rooms_cache_tags(
+            hotel_id=1, date_from=date(2030, 5, 1), date_to=date(9999, 1, 1)
+        )
@@ -0,0 +1,96 @@
+import asyncio
+import json
+import logging
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+import pytest
+
+from app.config import settings
+from app.database import engine
+from app.logger import CustomJsonFormatter
+from app.utils.repository import query_source
+from app.utils.slow_queries import (
+    SlowQueryLog,
+    can_be_explained,
+    create_slow_query_logger,
+    parameter_shapes,
+)
+
+
+def slow_query_log(path: Path, sample_rate: float) -> SlowQueryLog:
+    log = logging.getLogger(f"test_slow_queries.{path.name}")
+    log.propagate = False
+    handler = RotatingFileHandler(path, maxBytes=1024 * 1024, backupCount=1)
+    handler.setFormatter(CustomJsonFormatter("%(message)s"))
+    log.addHandler(handler)
+    return SlowQueryLog(
+        engine, threshold=0.1, sample_rate=sample_rate, explain_timeout=1, log=log
+    )
+
+
+def entries(path: Path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_parameter_values_are_not_logged() -> None:
+    assert parameter_shapes(("Алтай", 3), False) == ["str", "int"]
+    assert parameter_shapes([(1, None), (2, None)], True) == {
+        "rows": 2,
+        "row": ["int", "NoneType"],
+    }
+
+
+async def test_slow_query_is_logged_with_its_plan(tmp_path: Path) -> None:
+    path = tmp_path / "slow_queries.log"
+    slow_queries = slow_query_log(path, sample_rate=1)
+    query_source.set(("HotelsRepository", "find_all"))
+
+    slow_queries.record("SELECT id FROM hotels WHERE id = $1", (1,), False, 0.01)
+    slow_queries.record("SELECT id FROM hotels WHERE id = $1", (1,), False, 0.2)
+    await asyncio.gather(*slow_queries.explains)
+
+    [entry] = entries(path)
+    assert entry["repository"] == "HotelsRepository"
+    assert entry["method"] == "find_all"
+    assert entry["parameters"] == ["int"]
+    assert entry["duration"] == 0.2
+    assert "Shared Hit Blocks" in entry["plan"][0]["Plan"]
+    assert entry["plan"][0]["Plan"]["Actual Loops"] >= 1
+
+
+async def test_writes_are_not_explained(tmp_path: Path) -> None:
+    path = tmp_path / "slow_queries.log"
+    slow_queries = slow_query_log(path, sample_rate=1)
+
+    slow_queries.record("DELETE FROM hotels WHERE id = $1", (1,), False, 0.2)
+    slow_queries.record(
+        "WITH room AS (SELECT id FROM rooms WHERE id = $1) "
+        "INSERT INTO bookings (room_id) SELECT id FROM room RETURNING bookings.id",
+        (1,),
+        False,
+        0.2,
+    )
+
+    assert not slow_queries.explains
+    assert all("plan" not in entry for entry in entries(path))
+
+
+def test_reads_can_be_explained() -> None:
+    assert can_be_explained("WITH free AS (SELECT 1) SELECT updated_at FROM free")
+    assert not can_be_explained("SELECT id FROM rooms FOR UPDATE")
+    assert not can_be_explained("SELECT pg_advisory_xact_lock($1)")
+
+
+def test_slow_queries_are_logged_to_the_file_if_it_is_set(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    path = tmp_path / "slow_queries.log"
+    monkeypatch.setattr(settings, "SLOW_QUERY_LOG_FILE", str(path))
+    [handler] = create_slow_query_logger("test_slow_queries.file").handlers
+    assert Path(handler.baseFilename) == path
+
+    monkeypatch.setattr(settings, "SLOW_QUERY_LOG_FILE", "")
+    [handler] = create_slow_query_logger("test_slow_queries.stderr").handlers
+    assert not isinstance(handler, RotatingFileHandler)
+    assert isinstance(handler, logging.StreamHandler)
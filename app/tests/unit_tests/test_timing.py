@@ -0,0 +1,62 @@
+import time
+
+import pytest
+from httpx import AsyncClient
+from starlette.applications import Starlette
+from starlette.responses import StreamingResponse
+from starlette.routing import Route
+
+from app.utils.timing import (
+    RequestPhases,
+    ServerTimingMiddleware,
+    add_phase_time,
+    request_phases,
+    timed,
+)
+
+
+def test_nested_phases_are_not_counted_twice() -> None:
+    phases = RequestPhases()
+    token = request_phases.set(phases)
+    try:
+        with timed("cache"):
+            with timed("serialization"):
+                time.sleep(0.02)
+            add_phase_time("db", 0.01)
+    finally:
+        request_phases.reset(token)
+    assert phases.durations["serialization"] >= 0.02
+    assert phases.durations["db"] == 0.01
+    assert phases.durations["cache"] < 0.01
+
+    durations = phases.total(1)
+    assert sum(durations.values()) == pytest.approx(1)
+    assert durations["app"] > 0.9
+
+
+def test_phases_outside_of_requests() -> None:
+    with timed("cache"):
+        add_phase_time("db", 0.01)
+    assert request_phases.get() is None
+
+
+async def test_server_timing_of_streaming_response() -> None:
+    async def numbers(request):
+        async def stream():
+            for number in range(3):
+                with timed("db"):
+                    yield str(number)
+
+        with timed("auth"):
+            time.sleep(0.01)
+        return StreamingResponse(stream())
+
+    app = ServerTimingMiddleware(Starlette(routes=[Route("/", numbers)]))
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get("/")
+    assert response.text == "012"
+    phases = dict(
+        phase.split(";dur=") for phase in response.headers["Server-Timing"].split(", ")
+    )
+    assert set(phases) == {"auth", "app"}
+    assert float(phases["auth"]) >= 10
@@ -0,0 +1,63 @@
+import time
+
+from prometheus_client import REGISTRY
+
+from app.utils.token_cache import VerifiedTokenCache
+
+
+def get_requests(result: str) -> float:
+    return REGISTRY.get_sample_value(
+        "access_token_cache_requests_total", {"result": result}
+    )
+
+
+def make_payload(user_id: int, expires_in: int = 60) -> dict:
+    return {"sub": str(user_id), "exp": time.time() + expires_in}
+
+
+def test_get_counts_hits_and_misses() -> None:
+    cache = VerifiedTokenCache(maxsize=10)
+    hits, misses = get_requests("hit"), get_requests("miss")
+
+    assert cache.get("token") is None
+    payload = make_payload(user_id=1)
+    cache.put("token", payload)
+    assert cache.get("token") == payload
+    assert cache.get("token") == payload
+
+    assert get_requests("hit") == hits + 2
+    assert get_requests("miss") == misses + 1
+
+
+def test_least_recently_used_token_is_dropped() -> None:
+    cache = VerifiedTokenCache(maxsize=2)
+    cache.put("first", make_payload(user_id=1))
+    cache.put("second", make_payload(user_id=2))
+    # the first token becomes the most recently used one
+    assert cache.get("first")
+    cache.put("third", make_payload(user_id=3))
+
+    assert cache.get("first")
+    assert cache.get("second") is None
+    assert cache.get("third")
+
+
+def test_expired_token_is_dropped() -> None:
+    cache = VerifiedTokenCache(maxsize=10)
+    cache.put("token", make_payload(user_id=1, expires_in=-1))
+
+    assert cache.get("token") is None
+    assert not cache.payloads
+
+
+def test_evict_tokens() -> None:
+    cache = VerifiedTokenCache(maxsize=10)
+    for token, user_id in (("first", 1), ("second", 1), ("third", 2)):
+        cache.put(token, make_payload(user_id=user_id))
+
+    cache.evict_token("third")
+    assert cache.get("third") is None
+    assert cache.get("first")
+
+    cache.evict_user_tokens(user_id=1)
+    assert not cache.payloads
@@ -0,0 +1,37 @@
+import time
+import uuid
+
+import pytest
+from redis import asyncio as aioredis
+
+from app.utils.token_denylist import TokenDenylist, token_denylist
+
+# nothing listens on this port, so the denylist falls back to memory
+unavailable_redis = aioredis.from_url("redis://127.0.0.1:1")
+
+
+@pytest.mark.parametrize("denylist", [token_denylist, TokenDenylist(unavailable_redis)])
+async def test_revoke_token(denylist: TokenDenylist) -> None:
+    jti, other_jti = uuid.uuid4().hex, uuid.uuid4().hex
+    user_id, issued_at = 1, time.time()
+    assert not await denylist.is_revoked(jti, user_id, issued_at)
+
+    await denylist.revoke_token(jti, expires_at=time.time() + 60)
+    assert await denylist.is_revoked(jti, user_id, issued_at)
+    assert not await denylist.is_revoked(other_jti, user_id, issued_at)
+
+    # expired tokens are not stored
+    await denylist.revoke_token(other_jti, expires_at=time.time() - 60)
+    assert not await denylist.is_revoked(other_jti, user_id, issued_at)
+
+
+@pytest.mark.parametrize("denylist", [token_denylist, TokenDenylist(unavailable_redis)])
+async def test_revoke_user_tokens(denylist: TokenDenylist) -> None:
+    user_id, other_user_id = 10_000 + int(time.time()), 1
+    issued_before = time.time()
+    await denylist.revoke_user_tokens(user_id)
+    issued_after = time.time()
+
+    assert await denylist.is_revoked(uuid.uuid4().hex, user_id, issued_before)
+    assert not await denylist.is_revoked(uuid.uuid4().hex, user_id, issued_after)
+    assert not await denylist.is_revoked(uuid.uuid4().hex, other_user_id, issued_before)
@@ -0,0 +1,65 @@
+import pytest
+
+from app.utils.transaction_manager import ITransactionManager
+
+
+async def get_email(transaction_manager: ITransactionManager, user_id: int) -> str:
+    async with transaction_manager:
+        user = await transaction_manager.users.find_one_or_none(id=user_id)
+        return user.email
+
+
+async def test_nested_blocks_share_session(
+    transaction_manager: ITransactionManager,
+) -> None:
+    async with transaction_manager:
+        session = transaction_manager.session
+        async with transaction_manager:
+            assert transaction_manager.session is session
+            async with transaction_manager:
+                assert transaction_manager.session is session
+        assert transaction_manager.session is session
+
+
+async def test_nested_commit_is_undone_by_outer_rollback(
+    transaction_manager: ITransactionManager,
+) -> None:
+    async with transaction_manager:
+        async with transaction_manager:
+            await transaction_manager.users.update_fields_by_id(
+                entity_id=1, email="nested_user1@example.com"
+            )
+            await transaction_manager.commit()
+        user = await transaction_manager.users.find_one_or_none(id=1)
+        assert user.email == "nested_user1@example.com"
+    assert await get_email(transaction_manager, user_id=1) == "user1@example.com"
+
+
+@pytest.mark.parametrize("raise_error", [True, False])
+async def test_nested_changes_are_undone_without_commit(
+    raise_error: bool, transaction_manager: ITransactionManager
+) -> None:
+    async with transaction_manager:
+        await transaction_manager.users.update_fields_by_id(
+            entity_id=1, email="outer_user1@example.com"
+        )
+        try:
+            async with transaction_manager:
+                await transaction_manager.users.update_fields_by_id(
+                    entity_id=2, email="nested_user2@example.com"
+                )
+                if raise_error:
+                    raise ValueError
+        except ValueError:
+            pass
+        await transaction_manager.commit()
+
+    assert await get_email(transaction_manager, user_id=1) == "outer_user1@example.com"
+    assert await get_email(transaction_manager, user_id=2) == "user2@example.com"
+
+    # undo changes
+    async with transaction_manager:
+        await transaction_manager.users.update_fields_by_id(
+            entity_id=1, email="user1@example.com"
+        )
+        await transaction_manager.commit()
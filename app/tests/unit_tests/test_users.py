@@ -1,5 +1,5 @@
 """
-Since the user repository does not have its own functions,
+Besides the own functions of the user repository,
 this file tests the SQLAlchemy repository's basic functions.
 """
 
@@ -33,6 +33,27 @@ async def test_users_find_one_or_none(
             assert not user
 
 
+@pytest.mark.parametrize(
+    "user_id,email,exists",
+    [
+        (1, "user1@example.com", True),
+        (1, "User1@Example.com", True),
+        (5, "ADMIN@EXAMPLE.COM", True),
+        (5, "unknownemail@test.com", False),
+    ],
+)
+async def test_users_find_by_email(
+    user_id: int, email: str, exists: bool, transaction_manager: ITransactionManager
+) -> None:
+    async with transaction_manager:
+        user = await transaction_manager.users.find_by_email(email=email)
+        if exists:
+            assert user.id == user_id
+            assert user.email == email.lower()
+        else:
+            assert not user
+
+
 @pytest.mark.parametrize(
     "role, total, emails",
     [
@@ -62,9 +83,10 @@ async def test_users_find_all(
 async def test_insert_data(
     email: str, password: str, role: str, transaction_manager: ITransactionManager
 ) -> None:
+    hashed_password = await get_password_hash(password)
     async with transaction_manager:
         new_user = await transaction_manager.users.insert_data(
-            email=email, hashed_password=get_password_hash(password), role=role
+            email=email, hashed_password=hashed_password, role=role
         )
         # check how SQLAlchemy returning function works
         assert isinstance(new_user, Users)
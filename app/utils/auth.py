@@ -1,12 +1,23 @@
-from typing import Optional
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
 
 from fastapi import Request
 from fastapi.security import OAuth2PasswordBearer
 from fastapi.security.utils import get_authorization_scheme_param
 from passlib.context import CryptContext
 
-from app.exceptions import IncorrectTokenFormatException
+from app.config import settings
+from app.exceptions import (
+    IncorrectTokenFormatException,
+    PasswordHashingOverloadedException,
+)
 from app.logger import logger
+from app.prometheus.metrics import (
+    password_hashing_in_progress,
+    password_hashing_queue_depth,
+)
+from app.utils.timing import timed
 
 
 class OAuth2PasswordBearerWithCookie(OAuth2PasswordBearer):
@@ -24,13 +35,53 @@ class OAuth2PasswordBearerWithCookie(OAuth2PasswordBearer):
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt releases the GIL, so the threads hash in parallel
+# while the event loop keeps serving other requests
+password_hashing_pool = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASHING_WORKERS,
+    thread_name_prefix="password-hashing",
+)
+# calls submitted to the pool and not completed yet, the running ones included
+pending_hashes = 0
+
+
+def _waiting_hashes() -> int:
+    """Calls submitted to the pool that no thread has picked up yet"""
+    return max(pending_hashes - settings.PASSWORD_HASHING_WORKERS, 0)
+
+
+password_hashing_queue_depth.set_function(_waiting_hashes)
+
 
 oauth2_scheme = OAuth2PasswordBearerWithCookie(tokenUrl="auth/login")
 
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+def _track_hashing(func: Callable[..., Any], *args: Any) -> Any:
+    with password_hashing_in_progress.track_inprogress():
+        return func(*args)
+
+
+async def _run_in_hashing_pool(func: Callable[..., Any], *args: Any) -> Any:
+    global pending_hashes
+    if _waiting_hashes() >= settings.PASSWORD_HASHING_QUEUE_SIZE:
+        logger.warning("Password hashing queue is full")
+        raise PasswordHashingOverloadedException(retry_after=1)
+    loop = asyncio.get_running_loop()
+    pending_hashes += 1
+    try:
+        with timed("auth"):
+            return await loop.run_in_executor(
+                password_hashing_pool, _track_hashing, func, *args
+            )
+    finally:
+        pending_hashes -= 1
+
+
+async def get_password_hash(password: str) -> str:
+    return await _run_in_hashing_pool(pwd_context.hash, password)
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_hashing_pool(
+        pwd_context.verify, plain_password, hashed_password
+    )
@@ -0,0 +1,757 @@
+import asyncio
+import hashlib
+import inspect
+import itertools
+import json
+import secrets
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from datetime import date, timedelta
+from functools import wraps
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from redis import asyncio as aioredis
+from redis.exceptions import LockError, RedisError
+
+from app.config import settings
+from app.logger import logger
+from app.prometheus.metrics import response_cache_local_size, response_cache_requests
+from app.utils.cdn import CachePolicy, cdn_purger, surrogate_keys
+from app.utils.timing import APP_PHASE, timed
+
+# the entry format is a part of the key, so the entries of the previous format
+# are not read after it is changed
+ENTRY_FORMAT = 4
+
+# seconds between the checks whether another worker has computed the response
+LOCK_POLL_INTERVAL = 0.05
+
+# parameter of the cached endpoints with the request, added by the decorator
+REQUEST_PARAMETER = "cache_request"
+
+# tags of the cached response being computed, extended by add_tags
+computed_entry_tags: ContextVar[Optional[list[str]]] = ContextVar(
+    "computed_entry_tags", default=None
+)
+
+# versions of the tags outlive the entries tagged with them,
+# an expired version only changes the ETags of the tag
+VERSION_EXPIRE_SECONDS = 7 * 24 * 60 * 60
+
+# hotels are created or moved to another location,
+# so any search may find a hotel it has not found before
+HOTELS_TAG = "hotels"
+
+# anything of any hotel is changed, the searches finding too many hotels
+# to be tagged by each of them are invalidated by it
+ANY_HOTEL_TAG = "hotels:any"
+
+# the invalidation of a tag is remembered until the computations
+# which began before it have ended
+INVALIDATION_EXPIRE_SECONDS = 60 * 60
+
+# stores the entry only if none of its tags was invalidated after
+# the generation its computation began with, a kept stale entry outlives
+# its freshness key, the entry key is added to the sorted set of every tag
+# of the entry, scored by the expiration time of the entry, the members
+# of the expired entries are removed on every store, so a set lives
+# as long as its latest entry and holds only the living ones
+SET_ENTRY_SCRIPT = """
+local tags = (#KEYS - 2) / 2
+for i = tags + 3, #KEYS do
+    if tonumber(redis.call('GET', KEYS[i]) or '0') > tonumber(ARGV[1]) then
+        return 0
+    end
+end
+local lifetime = tonumber(ARGV[2]) + tonumber(ARGV[4])
+redis.call('SET', KEYS[1], ARGV[3], 'EX', lifetime)
+if tonumber(ARGV[4]) > 0 then
+    redis.call('SET', KEYS[2], 1, 'EX', ARGV[2])
+end
+local now = tonumber(redis.call('TIME')[1])
+for i = 3, tags + 2 do
+    redis.call('ZREMRANGEBYSCORE', KEYS[i], '-inf', now)
+    redis.call('ZADD', KEYS[i], now + lifetime, KEYS[1])
+    if redis.call('TTL', KEYS[i]) < lifetime then
+        redis.call('EXPIRE', KEYS[i], lifetime)
+    end
+end
+return 1
+"""
+
+# marks the tags with the next generation, so the entries of the tags
+# computed meanwhile are not stored, the entries of the other tags are,
+# and deletes the versions of the tags, the entries of the tags
+# are not known before the script runs, so they are deleted after it
+INVALIDATE_TAGS_SCRIPT = """
+local generation = redis.call('INCR', KEYS[1])
+local tags = tonumber(ARGV[1])
+for i = 2, tags + 1 do
+    redis.call('DEL', KEYS[i])
+    redis.call('SET', KEYS[i + tags], generation, 'EX', ARGV[2])
+end
+"""
+
+
+# returns the versions of the tags, a missing version is set to a new random one,
+# so a version is never reused after it is deleted or expires
+GET_VERSIONS_SCRIPT = """
+local versions = {}
+for i = 1, #KEYS do
+    local version = redis.call('GET', KEYS[i])
+    if not version then
+        version = ARGV[i]
+        redis.call('SET', KEYS[i], version)
+    end
+    redis.call('EXPIRE', KEYS[i], ARGV[#ARGV])
+    table.insert(versions, version)
+end
+return versions
+"""
+
+
+def hotel_tag(hotel_id: int) -> str:
+    """Anything of the hotel or of its rooms is changed"""
+    return f"hotel:{hotel_id}"
+
+
+def location_tag(location: str) -> str:
+    """
+    Surrogate key of the searches of the location, lets them be purged
+    from the CDN by hand, the writes invalidate all searches with HOTELS_TAG,
+    since a hotel is found by the searches of many locations
+    """
+    return f"location:{location.lower()}"
+
+
+def room_tag(room_id: int) -> str:
+    """The room is changed or deleted"""
+    return f"room:{room_id}"
+
+
+def hotel_days_tags(hotel_id: int, date_from: date, date_to: date) -> list[str]:
+    """
+    Rooms of the hotel are booked or released for these days,
+    a booking invalidates only the entries of the hotel overlapping its stay
+    :param hotel_id:
+    :param date_from:
+    :param date_to: last day of the stay
+    :return: list[str]
+    """
+    return [f"hotel:{hotel_id}:{day}" for day in stay_days(date_from, date_to)]
+
+
+def days_tags(date_from: date, date_to: date) -> list[str]:
+    """
+    Rooms of any hotel are booked or released for these days,
+    the searches finding too many hotels to be tagged by the days
+    of each of them are invalidated by the bookings of all hotels
+    :param date_from:
+    :param date_to: last day of the stay
+    :return: list[str]
+    """
+    return [f"{HOTELS_TAG}:{day}" for day in stay_days(date_from, date_to)]
+
+
+def stay_days(date_from: date, date_to: date) -> list[str]:
+    """Days of the stay, formatted as YYYY-MM-DD"""
+    return [
+        (date_from + timedelta(days=day)).isoformat()
+        for day in range((date_to - date_from).days + 1)
+    ]
+
+
+def add_tags(*tags: str) -> None:
+    """
+    Tags the cached response being computed with the data only known
+    once it is read, like the hotels found by a search,
+    does nothing outside of the computation of a cached response
+    :param tags:
+    :return: None
+    """
+    entry_tags = computed_entry_tags.get()
+    if entry_tags is not None:
+        entry_tags.extend(tags)
+
+
+class LocalResponseCache:
+    """Per-worker LRU cache of the responses from Redis, the entries are
+    dropped by the invalidation messages published through Redis,
+    the responses are kept only while the worker is subscribed to them
+    and only for a short time, so a lost message is not noticed for long"""
+    def __init__(self, maxsize: int, expire: float):
+        self.maxsize = maxsize
+        self.expire = expire
+        # key -> (encoded response, expiration timestamp)
+        self.entries: OrderedDict[str, tuple[bytes, float]] = OrderedDict()
+        self.subscribed = False
+        # increased by every invalidation message, the responses read
+        # from Redis before a message are not kept after it
+        self.invalidations = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        :param key:
+        :return: the encoded response, None if it is not kept or has expired
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            self.evict([key])
+            return None
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: str, value: bytes, invalidations: int) -> None:
+        """
+        Keeps the response unless an invalidation message came
+        after it was read from Redis, the least recently used
+        response is dropped when the cache is full
+        :param key:
+        :param value: the encoded response
+        :param invalidations: the counter before the response was read
+        :return: None
+        """
+        if not self.subscribed or invalidations != self.invalidations:
+            return
+        self.entries[key] = (value, time.monotonic() + self.expire)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        response_cache_local_size.set(len(self.entries))
+
+    def evict(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self.entries.pop(key, None)
+        self.invalidations += 1
+        response_cache_local_size.set(len(self.entries))
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.invalidations += 1
+        response_cache_local_size.set(0)
+
+
+class ResponseCache:
+    """Encoded responses in Redis tagged with the data they were built from,
+    invalidating a tag deletes all entries tagged with it,
+    an entry is not stored if any tag was invalidated while it was computed,
+    so it can't keep the data which changed during its computation,
+    the hot responses are also kept in the local cache of the worker,
+    a missing response is computed once at a time by the worker,
+    with the lock - once at a time by all workers, the expired responses
+    may be kept stale to be returned to the other requests
+    while they are computed again by the request which found them expired,
+    while Redis is unavailable the responses are computed every time"""
+    def __init__(
+        self,
+        redis: aioredis.Redis,
+        prefix: str = "response_cache",
+        local: Optional[LocalResponseCache] = None,
+        lock_timeout: float = 0,
+        stale_timeout: int = 0,
+    ):
+        self.redis = redis
+        self.prefix = prefix
+        self.local = local
+        self.lock_timeout = lock_timeout
+        self.stale_timeout = stale_timeout
+        self.generation_key = f"{prefix}:generation"
+        self.channel = f"{prefix}:invalidations"
+        self.set_entry_script = redis.register_script(SET_ENTRY_SCRIPT)
+        self.invalidate_tags_script = redis.register_script(INVALIDATE_TAGS_SCRIPT)
+        self.get_versions_script = redis.register_script(GET_VERSIONS_SCRIPT)
+        # key -> the response being computed by the worker
+        self.flights: dict[str, asyncio.Future] = {}
+        # called with the invalidated tags, like the purge of the CDN
+        self.invalidation_hooks: list[Callable[[tuple[str, ...]], Awaitable]] = []
+
+    async def fetch(
+        self,
+        key: str,
+        endpoint: str,
+        compute: Callable[[], Awaitable[tuple[bytes, Iterable[str]]]],
+        expire: int,
+    ) -> bytes:
+        """
+        Returns the cached response or computes and stores it,
+        the concurrent requests of the key wait for the response being
+        computed, or get the stale response while it is computed,
+        the request which found the response expired computes it
+        and waits for it like on a miss, since the computation uses
+        the dependencies of this request, like its transaction manager,
+        which are closed once the request is answered
+        :param key:
+        :param endpoint: name of the cached endpoint for the hit and miss counters
+        :param compute: returns the encoded response and its tags
+        :param expire: seconds until the response expires
+        :return: the encoded response
+        """
+        value, fresh = await self._read(key, endpoint)
+        if fresh:
+            return value
+        while key in self.flights:
+            flight = self.flights[key]
+            if value is not None:
+                return value
+            try:
+                return await asyncio.shield(flight)
+            except asyncio.CancelledError:
+                # the computing request was cancelled, this one takes over
+                if not flight.cancelled():
+                    raise
+
+        flight = asyncio.get_running_loop().create_future()
+        self.flights[key] = flight
+        try:
+            value = await self._compute(key, compute, expire, stale_value=value)
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except Exception as exc:
+            flight.set_exception(exc)
+            # the waiters raise it as well, it is not logged as never retrieved
+            flight.exception()
+            raise
+        else:
+            flight.set_result(value)
+        finally:
+            del self.flights[key]
+        return value
+
+    async def get(self, key: str, endpoint: str) -> Optional[bytes]:
+        """
+        :param key:
+        :param endpoint: name of the cached endpoint for the hit and miss counters
+        :return: the encoded response, also a stale one, None if it is not cached
+        """
+        value, _ = await self._read(key, endpoint)
+        return value
+
+    async def get_generation(self) -> Optional[bytes]:
+        """
+        Returns the generation to be passed to set
+        before the entry computation begins
+        :return: None if Redis is unavailable
+        """
+        try:
+            return await self.redis.get(self.generation_key) or b"0"
+        except RedisError:
+            logger.warning("Response cache is unavailable")
+            return None
+
+    async def set(
+        self,
+        key: str,
+        value: bytes,
+        expire: int,
+        tags: Iterable[str],
+        generation: bytes,
+    ) -> bool:
+        """
+        Stores the entry unless a tag was invalidated after the generation
+        :param key:
+        :param value: the encoded response
+        :param expire: seconds until the entry expires
+        :param tags: what the response was built from
+        :param generation: got before the entry computation began
+        :return: whether the entry is stored
+        """
+        key, tags = f"{self.prefix}:{key}", list(tags)
+        if self.local is not None:
+            invalidations = self.local.invalidations
+        try:
+            stored = await self.set_entry_script(
+                keys=[
+                    key,
+                    f"{key}:fresh",
+                    *map(self._tag_key, tags),
+                    *map(self._invalidated_key, tags),
+                ],
+                args=[generation, expire, value, self.stale_timeout],
+            )
+        except RedisError:
+            logger.warning("Response cache is unavailable", extra={"key": key})
+            return False
+        if stored and self.local is not None:
+            self.local.put(key, value, invalidations)
+        return bool(stored)
+
+    async def invalidate(self, *tags: str) -> None:
+        """
+        Deletes the entries of the tags and calls the invalidation hooks,
+        must be called after the changes are committed,
+        so the entries are not computed again from the old data
+        :param tags:
+        :return: None
+        """
+        if not tags:
+            return
+        try:
+            await self.invalidate_tags_script(
+                keys=[
+                    self.generation_key,
+                    *(f"{self.prefix}:version:{tag}" for tag in tags),
+                    *map(self._invalidated_key, tags),
+                ],
+                args=[len(tags), INVALIDATION_EXPIRE_SECONDS],
+            )
+            deleted = await self._delete_entries(list(map(self._tag_key, tags)))
+        except RedisError:
+            logger.error("Response cache is not invalidated", extra={"tags": tags})
+        else:
+            logger.info("Response cache invalidated", extra={"entries": deleted})
+        for hook in self.invalidation_hooks:
+            await hook(tags)
+
+    async def get_etag(self, tags: Iterable[str]) -> Optional[str]:
+        """
+        The ETag of the responses made of the tags changes
+        whenever any of the tags is invalidated
+        :param tags:
+        :return: None if Redis is unavailable
+        """
+        tags = sorted(tags)
+        try:
+            versions = await self.get_versions_script(
+                keys=[f"{self.prefix}:version:{tag}" for tag in tags],
+                args=[
+                    *(secrets.token_hex(8) for _ in tags),
+                    VERSION_EXPIRE_SECONDS,
+                ],
+            )
+        except RedisError:
+            logger.warning("Response cache is unavailable", extra={"tags": tags})
+            return None
+        return make_etag(b".".join(versions))
+
+    async def listen_invalidations(self, reconnect_delay: float = 1) -> None:
+        """
+        Drops the invalidated responses from the local cache,
+        runs until it is cancelled, the local cache is emptied
+        and not used while the worker is not subscribed
+        :param reconnect_delay: seconds between the subscription attempts
+        :return: None
+        """
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        if message["type"] == "subscribe":
+                            self.local.subscribed = True
+                        elif message["type"] == "message":
+                            self.local.evict(json.loads(message["data"]))
+            except RedisError:
+                logger.warning("Local response cache is not subscribed")
+            finally:
+                self.local.subscribed = False
+                self.local.clear()
+            await asyncio.sleep(reconnect_delay)
+
+    async def _delete_entries(self, tag_keys: list[str]) -> int:
+        """
+        Deletes the entries of the tags with their freshness keys
+        and publishes them for the local caches of all workers,
+        an entry stored meanwhile stays in the set of its tag
+        :param tag_keys:
+        :return: number of the deleted entries
+        """
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for tag_key in tag_keys:
+                pipe.zrange(tag_key, 0, -1)
+            members = await pipe.execute()
+        entries = {entry.decode() for entry in itertools.chain(*members)}
+        if not entries:
+            return 0
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(*entries, *(f"{entry}:fresh" for entry in entries))
+            for tag_key, tag_members in zip(tag_keys, members):
+                if tag_members:
+                    pipe.zrem(tag_key, *tag_members)
+            pipe.publish(self.channel, json.dumps(sorted(entries)))
+            await pipe.execute()
+        return len(entries)
+
+    def _tag_key(self, tag: str) -> str:
+        # the sets of the tags were replaced by the sorted sets under new keys
+        return f"{self.prefix}:tags:{tag}"
+
+    def _invalidated_key(self, tag: str) -> str:
+        # the generation of the last invalidation of the tag
+        return f"{self.prefix}:invalidated:{tag}"
+
+    async def _read(self, key: str, endpoint: str) -> tuple[Optional[bytes], bool]:
+        """Returns the response and whether it has not expired yet"""
+        key = f"{self.prefix}:{key}"
+        if self.local is not None:
+            value = self.local.get(key)
+            if value is not None:
+                response_cache_requests.labels(
+                    endpoint=endpoint, result="local_hit"
+                ).inc()
+                return value, True
+            invalidations = self.local.invalidations
+        try:
+            if self.stale_timeout:
+                value, fresh = await self.redis.mget(key, f"{key}:fresh")
+                fresh = fresh is not None
+            else:
+                value, fresh = await self.redis.get(key), True
+        except RedisError:
+            logger.warning("Response cache is unavailable", extra={"key": key})
+            value = None
+        if value is None:
+            response_cache_requests.labels(endpoint=endpoint, result="miss").inc()
+            return None, False
+        if not fresh:
+            response_cache_requests.labels(endpoint=endpoint, result="stale").inc()
+            return value, False
+        response_cache_requests.labels(endpoint=endpoint, result="hit").inc()
+        if self.local is not None:
+            self.local.put(key, value, invalidations)
+        return value, True
+
+    async def _compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[tuple[bytes, Iterable[str]]]],
+        expire: int,
+        stale_value: Optional[bytes],
+    ) -> bytes:
+        """
+        Computes and stores the response, with the lock only one worker
+        computes it, the others wait until it is stored
+        or return the stale response
+        """
+        lock = None
+        if self.lock_timeout:
+            lock = self.redis.lock(
+                f"{self.prefix}:lock:{key}", timeout=self.lock_timeout, blocking=False
+            )
+            try:
+                locked = await lock.acquire()
+            except RedisError:
+                logger.warning("Response cache lock is unavailable")
+                lock, locked = None, True
+            if not locked:
+                lock = None
+                if stale_value is not None:
+                    return stale_value
+                value = await self._wait_for_other_worker(key)
+                if value is not None:
+                    return value
+        try:
+            generation = await self.get_generation()
+            value, tags = await compute()
+            if generation is not None:
+                await self.set(key, value, expire, tags, generation)
+            return value
+        finally:
+            if lock is not None:
+                try:
+                    await lock.release()
+                except (LockError, RedisError):
+                    logger.warning("Response cache lock expired before release")
+
+    async def _wait_for_other_worker(self, key: str) -> Optional[bytes]:
+        """
+        Waits until the worker holding the lock stores the response,
+        returns None if the lock is released or expires without it
+        """
+        entry_key, lock_key = f"{self.prefix}:{key}", f"{self.prefix}:lock:{key}"
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+            try:
+                value, locked = await self.redis.mget(entry_key, lock_key)
+            except RedisError:
+                return None
+            if value is not None or locked is None:
+                return value
+        return None
+
+
+response_cache = ResponseCache(
+    aioredis.from_url(settings.redis_url),
+    local=(
+        LocalResponseCache(
+            maxsize=settings.RESPONSE_CACHE_LOCAL_SIZE,
+            expire=settings.RESPONSE_CACHE_LOCAL_EXPIRE_SECONDS,
+        )
+        if settings.RESPONSE_CACHE_LOCAL_SIZE
+        else None
+    ),
+    lock_timeout=settings.RESPONSE_CACHE_LOCK_SECONDS,
+    stale_timeout=settings.RESPONSE_CACHE_STALE_SECONDS,
+)
+if cdn_purger is not None:
+    response_cache.invalidation_hooks.append(cdn_purger.purge_in_background)
+
+
+def make_etag(data: bytes) -> str:
+    """Strong ETag of the data"""
+    return f'"{hashlib.blake2b(data, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    :param if_none_match: header of the request
+    :param etag:
+    :return: whether the client has the response of the ETag
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+def encode_entry(body: bytes, headers: dict[str, str]) -> bytes:
+    """
+    The entry starts with the headers of the response,
+    the encoded response follows them
+    :param body: the encoded response
+    :param headers: the ETag is made of the body if it is not given
+    :return: bytes
+    """
+    headers = {"Content-Type": "application/json", **headers}
+    headers.setdefault("ETag", make_etag(body))
+    return json.dumps(headers).encode() + b"\n" + body
+
+
+def decode_entry(value: bytes) -> tuple[dict[str, str], bytes]:
+    """
+    :param value: the entry made by encode_entry
+    :return: the headers and the encoded response
+    """
+    headers, body = value.split(b"\n", 1)
+    return json.loads(headers), body
+
+
+def build_key(func: Callable, kwargs: dict) -> str:
+    """
+    The key is made of the endpoint and its parameters, dependencies
+    like the transaction manager or the current user are left out
+    :param func: endpoint
+    :param kwargs: parameters of the request
+    :return: str
+    """
+    parameters = [
+        f"{name}={value}"
+        for name, value in sorted(kwargs.items())
+        if value is None or isinstance(value, (str, int, float, date))
+    ]
+    return ":".join([str(ENTRY_FORMAT), func.__module__, func.__name__, *parameters])
+
+
+def cache(
+    expire: int,
+    model: Any,
+    tags: Callable[..., Any],
+    versioned: bool = False,
+    policy: Optional[CachePolicy] = None,
+) -> Callable:
+    """
+    Caches the responses of the endpoint until they expire
+    or one of their tags is invalidated, the stored response is returned
+    as it is with its ETag and its tags as the surrogate keys, without being
+    decoded, validated by the response model and encoded again,
+    the response is not sent to the client already having it
+    :param expire: seconds until the response expires
+    :param model: response model of the endpoint, used to encode the response
+    :param tags: called with the parameters of the request before the response
+    is computed, returns the tags of the response, may be a coroutine function,
+    the tags known only once the data is read are added with add_tags
+    :param versioned: the ETag is made of the versions of the tags,
+    so the client having the response is answered before it is looked up,
+    the tags must be known without the database and are not added later
+    :param policy: caching headers of the responses for the CDN
+    :return: decorator
+    """
+    adapter = TypeAdapter(model)
+    policy_headers = policy.headers if policy is not None else {}
+
+    def wrapper(func: Callable) -> Callable:
+        @wraps(func)
+        async def inner(*args, **kwargs):
+            with timed("cache"):
+                return await cached(*args, **kwargs)
+
+        async def cached(*args, **kwargs):
+            request = kwargs.pop(REQUEST_PARAMETER, None)
+            if_none_match = request.headers.get("if-none-match") if request else None
+            if versioned and if_none_match:
+                entry_tags = await get_tags(kwargs)
+                etag = await response_cache.get_etag(entry_tags)
+                if etag is not None and etag_matches(if_none_match, etag):
+                    return not_modified(
+                        {
+                            "ETag": etag,
+                            "Surrogate-Key": surrogate_keys(entry_tags),
+                            **policy_headers,
+                        }
+                    )
+
+            async def compute() -> tuple[bytes, Iterable[str]]:
+                entry_tags = list(await get_tags(kwargs))
+                headers = {}
+                if versioned:
+                    etag = await response_cache.get_etag(entry_tags)
+                    if etag is not None:
+                        headers["ETag"] = etag
+                token = computed_entry_tags.set(entry_tags)
+                try:
+                    with timed(APP_PHASE):
+                        response = await func(*args, **kwargs)
+                finally:
+                    computed_entry_tags.reset(token)
+                headers["Surrogate-Key"] = surrogate_keys(entry_tags)
+                with timed("serialization"):
+                    body = adapter.dump_json(
+                        adapter.validate_python(response, from_attributes=True)
+                    )
+                return encode_entry(body, headers), entry_tags
+
+            value = await response_cache.fetch(
+                key=build_key(func, kwargs),
+                endpoint=func.__name__,
+                compute=compute,
+                expire=expire,
+            )
+            headers, body = decode_entry(value)
+            headers.update(policy_headers)
+            if etag_matches(if_none_match, headers["ETag"]):
+                return not_modified(headers)
+            return Response(content=body, headers=headers)
+
+        async def get_tags(kwargs: dict) -> Iterable[str]:
+            entry_tags = tags(**kwargs)
+            if inspect.isawaitable(entry_tags):
+                entry_tags = await entry_tags
+            return entry_tags
+
+        # the request headers are passed by FastAPI to the added parameter
+        signature = inspect.signature(func)
+        request_parameter = inspect.Parameter(
+            REQUEST_PARAMETER, inspect.Parameter.KEYWORD_ONLY, annotation=Request
+        )
+        inner.__signature__ = signature.replace(
+            parameters=[*signature.parameters.values(), request_parameter]
+        )
+        return inner
+
+    return wrapper
+
+
+def not_modified(headers: dict[str, str]) -> Response:
+    """
+    :param headers: headers of the response, the caching ones are sent
+    with the 304 response as well
+    :return: Response
+    """
+    headers = {name: value for name, value in headers.items() if name != "Content-Type"}
+    return Response(status_code=304, headers=headers)
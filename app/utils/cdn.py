@@ -0,0 +1,85 @@
+import asyncio
+from typing import Iterable, Optional
+from urllib.parse import quote
+
+import httpx
+
+from app.config import settings
+from app.logger import logger
+
+
+def surrogate_keys(tags: Iterable[str]) -> str:
+    """
+    The tags of the cached responses are their surrogate keys,
+    a key can't contain spaces or non-ASCII letters of the locations
+    :param tags:
+    :return: value of the Surrogate-Key header
+    """
+    return " ".join(quote(tag, safe=":-") for tag in tags)
+
+
+class CachePolicy:
+    """Caching headers of the responses of an endpoint, the CDN keeps
+    the responses until they are purged or for the shared max age,
+    the browsers revalidate them on every request"""
+    def __init__(self, shared_max_age: int, vary: Iterable[str] = ("Accept-Encoding",)):
+        self.headers = {
+            "Cache-Control": f"public, max-age=0, s-maxage={shared_max_age}",
+            "Vary": ", ".join(vary),
+        }
+
+
+# the responses of a hotel or a room
+catalogue_policy = CachePolicy(shared_max_age=settings.CDN_CACHE_SECONDS)
+# the searches of free rooms
+search_policy = CachePolicy(shared_max_age=settings.CDN_SEARCH_CACHE_SECONDS)
+
+
+class CDNPurger:
+    """Purges the responses kept by the CDN by their surrogate keys
+    with a PURGE request, a failed purge is only logged,
+    the response is kept by the CDN until its shared max age"""
+    def __init__(self, url: str, timeout: float):
+        self.url = url
+        self.client = httpx.AsyncClient(timeout=timeout)
+        # the purges being sent, referenced until they are done
+        self.purges: set[asyncio.Task] = set()
+
+    async def purge_in_background(self, tags: Iterable[str]) -> None:
+        """
+        Sends the purge without waiting for the CDN,
+        so the write is not slowed down by it
+        :param tags: invalidated tags of the cached responses
+        :return: None
+        """
+        purge = asyncio.get_running_loop().create_task(self.purge(tags))
+        self.purges.add(purge)
+        purge.add_done_callback(self.purges.discard)
+
+    async def purge(self, tags: Iterable[str]) -> None:
+        """
+        :param tags: invalidated tags of the cached responses
+        :return: None
+        """
+        keys = surrogate_keys(tags)
+        try:
+            response = await self.client.request(
+                "PURGE", self.url, headers={"Surrogate-Key": keys}
+            )
+            response.raise_for_status()
+        except httpx.HTTPError:
+            logger.warning("CDN is not purged", extra={"keys": keys})
+            return
+        logger.info("CDN purged", extra={"keys": keys})
+
+    async def close(self) -> None:
+        """Waits for the purges being sent and closes the client"""
+        await asyncio.gather(*self.purges)
+        await self.client.aclose()
+
+
+cdn_purger: Optional[CDNPurger] = (
+    CDNPurger(settings.CDN_PURGE_URL, timeout=settings.CDN_PURGE_TIMEOUT_SECONDS)
+    if settings.CDN_PURGE_URL
+    else None
+)
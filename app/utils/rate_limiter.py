@@ -0,0 +1,85 @@
+import math
+import time
+
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.logger import logger
+
+# takes a token from the bucket after refilling it for the time passed,
+# returns the seconds until the next token when the bucket is empty
+TAKE_TOKEN_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', ARGV[3])
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate))
+return tostring(retry_after)
+"""
+
+
+class TokenBucketLimiter:
+    """Token buckets shared by all workers through Redis,
+    a bucket holds up to capacity tokens and is refilled evenly
+    over the period, every request takes one token,
+    while Redis is unavailable the buckets are kept in the process memory"""
+    def __init__(self, redis: aioredis.Redis, prefix: str = "ratelimit"):
+        self.redis = redis
+        self.prefix = prefix
+        self.take_token_script = redis.register_script(TAKE_TOKEN_SCRIPT)
+        # key -> (tokens, last refill timestamp)
+        self.memory: dict[str, tuple[float, float]] = {}
+
+    async def acquire(self, key: str, capacity: int, period: float = 60) -> int:
+        """
+        Takes a token from the bucket of the key
+        :param key: what is limited, e.g. "email:user@example.com"
+        :param capacity: requests allowed per period
+        :param period: seconds to refill the empty bucket
+        :return: 0 if the token is taken, else seconds until the next token
+        """
+        key = f"{self.prefix}:{key}"
+        rate = capacity / period
+        now = time.time()
+        try:
+            retry_after = await self.take_token_script(
+                keys=[key], args=[capacity, rate, now]
+            )
+        except RedisError:
+            logger.warning("Rate limits are checked in memory", extra={"key": key})
+            retry_after = self._take_token_from_memory(key, capacity, period, now)
+        return math.ceil(float(retry_after))
+
+    def _take_token_from_memory(
+        self, key: str, capacity: int, period: float, now: float
+    ) -> float:
+        # refilled buckets are forgotten, the same as the expired keys in Redis
+        self.memory = {
+            bucket_key: bucket
+            for bucket_key, bucket in self.memory.items()
+            if bucket[1] + period > now
+        }
+        rate = capacity / period
+        tokens, updated_at = self.memory.get(key, (capacity, now))
+        tokens = min(capacity, tokens + max(0.0, now - updated_at) * rate)
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / rate
+        self.memory[key] = (tokens, now)
+        return retry_after
+
+
+login_limiter = TokenBucketLimiter(aioredis.from_url(settings.redis_url), "login")
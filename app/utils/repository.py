@@ -1,10 +1,47 @@
+import inspect
+import time
 from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable
 
 from sqlalchemy import delete, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.logger import logger
 
+# repository and method making the queries, the labels of their metrics
+query_source: ContextVar[tuple[str, str]] = ContextVar(
+    "query_source", default=("none", "none")
+)
+
+
+def track_queries(method: Callable) -> Callable:
+    """Labels the queries of the repository method,
+    logs its calls if the repository queries logging is enabled"""
+    @wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        source = {"repository": type(self).__name__, "method": method.__name__}
+        if settings.LOG_REPOSITORY_QUERIES:
+            logger.info("The database query begins to generate", extra=source)
+        started = time.perf_counter()
+        token = query_source.set((source["repository"], source["method"]))
+        try:
+            result = await method(self, *args, **kwargs)
+        finally:
+            query_source.reset(token)
+        if settings.LOG_REPOSITORY_QUERIES:
+            duration = round(time.perf_counter() - started, 4)
+            logger.info(
+                "Database query successfully completed",
+                extra={**source, "duration": duration},
+            )
+        return result
+
+    wrapper.tracks_queries = True
+    return wrapper
+
 
 class AbstractRepository(ABC):
     @abstractmethod
@@ -35,32 +72,32 @@ class AbstractRepository(ABC):
 class SQLAlchemyRepository(AbstractRepository):
     model = None
 
+    def __init_subclass__(cls, **kwargs):
+        """The queries of every public method are labelled by the method"""
+        super().__init_subclass__(**kwargs)
+        for name, method in inspect.getmembers(cls, inspect.iscoroutinefunction):
+            if not name.startswith("_") and not hasattr(method, "tracks_queries"):
+                setattr(cls, name, track_queries(method))
+
     def __init__(self, session: AsyncSession):
         self.session = session
 
     async def find_one_or_none(self, **filter_by):
-        logger.info("The database query begins to generate")
         query = select(self.model).filter_by(**filter_by)
         result = await self.session.execute(query)
-        logger.info("Database query successfully completed")
         return result.scalars().one_or_none()
 
     async def find_all(self, **filter_by):
-        logger.info("The database query begins to generate")
         query = select(self.model).filter_by(**filter_by)
         result = await self.session.execute(query)
-        logger.info("Database query successfully completed")
         return result.scalars().all()
 
     async def insert_data(self, **data):
-        logger.info("The database query begins to generate")
         query = insert(self.model).values(**data).returning(self.model)
         result = await self.session.execute(query)
-        logger.info("Database query successfully completed")
         return result.scalar()
 
     async def update_fields_by_id(self, entity_id: int, **data):
-        logger.info("The database query begins to generate")
         query = (
             update(self.model)
             .where(self.model.id == entity_id)
@@ -68,11 +105,9 @@ class SQLAlchemyRepository(AbstractRepository):
             .returning(self.model)
         )
         result = await self.session.execute(query)
-        logger.info("Database query successfully completed")
         return result.scalar()
 
     async def delete(self, **filter_by):
         query = delete(self.model).filter_by(**filter_by).returning(self.model)
         result = await self.session.execute(query)
-        logger.info("Database query successfully completed")
         return result.scalar()
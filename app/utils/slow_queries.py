@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import random
+import re
+from collections.abc import Mapping
+from logging.handlers import RotatingFileHandler
+from typing import Any
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+from app.logger import CustomJsonFormatter, logger
+from app.utils.repository import query_source
+
+# plans captured at the same time, the next slow queries are logged without them
+MAX_EXPLAINS_IN_PROGRESS = 2
+
+# the queries capturing the plans are not captured themselves
+EXPLAIN_SOURCE = ("SlowQueryLog", "explain")
+
+# the common table expressions of a statement may write, like the one of add_booking
+WRITES = re.compile(r"\b(insert|update|delete|merge)\b")
+
+
+def parameter_shapes(parameters: Any, executemany: bool) -> Any:
+    """
+    Types of the bind parameters, their values are not logged
+    :param parameters: parameters of the driver, a sequence or a mapping
+    :param executemany: the parameters are a list of the parameters of every row
+    :return: types of the parameters, with the number of rows for executemany
+    """
+    if executemany:
+        first_row = parameters[0] if parameters else ()
+        return {"rows": len(parameters), "row": parameter_shapes(first_row, False)}
+    if isinstance(parameters, Mapping):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    return [type(value).__name__ for value in parameters or ()]
+
+
+def can_be_explained(statement: str) -> bool:
+    """EXPLAIN ANALYZE runs the statement, so only the reads are explained,
+    also in a read only transaction rolled back afterwards"""
+    statement = statement.lstrip().lower()
+    return (
+        statement.startswith(("select", "with"))
+        and not WRITES.search(statement)
+        and "pg_advisory" not in statement
+    )
+
+
+class SlowQueryLog:
+    """Logs the queries slower than the threshold with the types of their
+    parameters to a rotating file, a sample of them with the plans
+    of EXPLAIN (ANALYZE, BUFFERS) run again on another connection
+    in the background, so the request is not slowed down by it"""
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        threshold: float,
+        sample_rate: float,
+        explain_timeout: float,
+        log: logging.Logger,
+    ):
+        self.engine = engine
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.explain_timeout = explain_timeout
+        self.log = log
+        # the plans being captured, referenced until they are logged
+        self.explains: set[asyncio.Task] = set()
+
+    def record(
+        self, statement: str, parameters: Any, executemany: bool, duration: float
+    ) -> None:
+        """
+        Called after every query, logs the query if it is slow
+        :param statement: the statement sent to the driver
+        :param parameters: parameters of the driver
+        :param executemany:
+        :param duration: seconds
+        :return: None
+        """
+        if not self.threshold or duration < self.threshold:
+            return
+        source = query_source.get()
+        if source == EXPLAIN_SOURCE:
+            return
+        entry = {
+            "repository": source[0],
+            "method": source[1],
+            "statement": statement,
+            "parameters": parameter_shapes(parameters, executemany),
+            "duration": round(duration, 4),
+        }
+        if (
+            not executemany
+            and len(self.explains) < MAX_EXPLAINS_IN_PROGRESS
+            and random.random() < self.sample_rate
+            and can_be_explained(statement)
+        ):
+            explain = asyncio.get_running_loop().create_task(
+                self._explain(entry, statement, parameters)
+            )
+            self.explains.add(explain)
+            explain.add_done_callback(self.explains.discard)
+        else:
+            self.log.warning("Slow query", extra=entry)
+
+    async def _explain(self, entry: dict, statement: str, parameters: Any) -> None:
+        """Logs the query with its plan, or with the error of the capture"""
+        query_source.set(EXPLAIN_SOURCE)
+        try:
+            async with self.engine.connect() as connection:
+                await connection.exec_driver_sql("SET TRANSACTION READ ONLY")
+                await connection.exec_driver_sql(
+                    "SET LOCAL statement_timeout = "
+                    f"{int(self.explain_timeout * 1000)}"
+                )
+                result = await connection.exec_driver_sql(
+                    f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", parameters
+                )
+                entry["plan"] = result.scalar()
+                await connection.rollback()
+        except SQLAlchemyError as exc:
+            logger.warning("Slow query plan is not captured", extra={"error": str(exc)})
+            entry["plan_error"] = str(exc)
+        self.log.warning("Slow query", extra=entry)
+
+
+def create_slow_query_logger(name: str = "slow_queries") -> logging.Logger:
+    """
+    The slow queries are written apart from the application logs,
+    to the rotating file if it is set, otherwise to stderr
+    :param name: name of the logger
+    :return: logging.Logger
+    """
+    slow_query_logger = logging.getLogger(name)
+    slow_query_logger.propagate = False
+    if settings.SLOW_QUERY_LOG_FILE:
+        handler = RotatingFileHandler(
+            settings.SLOW_QUERY_LOG_FILE,
+            maxBytes=settings.SLOW_QUERY_LOG_MAX_BYTES,
+            backupCount=settings.SLOW_QUERY_LOG_BACKUPS,
+            encoding="utf-8",
+            delay=True,
+        )
+    else:
+        handler = logging.StreamHandler()
+    handler.setFormatter(CustomJsonFormatter("%(timestamp)s %(level)s %(message)s"))
+    slow_query_logger.addHandler(handler)
+    return slow_query_logger
@@ -0,0 +1,120 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.logger import logger
+from app.prometheus.metrics import request_phase_duration
+
+# the rest of the request, like the routing, the validation
+# and the serialization of the responses which are not cached
+APP_PHASE = "app"
+
+
+class RequestPhases:
+    """Durations of the phases of a request, the time of a phase
+    nested in another one is not counted in the outer phase"""
+    def __init__(self):
+        self.durations: dict[str, float] = {}
+        self.current: Optional[str] = None
+
+    def add(self, phase: str, duration: float) -> None:
+        """
+        :param phase:
+        :param duration: seconds spent in the phase, inside the current phase
+        :return: None
+        """
+        self.durations[phase] = self.durations.get(phase, 0) + duration
+        if self.current is not None:
+            self.durations[self.current] = (
+                self.durations.get(self.current, 0) - duration
+            )
+
+    def total(self, duration: float) -> dict[str, float]:
+        """
+        :param duration: seconds of the whole request
+        :return: durations of the phases with the rest of the request
+        """
+        measured = sum(
+            seconds for phase, seconds in self.durations.items() if phase != APP_PHASE
+        )
+        return {**self.durations, APP_PHASE: max(duration - measured, 0)}
+
+
+# phases of the request being handled, None outside of the requests
+request_phases: ContextVar[Optional[RequestPhases]] = ContextVar(
+    "request_phases", default=None
+)
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    """Counts the time of the block in the phase of the current request"""
+    phases = request_phases.get()
+    if phases is None:
+        yield
+        return
+    parent, phases.current = phases.current, phase
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases.current = parent
+        phases.add(phase, time.perf_counter() - started)
+
+
+def add_phase_time(phase: str, duration: float) -> None:
+    """
+    Counts the time measured by callbacks, like the database events,
+    in the phase of the current request
+    :param phase:
+    :param duration: seconds
+    :return: None
+    """
+    phases = request_phases.get()
+    if phases is not None:
+        phases.add(phase, duration)
+
+
+class ServerTimingMiddleware:
+    """Measures the phases of every request, their durations are sent
+    in the Server-Timing header and observed by the histograms,
+    the response is passed through as it is, also a streaming one"""
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        phases = RequestPhases()
+        token = request_phases.set(phases)
+        started = time.perf_counter()
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                durations = phases.total(time.perf_counter() - started)
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    ", ".join(
+                        f"{phase};dur={seconds * 1000:.1f}"
+                        for phase, seconds in durations.items()
+                    ),
+                )
+                for phase, seconds in durations.items():
+                    request_phase_duration.labels(phase=phase).observe(seconds)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_phases.reset(token)
+            process_time = time.perf_counter() - started
+            logger.info(
+                "Request execution time",
+                extra={"process_time": round(process_time, 4)},
+            )
@@ -0,0 +1,73 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.config import settings
+from app.prometheus.metrics import access_token_cache_requests, access_token_cache_size
+
+
+class VerifiedTokenCache:
+    """Per-worker LRU cache of the payloads of verified access tokens,
+    a client sends the same token until it expires, so the signature
+    is checked and the payload is parsed only once per worker,
+    tokens are kept under their digest and dropped when they expire"""
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.payloads: OrderedDict[bytes, dict] = OrderedDict()
+
+    def get(self, token: str) -> Optional[dict]:
+        """
+        Returns the payload of the token if it was verified before
+        and has not expired yet
+        :param token:
+        :return: Optional[dict]
+        """
+        key = self._digest(token)
+        payload = self.payloads.get(key)
+        if payload is not None and payload["exp"] <= time.time():
+            self._evict(key)
+            payload = None
+        if payload is None:
+            access_token_cache_requests.labels(result="miss").inc()
+            return None
+        self.payloads.move_to_end(key)
+        access_token_cache_requests.labels(result="hit").inc()
+        return payload
+
+    def put(self, token: str, payload: dict) -> None:
+        """
+        Keeps the payload of the verified token, the least recently used
+        token is dropped when the cache is full
+        :param token:
+        :param payload:
+        :return: None
+        """
+        self.payloads[self._digest(token)] = payload
+        if len(self.payloads) > self.maxsize:
+            self.payloads.popitem(last=False)
+        access_token_cache_size.set(len(self.payloads))
+
+    def evict_token(self, token: str) -> None:
+        """Drops the token, used on logout"""
+        self._evict(self._digest(token))
+
+    def evict_user_tokens(self, user_id: int) -> None:
+        """Drops all tokens of the user, used when the sessions are aborted"""
+        for key in [
+            key
+            for key, payload in self.payloads.items()
+            if payload["sub"] == str(user_id)
+        ]:
+            self._evict(key)
+
+    def _evict(self, key: bytes) -> None:
+        self.payloads.pop(key, None)
+        access_token_cache_size.set(len(self.payloads))
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+
+access_token_cache = VerifiedTokenCache(maxsize=settings.ACCESS_TOKEN_CACHE_SIZE)
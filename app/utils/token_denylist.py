@@ -0,0 +1,87 @@
+import time
+from typing import Optional
+
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.logger import logger
+
+
+class TokenDenylist:
+    """Revoked access tokens, a token is revoked by its jti on logout
+    or together with all tokens of the user issued before the revocation,
+    entries live in Redis only until the revoked tokens expire,
+    while Redis is unavailable they are kept in the process memory"""
+
+    def __init__(self, redis: aioredis.Redis, prefix: str = "denylist"):
+        self.redis = redis
+        self.prefix = prefix
+        # key -> (value, expiration timestamp)
+        self.memory: dict[str, tuple[float, float]] = {}
+
+    async def revoke_token(self, jti: str, expires_at: float) -> None:
+        """
+        Revokes a single token until it expires
+        :param jti: id of the token
+        :param expires_at: timestamp of the token expiration
+        :return: None
+        """
+        await self._set(f"{self.prefix}:jti:{jti}", 1, expires_at)
+
+    async def revoke_user_tokens(self, user_id: int) -> None:
+        """
+        Revokes all tokens of the user issued until now
+        :param user_id:
+        :return: None
+        """
+        revoked_at = time.time()
+        expires_at = revoked_at + settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        await self._set(f"{self.prefix}:user:{user_id}", revoked_at, expires_at)
+
+    async def is_revoked(self, jti: str, user_id: int, issued_at: float) -> bool:
+        """
+        Checks the token by its jti and by the last revocation
+        of the user tokens in one round trip
+        :param jti: id of the token
+        :param user_id:
+        :param issued_at: timestamp of the token creation
+        :return: bool
+        """
+        token_revoked, user_revoked_at = await self._get(
+            f"{self.prefix}:jti:{jti}", f"{self.prefix}:user:{user_id}"
+        )
+        if token_revoked is not None:
+            return True
+        return user_revoked_at is not None and issued_at <= user_revoked_at
+
+    async def _set(self, key: str, value: float, expires_at: float) -> None:
+        ttl = int(expires_at - time.time()) + 1
+        if ttl <= 0:
+            return
+        self.memory[key] = (value, expires_at)
+        try:
+            await self.redis.set(key, value, ex=ttl)
+        except RedisError:
+            logger.warning("Token denylist is kept in memory", extra={"key": key})
+        else:
+            del self.memory[key]
+
+    async def _get(self, *keys: str) -> list[Optional[float]]:
+        if self.memory:
+            now = time.time()
+            self.memory = {
+                key: entry for key, entry in self.memory.items() if entry[1] > now
+            }
+        try:
+            values = await self.redis.mget(keys)
+        except RedisError:
+            logger.warning("Token denylist is checked in memory")
+            values = [None] * len(keys)
+        return [
+            float(value) if value is not None else self.memory.get(key, (None,))[0]
+            for key, value in zip(keys, values)
+        ]
+
+
+token_denylist = TokenDenylist(aioredis.from_url(settings.redis_url))
@@ -1,19 +1,32 @@
 from abc import ABC, abstractmethod
+from typing import Optional
 
-from sqlalchemy.ext.asyncio import AsyncSession
+from redis import asyncio as aioredis
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
 
-from app.database import async_session_maker
-from app.repositories.auths import AuthsRepository
+from app.config import settings
+from app.database import async_session_maker, engine
+from app.repositories.auths import (
+    AbstractRefreshSessionsRepository,
+    AuthsRepository,
+    RedisAuthsRepository,
+)
 from app.repositories.bookings import BookingsRepository
 from app.repositories.hotels import HotelsRepository
 from app.repositories.rooms import RoomsRepository
 from app.repositories.users import UsersRepository
 
+# the client of the refresh sessions in Redis is shared by all managers
+refresh_sessions_redis = aioredis.from_url(settings.redis_url)
+# the scripts of the refresh sessions in Redis are registered once
+redis_auths_repository = RedisAuthsRepository(refresh_sessions_redis)
+
 
 class ITransactionManager(ABC):
     """Interface for implementing the UOW pattern
     for working with transactions to the database"""
-    auth: AuthsRepository
+
+    auth: AbstractRefreshSessionsRepository
     users: UsersRepository
     rooms: RoomsRepository
     hotels: HotelsRepository
@@ -40,26 +53,79 @@ class ITransactionManager(ABC):
     async def rollback(self):
         raise NotImplementedError
 
+    @abstractmethod
+    async def release_connection(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def close(self):
+        raise NotImplementedError
+
 
 class TransactionManager(ITransactionManager):
-    """Implementation of the interface for working with transactions"""
-    def __init__(self):
+    """Implementation of the interface for working with transactions,
+    entering it again while it is active opens a savepoint in the same
+    session instead of a new session, so nested services share one
+    connection and only the outermost commit ends the transaction,
+    all blocks run on one connection which is held until the manager is closed"""
+
+    def __init__(self, redis_auths: RedisAuthsRepository = redis_auths_repository):
         self.session_factory = async_session_maker
+        self.redis_auths = redis_auths
+        self.connection: Optional[AsyncConnection] = None
+        self.savepoints = []
+        self.depth = 0
 
     async def __aenter__(self):
-        self.session = self.session_factory()
-        self.users = UsersRepository(self.session)
-        self.auth = AuthsRepository(self.session)
-        self.rooms = RoomsRepository(self.session)
-        self.hotels = HotelsRepository(self.session)
-        self.bookings = BookingsRepository(self.session)
+        if self.depth:
+            self.savepoints.append(await self.session.begin_nested())
+        else:
+            if self.connection is None:
+                self.connection = await engine.connect()
+            self.session = self.session_factory(bind=self.connection)
+            self.users = UsersRepository(self.session)
+            if settings.REFRESH_SESSION_BACKEND == "redis":
+                self.auth = self.redis_auths.with_users(self.users)
+            else:
+                self.auth = AuthsRepository(self.session)
+            self.rooms = RoomsRepository(self.session)
+            self.hotels = HotelsRepository(self.session)
+            self.bookings = BookingsRepository(self.session)
+        self.depth += 1
 
     async def __aexit__(self, *args):
-        await self.session.rollback()
-        await self.session.close()
+        self.depth -= 1
+        if self.depth:
+            # changes of a nested block which were not committed are undone
+            savepoint = self.savepoints.pop()
+            if savepoint.is_active:
+                await savepoint.rollback()
+        else:
+            # closing rolls back the uncommitted changes without expiring
+            # the loaded objects, so they can still be returned
+            await self.session.close()
 
     async def commit(self):
-        await self.session.commit()
+        if self.depth > 1:
+            await self.savepoints[-1].commit()
+        else:
+            await self.session.commit()
 
     async def rollback(self):
-        await self.session.rollback()
+        if self.depth > 1:
+            await self.savepoints[-1].rollback()
+        else:
+            await self.session.rollback()
+
+    async def release_connection(self):
+        """Returns the connection to the pool between the blocks,
+        while the service waits for something else than the database,
+        the manager stays usable and the next block takes a new one"""
+        if self.connection is not None and not self.depth:
+            await self.connection.close()
+            self.connection = None
+
+    async def close(self):
+        """Ends the use of the manager by its owner,
+        the connection of the manager is returned to the pool"""
+        await self.release_connection()
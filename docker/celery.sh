@@ -2,6 +2,8 @@
 
 if [[ "${1}" == "celery" ]]; then
   celery --app=app.tasks.celery_setup:celery worker -l INFO
+elif [[ "${1}" == "celery_beat" ]]; then
+  celery --app=app.tasks.celery_setup:celery beat -l INFO
 elif [[ "${1}" == "flower" ]]; then
   celery --app=app.tasks.celery_setup:celery flower
 fi
\ No newline at end of file